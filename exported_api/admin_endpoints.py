@@ -1,40 +1,199 @@
 # administrative endpoints for the API
-from fastapi import APIRouter, HTTPException
+import json
+import threading
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
+from starlette.datastructures import UploadFile
 
-from rag_index_service.build_index import get_all_doc_parts_from_sqldb, get_all_docs_from_sqldb, get_all_parts_from_sqldb
+from rag_index_service.build_index import (
+    SQL_LISTINGS, get_indexing_status_snapshot, ingest_texts, ingest_uploaded_files, rebuild_vectorstore_from_embedding_cache, reindex_loader,
+)
+from rag_index_service.ingestion_jobs import get_ingestion_job_registry
+from rag_index_service.sql_data_access_async import get_page_from_sqldb_async
+from service.configloader import deep_get, settings
 
 router = APIRouter()
 
+class TextDocument(BaseModel):
+    text: str
+    metadata: Dict[str, Any]
+
+class TextDocumentsRequest(BaseModel):
+    documents: List[TextDocument]
+
+# page sizes of the listings of SQL tables
+LIST_MAX_LIMIT = 1000
+LIST_STREAM_PAGE_SIZE = 500
+
 
 @router.get("/admin/documents")
-async def get_documents():
+async def get_documents(limit: Optional[int] = None, after: Optional[str] = None, fields: Optional[str] = None, format: str = "json"):
     """"
-    Retrive all documents from database
+    Retrive documents from database - paginated, see list_sql_rows()
     """
+    return await list_sql_rows("documents", "documents", limit, after, fields, format)
+
+@router.post("/admin/documents")
+async def post_documents(request: Request):
+    """"
+    Add documents to the index now (new/changed ones) - processed in the background, poll the job with GET /admin/jobs/{job_id}
+
+    Either a multipart upload (Content-Type: multipart/form-data):
+    - "file"/"files": one or more files - the filename is used as source (e.g. the URL or path in the CMS)
+    - "metadata" (optional): JSON object with additional metadata for all files
+
+    Or JSON (Content-Type: application/json):
+        {"documents": [{"text": "...", "metadata": {"source": "...", ...}}, ...]}
+    """
+    content_type = request.headers.get("content-type", "")
     try:
-        documents = get_all_docs_from_sqldb()
-        return {"documents": documents}
+        if content_type.startswith("multipart/form-data"):
+            form = await request.form()
+            metadata = json.loads(form.get("metadata") or "{}")
+            files = []
+            for (key, value) in form.multi_items():
+                if key in ("file", "files") and isinstance(value, UploadFile):
+                    if not value.filename:
+                        raise HTTPException(status_code=400, detail="Uploaded file without filename")
+                    files.append((value.filename, value.content_type, await value.read(), metadata))
+            if len(files) == 0:
+                raise HTTPException(status_code=400, detail="No files uploaded - use the form field 'file' or 'files'")
+            job_id = get_ingestion_job_registry().submit(f"upload {len(files)} file(s)", lambda: ingest_uploaded_files(files))
+        else:
+            documents_request = TextDocumentsRequest.model_validate(await request.json())
+            texts = [(document.text, document.metadata) for document in documents_request.documents]
+            for (_, metadata) in texts:
+                if not metadata.get("source"):
+                    raise HTTPException(status_code=400, detail="Missing 'source' in the metadata of a document")
+            job_id = get_ingestion_job_registry().submit(f"upload {len(texts)} text document(s)", lambda: ingest_texts(texts))
+        return {"job_id": job_id, "status": get_ingestion_job_registry().get_job(job_id)["status"]}
+    except HTTPException:
+        raise
+    except (ValueError, ValidationError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/admin/parts")
-async def get_parts():
+@router.post("/admin/reindex")
+async def post_reindex(loader: str, source: Optional[str] = None):
     """"
-    Retrive all parts from database
+    Run a configured loader (key in config.rag_loading.loaders) now and process its documents again (even if unchanged)
+    - optionally only the documents of a single source. Processed in the background, poll the job with GET /admin/jobs/{job_id}
     """
+    config_loaders = deep_get(settings, "config.rag_loading.loaders", {})
+    if loader not in config_loaders:
+        raise HTTPException(status_code=404, detail=f"Unknown loader: '{loader}'")
     try:
-        parts = get_all_parts_from_sqldb()
-        return {"parts": parts}
+        job_id = get_ingestion_job_registry().submit(f"reindex loader={loader} source={source}", lambda: reindex_loader(loader, source))
+        return {"job_id": job_id, "status": get_ingestion_job_registry().get_job(job_id)["status"]}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/admin/jobs/{job_id}")
+async def get_job(job_id: str):
+    """"
+    Status of an ingestion job: queued, running, finished (with result) or failed (with error)
+    """
+    job = get_ingestion_job_registry().get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return job
+
+@router.get("/admin/parts")
+async def get_parts(limit: Optional[int] = None, after: Optional[str] = None, fields: Optional[str] = None, format: str = "json"):
+    """"
+    Retrive parts from database - paginated, see list_sql_rows()
+    """
+    return await list_sql_rows("parts", "parts", limit, after, fields, format)
+
 @router.get("/admin/doc-parts")
-async def get_doc_parts():
+async def get_doc_parts(limit: Optional[int] = None, after: Optional[str] = None, fields: Optional[str] = None, format: str = "json"):
+    """"
+    Retrive doc-parts from database - paginated, see list_sql_rows()
+    """
+    return await list_sql_rows("doc_parts", "doc_parts", limit, after, fields, format)
+
+async def list_sql_rows(listing: str, response_key: str, limit: Optional[int], after: Optional[str], fields: Optional[str], format: str):
+    """
+    List the rows of an SQL table.
+
+    Query parameters:
+    - limit: max number of rows (json: max LIST_MAX_LIMIT) - default: all rows
+    - after: 'next_after' of the previous page (comma-separated key values), e.g. for doc-parts: "<document_id>,<part_sha256>"
+    - fields: comma-separated columns to return, e.g. "sha256" to omit the content of parts
+    - format: "json" (with limit: a single page, with 'next_after' for the next page or null;
+                      without limit: all rows like before the pagination, 'next_after' is null)
+              or "ndjson" (stream all rows - from 'after', up to 'limit' - one JSON object per line)
+    """
+    (_, _, key_columns, _) = SQL_LISTINGS[listing]
+    after_key = after.rsplit(",", len(key_columns) - 1) if after else None
+    field_list = [field.strip() for field in fields.split(",") if field.strip()] if fields else None
+    if limit is not None and limit < 1:
+        raise HTTPException(status_code=400, detail=f"Invalid limit: {limit}")
+
+    try:
+        if format == "json" and limit is None:
+            # all rows (read page by page)
+            (rows, next_key) = await get_page_from_sqldb_async(listing, LIST_STREAM_PAGE_SIZE, after_key, field_list)
+            all_rows = [row async for row in _get_sql_rows(listing, None, field_list, rows, next_key)]
+            return {response_key: all_rows, "next_after": None}
+        elif format == "json":
+            (rows, next_key) = await get_page_from_sqldb_async(listing, min(limit, LIST_MAX_LIMIT), after_key, field_list)
+            return {response_key: rows, "next_after": ",".join(str(value) for value in next_key) if next_key else None}
+        elif format == "ndjson":
+            # check the parameters before the streaming starts
+            (rows, next_key) = await get_page_from_sqldb_async(listing, min(limit or LIST_STREAM_PAGE_SIZE, LIST_STREAM_PAGE_SIZE), after_key, field_list)
+            return StreamingResponse(_stream_sql_rows(listing, limit, field_list, rows, next_key), media_type="application/x-ndjson")
+        else:
+            raise HTTPException(status_code=400, detail=f"Unknown format: {format} - use 'json' or 'ndjson'")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def _stream_sql_rows(listing: str, limit: Optional[int], fields: Optional[List[str]], rows: List[Dict[str, Any]], next_key: Optional[List[str]]):
+    async for row in _get_sql_rows(listing, limit, fields, rows, next_key):
+        yield json.dumps(row) + "\n"
+
+async def _get_sql_rows(listing: str, limit: Optional[int], fields: Optional[List[str]], rows: List[Dict[str, Any]], next_key: Optional[List[str]]):
+    # the first page (rows, next_key) and the following ones - page by page, only one page is read at a time
+    remaining = limit
+    while True:
+        for row in rows:
+            yield row
+        if remaining is not None:
+            remaining -= len(rows)
+            if remaining <= 0:
+                return
+        if next_key is None:
+            return
+        page_limit = LIST_STREAM_PAGE_SIZE if remaining is None else min(remaining, LIST_STREAM_PAGE_SIZE)
+        (rows, next_key) = await get_page_from_sqldb_async(listing, page_limit, next_key, fields)
+
+@router.get("/admin/indexing/status")
+async def get_indexing_status():
+    """"
+    Live status of the indexing: current and last round, per-loader progress, counters
+    (documents, parts, embeddings requested vs. cache hits), queue depths, pipeline stage timings and throughput
+    """
+    try:
+        # in-memory only, no blocking calls
+        return get_indexing_status_snapshot()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/admin/vectorstore/rebuild")
+async def post_vectorstore_rebuild():
     """"
-    Retrive all doc-parts from database
+    Start to add all parts to the vectorstore with the embeddings from the embedding cache
+    (no embedding calculation), e.g. to fill a new vectorstore collection. Runs in the background.
     """
     try:
-        doc_parts = get_all_doc_parts_from_sqldb()
-        return {"doc_parts": doc_parts}
+        threading.Thread(target=rebuild_vectorstore_from_embedding_cache, daemon=True).start()
+        return {"status": "started"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -8,6 +8,7 @@ from langchain_core.document_loaders import BaseLoader
 
 from rag_index_service.blob_parser_document_loader import BlobParserDocumentLoader
 from rag_index_service.tools.default_blob_parser import DefaultBlobParser
+from rag_index_service.tools.web_crawler_blob_loader import WebCrawlerBlobLoader
 from rag_index_service.tools.wget_blob_loader import WgetBlobLoader
 
 import logging
@@ -46,6 +47,21 @@ def get_document_loaders() -> List[BaseLoader]:
     return loaders
 
 
+def get_document_loader_by_key(key: str) -> BaseLoader:
+    """
+    Setup the document loader with the key in config.rag_loading.loaders (a new instance).
+    """
+    config_loaders: Dict = deep_get(settings, "config.rag_loading.loaders")
+    config_loader: Optional[Dict] = deep_get(config_loaders, key, None)
+    if config_loader is None:
+        raise KeyError(f"Unknown loader: '{key}' - available: {list(config_loaders.keys())}")
+
+    loader = get_loader_for_config(config_loader)
+    if loader is None:
+        raise ValueError(f"Loader is disabled: '{key}'")
+    return loader
+
+
 def get_loader_for_config(config_loader: Dict) -> Optional[BaseLoader]:
     # Start
     context_str_for_logging = f"Setup loader: {config_loader}"
@@ -56,6 +72,8 @@ def get_loader_for_config(config_loader: Dict) -> Optional[BaseLoader]:
     typename                    = deep_get(config_loader, "type")
     module_and_class            = deep_get(config_loader, "class")
     class_kwargs                = deep_get(config_loader, "args")
+    config_parsing              = {**deep_get(settings, "config.rag_loading.parsing", {}),
+                                   **deep_get(config_loader, "parsing", {})}
 
     # Check if enabled
     if not enabled:
@@ -65,14 +83,85 @@ def get_loader_for_config(config_loader: Dict) -> Optional[BaseLoader]:
     # Action: Create instance (depending on type)
     if typename == "BlobLoader":
         blob_loader = call_function_or_constructor(module_and_class, class_kwargs, context_str_for_logging)
-        document_loader = BlobParserDocumentLoader(blob_loader, DefaultBlobParser()) 
+        if isinstance(blob_loader, WebCrawlerBlobLoader) and blob_loader.use_http_cache and blob_loader.http_cache is None:
+            # (late import: build_index imports this module)
+            from rag_index_service.build_index import get_http_cache
+            blob_loader.http_cache = get_http_cache()
+        document_loader = BlobParserDocumentLoader(
+            blob_loader,
+            get_blob_parser_for_config(config_parsing),
+            process_pool_size=deep_get(config_parsing, "process_pool_size", 0),
+            parse_timeout_seconds=deep_get(config_parsing, "timeout_seconds", None),
+        )
         return document_loader
     elif typename == "BaseLoader":
         document_loader = call_function_or_constructor(module_and_class, class_kwargs, context_str_for_logging)
+        return document_loader
     else:
         raise ValueError(f"Unknown loader type: {typename} for loader_config: {config_loader}")
 
 
+def get_blob_parser_for_config(config_parsing: Dict) -> DefaultBlobParser:
+    """
+    Setup the blob parser with the parsing settings (config.rag_loading.parsing, overwritten per loader with "parsing:").
+    """
+    return DefaultBlobParser(
+        html_parser=deep_get(config_parsing, "html_parser", "bs4"),
+        html_parser_args=dict(deep_get(config_parsing, "html_parser_args", {}) or {}),
+    )
+
+
+def get_blob_parser_by_key(key: str) -> DefaultBlobParser:
+    """
+    Setup the blob parser of the loader with the key in config.rag_loading.loaders (a new instance).
+    """
+    config_loaders: Dict = deep_get(settings, "config.rag_loading.loaders")
+    config_loader: Dict = deep_get(config_loaders, key, None) or {}
+    config_parsing = {**deep_get(settings, "config.rag_loading.parsing", {}),
+                      **deep_get(config_loader, "parsing", {})}
+    return get_blob_parser_for_config(config_parsing)
+
+
+# blob loader classes that load files from a local directory tree (supported by the watch mode)
+FILE_SYSTEM_BLOB_LOADER_CLASSES = [
+    "langchain_community.document_loaders.blob_loaders.FileSystemBlobLoader",
+    "langchain_community.document_loaders.blob_loaders.file_system.FileSystemBlobLoader",
+    "langchain_community.document_loaders.FileSystemBlobLoader",
+]
+
+def get_file_system_watch_configs() -> List[Dict]:
+    """
+    Get the watch settings of all enabled file system loaders with watch mode
+    (config.rag_loading.watch - can be overwritten per loader with "watch:").
+
+    Returns: list of dicts with: key, path, glob, exclude, suffixes, debounce_seconds, poll_interval_seconds
+    """
+    config_loaders: Dict = deep_get(settings, "config.rag_loading.loaders")
+
+    watch_configs: List[Dict] = []
+    for key in config_loaders:
+        config_loader: Dict = deep_get(config_loaders, key)
+        config_watch = {**deep_get(settings, "config.rag_loading.watch", {}),
+                        **deep_get(config_loader, "watch", {})}
+        if not deep_get(config_loader, "enabled") or not deep_get(config_watch, "enabled", False):
+            continue
+        if deep_get(config_loader, "type") != "BlobLoader" or deep_get(config_loader, "class") not in FILE_SYSTEM_BLOB_LOADER_CLASSES:
+            logger.warning(f"Watch mode is only supported for file system loaders ({FILE_SYSTEM_BLOB_LOADER_CLASSES}) - ignored for loader '{key}'")
+            continue
+
+        class_kwargs = deep_get(config_loader, "args", {})
+        watch_configs.append({
+            "key": key,
+            "path": deep_get(class_kwargs, "path"),
+            "glob": deep_get(class_kwargs, "glob", "**/[!.]*"),
+            "exclude": list(deep_get(class_kwargs, "exclude", []) or []),
+            "suffixes": list(deep_get(class_kwargs, "suffixes")) if deep_get(class_kwargs, "suffixes", None) else None,
+            "debounce_seconds": deep_get(config_watch, "debounce_seconds", 2.0),
+            "poll_interval_seconds": deep_get(config_watch, "poll_interval_seconds", 5.0),
+        })
+    return watch_configs
+
+
 #
 # TODO: TO DELETE - it was only used during development
 #
@@ -101,6 +101,30 @@ def get_default_embeddings() -> Embeddings:
     # Action: Create instance
     return call_function_or_constructor(module_and_class, class_kwargs, context_str_for_logging)
 
+@cache
+def get_default_embeddings_model_id() -> str:
+    """
+    Get the identity of the default embedding model, e.g. "langchain_openai.embeddings.OpenAIEmbeddings:text-embedding-3-small".
+
+    Embeddings calculated by models with the same identity are compatible (e.g. for caching).
+    Can be set explicitly with config.common.embedding_llm.model_id.
+    """
+    config_embedding_llm = deep_get(settings, "config.common.embedding_llm")
+
+    model_id = deep_get(config_embedding_llm, "model_id", None)
+    if model_id is None:
+        # derive the identity from the class and the model-relevant args (not from API keys, URLs, timeouts, ...)
+        module_and_class = deep_get(config_embedding_llm, "class")
+        class_kwargs = deep_get(config_embedding_llm, "args", {})
+        model_id = module_and_class
+        for key in ["model", "model_name", "deployment", "dimensions"]:
+            value = class_kwargs.get(key)
+            if value is not None:
+                model_id += f":{value}"
+
+    logger.info(f"Embedding model id: {model_id}")
+    return model_id
+
 @cache
 def get_default_embeddingsOLD() -> Embeddings:
     # TODO: make it configurable XXXXXXXXXXXXXXXXXXXXXXXXXXXx
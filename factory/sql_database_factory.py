@@ -9,6 +9,11 @@ else:
     DBAPIConnection = any
     DBAPICursor = any
 
+from contextlib import contextmanager
+import queue
+import threading
+from typing import Callable, ContextManager, Dict, Iterator
+
 from factory.factory_util import call_function_or_constructor
 from service.configloader import deep_get, settings
 import logging
@@ -22,8 +27,12 @@ logger = logging.getLogger(__name__)
 # Uses PEP 249 - Database API Specification 2.0 - https://peps.python.org/pep-0249/
 #
 
-@cache
-def get_sql_database_connection() -> DBAPIConnection:
+def create_sql_database_connection() -> DBAPIConnection:
+    """
+    Create a new connection to the configured SQL database.
+
+    Usually, connections are borrowed from the pool (get_sql_database_connection_pool()) instead.
+    """
     # Start
     config_sql_database = deep_get(settings, "config.common.databases.sql_database")
     context_str_for_logging = f"Setup SQL Database connection: {config_sql_database}"
@@ -38,10 +47,142 @@ def get_sql_database_connection() -> DBAPIConnection:
     if module_and_connect_func == "sqlite3.connect":
         import os
         db_file = connect_func_kwargs.get("database")
-        if db_file:
+        if db_file and db_file != ":memory:":
             db_dir = os.path.dirname(db_file)
-            if not os.path.exists(db_dir):
+            if db_dir and not os.path.exists(db_dir):
                 os.makedirs(db_dir)
 
     # Action: Create instance
-    return call_function_or_constructor(module_and_connect_func, connect_func_kwargs, context_str_for_logging)
+    sqlCon = call_function_or_constructor(module_and_connect_func, connect_func_kwargs, context_str_for_logging)
+    if sqlCon is None:
+        raise ConnectionError(f"Could not connect to SQL database: {module_and_connect_func}")
+
+    # SQLite: WAL mode (readers don't block the writer and vice versa) and other pragmas
+    if module_and_connect_func == "sqlite3.connect":
+        sqlite_pragmas: Dict = deep_get(config_sql_database, "sqlite_pragmas", {})
+        for (pragma, value) in sqlite_pragmas.items():
+            sqlCon.execute(f"PRAGMA {pragma}={value}")
+        logger.info(f"SQLite pragmas set: {dict(sqlite_pragmas)}")
+
+    return sqlCon
+
+
+class SqlConnectionPool:
+    """
+    Thread-safe pool of SQL database connections.
+
+    A connection is borrowed by one thread at a time:
+
+        with get_sql_database_connection_pool().connection() as sqlCon:
+            ...
+
+    New connections are created on demand, up to pool_size connections.
+    If all connections are in use, the caller blocks until a connection is returned.
+    """
+
+    def __init__(self, create_connection: Callable[[], DBAPIConnection], pool_size: int) -> None:
+        """
+        Args:
+            create_connection: function to create a new connection
+            pool_size: max number of connections
+        """
+        self.create_connection = create_connection
+        self.pool_size = max(1, pool_size)
+
+        self._idle_connections: queue.LifoQueue = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._num_connections = 0
+
+    def __str__(self) -> str:
+        return f"SqlConnectionPool(pool_size: {self.pool_size}, connections: {self._num_connections}, idle: {self._idle_connections.qsize()})"
+
+    @contextmanager
+    def connection(self) -> Iterator[DBAPIConnection]:
+        sqlCon = self._borrow()
+        try:
+            yield sqlCon
+        finally:
+            self._return(sqlCon)
+
+    def _borrow(self) -> DBAPIConnection:
+        try:
+            return self._idle_connections.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            create_new_connection = self._num_connections < self.pool_size
+            if create_new_connection:
+                self._num_connections += 1
+        if create_new_connection:
+            try:
+                return self.create_connection()
+            except Exception:
+                with self._lock:
+                    self._num_connections -= 1
+                raise
+
+        # wait for a returned connection
+        return self._idle_connections.get()
+
+    def _return(self, sqlCon: DBAPIConnection) -> None:
+        # end a transaction that was not committed (e.g. read-only usage),
+        # the next borrower should see the latest data
+        try:
+            sqlCon.rollback()
+        except Exception as e:
+            logger.warning(f"SQL rollback of returned connection failed - connection closed: {e}")
+            try:
+                sqlCon.close()
+            finally:
+                with self._lock:
+                    self._num_connections -= 1
+            return
+        self._idle_connections.put(sqlCon)
+
+
+@cache
+def get_sql_database_connection_pool() -> SqlConnectionPool:
+    config_sql_database = deep_get(settings, "config.common.databases.sql_database")
+    pool_size = deep_get(config_sql_database, "pool_size", 5)
+
+    # an SQLite in-memory database exists per connection: all threads must share a single connection
+    if deep_get(config_sql_database, "args.database", None) == ":memory:":
+        pool_size = 1
+
+    sqlConnectionPool = SqlConnectionPool(create_sql_database_connection, pool_size)
+    logger.info(f"Setup done: {sqlConnectionPool}")
+    return sqlConnectionPool
+
+
+def get_sql_database_connection() -> ContextManager[DBAPIConnection]:
+    """
+    Borrow a connection from the pool:
+
+        with get_sql_database_connection() as sqlCon:
+            ...
+    """
+    return get_sql_database_connection_pool().connection()
+
+
+# SQL dialects of the supported DB modules
+SQL_DIALECTS_BY_CONNECT_FUNCTION = {
+    "sqlite3.connect": "sqlite",
+    "psycopg2.connect": "postgresql",
+    "mysql.connector.connect": "mysql",
+    "mariadb.connect": "mysql",
+}
+
+def get_sql_dialect() -> str:
+    """
+    Get the SQL dialect of the configured SQL database: "sqlite", "postgresql" or "mysql".
+    (The indexing service supports "sqlite" only - see rag_index_service/sql_schema_migrations.py.)
+
+    Can be set explicitly with config.common.databases.sql_database.dialect.
+    """
+    config_sql_database = deep_get(settings, "config.common.databases.sql_database")
+    dialect = deep_get(config_sql_database, "dialect", None)
+    if dialect is None:
+        module_and_connect_func = deep_get(config_sql_database, "connect")
+        dialect = SQL_DIALECTS_BY_CONNECT_FUNCTION.get(module_and_connect_func, "sqlite")
+    return dialect
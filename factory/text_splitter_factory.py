@@ -0,0 +1,87 @@
+from functools import cache
+from typing import Dict, Optional, Tuple
+from langchain_text_splitters import RecursiveCharacterTextSplitter, TextSplitter
+
+from rag_index_service.tools.content_defined_text_splitter import ContentDefinedTextSplitter
+from service.configloader import deep_get, settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+#
+# TextSplitter instances and their setup
+#
+# The splitters are created once and shared by all indexing threads
+# (splitting is stateless, the tiktoken encoder is thread-safe).
+#
+
+def get_text_splitter_for_content_type(content_type: Optional[str]) -> TextSplitter:
+    """
+    Get the text splitter configured for the content type (e.g. "application/pdf"),
+    or the default text splitter.
+    """
+    (default_text_splitter, text_splitters_by_content_type) = get_text_splitters()
+    if content_type is not None:
+        # ignore parameters, e.g. "text/html; charset=utf-8"
+        content_type = content_type.split(";")[0].strip().lower()
+        text_splitter = text_splitters_by_content_type.get(content_type)
+        if text_splitter is not None:
+            return text_splitter
+    return default_text_splitter
+
+
+@cache
+def get_text_splitters() -> Tuple[TextSplitter, Dict[str, TextSplitter]]:
+    """
+    Setup all text splitters as specified in the configuration.
+
+    Returns: (default text splitter, text splitters by content type)
+    """
+    logger.info("Setup Text Splitters")
+    config_text_splitters: Dict = deep_get(settings, "config.rag_indexing.text_splitters")
+
+    default_text_splitter: Optional[TextSplitter] = None
+    text_splitters_by_content_type: Dict[str, TextSplitter] = {}
+    for key in config_text_splitters:
+        config_text_splitter: Dict = deep_get(config_text_splitters, key)
+        text_splitter = create_text_splitter_for_config(key, config_text_splitter)
+        if key == "default":
+            default_text_splitter = text_splitter
+        for content_type in deep_get(config_text_splitter, "content_types", []):
+            text_splitters_by_content_type[content_type.lower()] = text_splitter
+
+    if default_text_splitter is None:
+        raise ValueError(f"Missing 'default' text splitter in config.rag_indexing.text_splitters: {config_text_splitters}")
+
+    logger.info(f"Setup done: default text splitter + text splitters for content types: {list(text_splitters_by_content_type.keys())}")
+    return (default_text_splitter, text_splitters_by_content_type)
+
+
+def create_text_splitter_for_config(key: str, config_text_splitter: Dict) -> TextSplitter:
+    # Start
+    logger.info(f"Setup text splitter '{key}': {config_text_splitter}")
+
+    # Load config
+    typename      = deep_get(config_text_splitter, "type", "tiktoken_recursive")
+    chunk_size    = deep_get(config_text_splitter, "chunk_size", 500)
+    chunk_overlap = deep_get(config_text_splitter, "chunk_overlap", 50)
+    encoding_name = deep_get(config_text_splitter, "encoding_name", "cl100k_base")
+
+    # Action: Create instance (depending on type)
+    if typename == "tiktoken_recursive":
+        # chunk_size and chunk_overlap are measured in tokens
+        return RecursiveCharacterTextSplitter.from_tiktoken_encoder(
+            encoding_name=encoding_name,
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+        )
+    elif typename == "content_defined":
+        # chunk sizes are measured in characters, boundaries depend on the content (stable under local edits)
+        return ContentDefinedTextSplitter(
+            min_chunk_size=deep_get(config_text_splitter, "min_chunk_size", 500),
+            avg_chunk_size=deep_get(config_text_splitter, "avg_chunk_size", 2000),
+            max_chunk_size=deep_get(config_text_splitter, "max_chunk_size", 4000),
+        )
+    else:
+        raise ValueError(f"Unknown text splitter type: {typename} for text splitter '{key}': {config_text_splitter}")
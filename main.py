@@ -13,15 +13,20 @@ setup_logging()
 
 
 
-# start building the index
-from rag_index_service import build_index
-build_index.start_indexing()
+# Parser processes (see config.rag_loading.parsing) are started with "spawn",
+# they import this module as "__mp_main__" - and must not start the indexing and the server again
+if __name__ != "__mp_main__":
+    # start building the index (in the background - the API serves the existing index meanwhile)
+    from rag_index_service import build_index
+    build_index.start_indexing()
 
 
 # start server with API
-if True:
+if __name__ != "__mp_main__":
     from fastapi import FastAPI
+    from fastapi.responses import JSONResponse
     from fastapi.staticfiles import StaticFiles
+    from rag_index_service.sql_data_access_async import run_sql
     from exported_api import endpoints
     from exported_api import admin_endpoints
 
@@ -33,9 +38,16 @@ if True:
 
     @app.get("/health")
     # https://stackoverflow.com/questions/46949108/spec-for-http-health-checks/47119512#47119512
+    # liveness: the process is up (also while the first indexing round is running)
     def get_health():
         return {"status": "healthy"}
 
+    @app.get("/ready")
+    # readiness: the index can be used (HTTP 503 otherwise)
+    async def get_ready():
+        readiness = await run_sql(build_index.get_index_readiness)
+        return JSONResponse(content=readiness, status_code=200 if readiness["ready"] else 503)
+
     # /api/*
     app.include_router(endpoints.router)
 
@@ -1,4 +1,8 @@
-from typing import Iterator
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+from typing import Deque, Iterator, List, Optional, Tuple
 
 from langchain_core.documents import Document
 from langchain_core.documents.base import Blob
@@ -7,6 +11,9 @@ from langchain_community.document_loaders import BlobLoader
 from langchain_core.document_loaders import BaseLoader
 from langchain_core.documents import Document
 
+from rag_index_service.http_cache import UNCHANGED_METADATA_KEY
+from utils.blob_util import ingest_blob
+
 import logging
 
 
@@ -17,7 +24,13 @@ logger = logging.getLogger(__name__)
 class BlobParserDocumentLoader(BaseLoader):
     """An example document loader that reads a file line by line."""
 
-    def __init__(self, blobLoader: BlobLoader, blobParser: BaseBlobParser) -> None:
+    def __init__(
+        self,
+        blobLoader: BlobLoader,
+        blobParser: BaseBlobParser,
+        process_pool_size: int = 0,
+        parse_timeout_seconds: Optional[float] = None,
+    ) -> None:
         """Initialize the loader with a blobLoader and a blobParser.
 
         The blobLoader is used to load the files that are then parsed by the blobParser.
@@ -25,12 +38,18 @@ class BlobParserDocumentLoader(BaseLoader):
         Args:
             blobLoader: the blobLoader to load the files that are then parsed
             blobParser: the blobParser to parse the loaded files
+            process_pool_size: if > 0, blobs are parsed in a pool of this number of processes
+                               (instead of inline in the loader thread)
+            parse_timeout_seconds: max time to wait for the parsing result of a single blob
+                                   (only used with a process pool)
         """
         self.blobLoader = blobLoader
         self.blobParser = blobParser
+        self.process_pool_size = process_pool_size
+        self.parse_timeout_seconds = parse_timeout_seconds
 
     def __str__(self) -> str:
-        return f"BlobParserDocumentLoader(blobLoader: {self.blobLoader}, blobParser: {self.blobParser})"
+        return f"BlobParserDocumentLoader(blobLoader: {self.blobLoader}, blobParser: {self.blobParser}, process_pool_size: {self.process_pool_size})"
 
     def lazy_load(self) -> Iterator[Document]:  # <-- Does not take any arguments
         """
@@ -43,14 +62,143 @@ class BlobParserDocumentLoader(BaseLoader):
 
         logger.info(f"Downloading files with blobLoader: {self.blobLoader} and parsing them with blobParser: {self.blobParser}")
 
+        if self.process_pool_size > 0:
+            yield from self._lazy_load_with_process_pool()
+            return
+
         # Blob by blob
         for blob in self.blobLoader.yield_blobs():
+            # unchanged source: nothing to parse
+            if blob.metadata.get(UNCHANGED_METADATA_KEY):
+                yield _create_unchanged_document(blob)
+                continue
+
             # extract text from downloaded file
             logger.info(f"Blob to parse: {blob}")
 
+            # read the file once (content, hash, encoding) - if the blob only references it
+            blob = ingest_blob(blob)
+
             # parse
             documents = list(self.blobParser.lazy_parse(blob))
 
             # result
             logger.info(f"Extracted documents yielded now: {documents}")
             yield from documents
+
+    #
+    # parsing in a process pool
+    #
+
+    def _lazy_load_with_process_pool(self) -> Iterator[Document]:
+        """
+        Load blobs and parse them in a pool of processes (CPU-heavy parsers are not limited by the GIL).
+
+        The results are yielded in the order of the blobs. Max. 2*process_pool_size blobs are parsed
+        or waiting for parsing at the same time.
+        If a blob crashes a parser process or exceeds the timeout, the blob is skipped,
+        the pool is replaced and the other pending blobs are parsed again.
+        """
+        executor = self._create_process_pool()
+        # (blob, future, number of attempts)
+        pending: Deque[Tuple[Blob, Future, int]] = deque()
+        try:
+            for blob in self.blobLoader.yield_blobs():
+                if blob.metadata.get(UNCHANGED_METADATA_KEY):
+                    # unchanged source: nothing to parse (but keep the order)
+                    pending.append((blob, _create_done_future([_create_unchanged_document(blob)]), 1))
+                else:
+                    logger.info(f"Blob to parse (in process pool): {blob}")
+                    pending.append((blob, executor.submit(_parse_blob_in_parser_process, blob), 1))
+                while len(pending) >= 2 * self.process_pool_size:
+                    (documents, executor) = self._wait_for_first_pending_result(pending, executor)
+                    yield from documents
+
+            while len(pending) > 0:
+                (documents, executor) = self._wait_for_first_pending_result(pending, executor)
+                yield from documents
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _wait_for_first_pending_result(
+        self,
+        pending: Deque[Tuple[Blob, Future, int]],
+        executor: ProcessPoolExecutor,
+    ) -> Tuple[List[Document], ProcessPoolExecutor]:
+        """
+        Wait for the parsing result of the first pending blob.
+
+        Returns: (extracted documents, process pool to continue with)
+        """
+        (blob, future, attempts) = pending.popleft()
+        try:
+            documents = future.result(timeout=self.parse_timeout_seconds)
+            logger.info(f"Extracted documents yielded now: {documents}")
+            return (documents, executor)
+        except TimeoutError:
+            logger.warning(f"Parsing of blob timed out after {self.parse_timeout_seconds} seconds - blob skipped: {blob}")
+        except BrokenProcessPool as e:
+            if attempts < 2:
+                # maybe another blob crashed the pool: try again
+                logger.warning(f"Parser process pool crashed while parsing blob - trying again: {blob}: {e}")
+                pending.appendleft((blob, None, attempts + 1))
+            else:
+                logger.warning(f"Parser process pool crashed while parsing blob - blob skipped: {blob}: {e}")
+        except Exception as e:
+            logger.warning(f"Parsing of blob failed - blob skipped: {blob}: {e}")
+            return ([], executor)
+
+        # the pool is broken or a process is stuck: replace the pool and re-submit all pending blobs
+        self._terminate_process_pool(executor)
+        executor = self._create_process_pool()
+        for i in range(len(pending)):
+            (pending_blob, pending_future, pending_attempts) = pending[i]
+            if pending_blob.metadata.get(UNCHANGED_METADATA_KEY):
+                continue
+            pending[i] = (pending_blob, executor.submit(_parse_blob_in_parser_process, pending_blob), pending_attempts)
+        return ([], executor)
+
+    def _create_process_pool(self) -> ProcessPoolExecutor:
+        # "spawn" instead of "fork": forking a process with many running threads is not safe
+        return ProcessPoolExecutor(
+            max_workers=self.process_pool_size,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_parser_process,
+            initargs=(self.blobParser,),
+        )
+
+    @staticmethod
+    def _terminate_process_pool(executor: ProcessPoolExecutor) -> None:
+        # a stuck parser process would never finish by itself
+        # (there is no public API to terminate the processes of a ProcessPoolExecutor)
+        processes = list((getattr(executor, "_processes", None) or {}).values())
+        executor.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+
+def _create_unchanged_document(blob: Blob) -> Document:
+    # signal for the indexing: the source is unchanged (seen, but not processed again)
+    return Document(page_content="", metadata=dict(blob.metadata))
+
+def _create_done_future(result: List[Document]) -> Future:
+    future: Future = Future()
+    future.set_result(result)
+    return future
+
+
+#
+# functions executed in the parser processes
+#
+
+_parser_process_blob_parser: Optional[BaseBlobParser] = None
+
+def _init_parser_process(blobParser: BaseBlobParser) -> None:
+    global _parser_process_blob_parser
+    _parser_process_blob_parser = blobParser
+
+def _parse_blob_in_parser_process(blob: Blob) -> List[Document]:
+    # a blob that only references a file is read here, i.e. in the parser process
+    blob = ingest_blob(blob)
+    return list(_parser_process_blob_parser.lazy_parse(blob))
@@ -5,9 +5,25 @@
 from typing import TYPE_CHECKING
 import mimetypes
 
-from factory.document_loader_factory import get_document_loaders
+from factory.document_loader_factory import get_blob_parser_by_key, get_document_loader_by_key, get_document_loaders, get_file_system_watch_configs
 from langchain_core.document_loaders import BaseLoader
 from rag_index_service.blob_parser_document_loader import BlobParserDocumentLoader
+from rag_index_service.embedding_cache import EmbeddingCache
+from rag_index_service.file_system_watcher import FILE_CHANGED, FILE_DELETED, FileSystemWatcher
+from rag_index_service.http_cache import HTTP_CACHE_URL_METADATA_KEY, UNCHANGED_METADATA_KEY, HttpCache
+from rag_index_service.document_change_detector import DOCUMENT_UNCHANGED, DocumentChangeDetector
+from rag_index_service.index_garbage_collector import IndexGarbageCollector
+from rag_index_service.indexing_pipeline import IndexingPipeline, PipelineStage
+from rag_index_service.indexing_status import (
+    DOCUMENTS_PROCESSED, DOCUMENTS_UNCHANGED, EMBEDDING_CACHE_HITS, EMBEDDINGS_CALCULATED, EMBEDDINGS_REQUESTED,
+    NEAR_DUPLICATES_DROPPED, NEAR_DUPLICATES_LINKED, PARTS_PROCESSED, PARTS_REUSED,
+    get_indexing_status,
+)
+from rag_index_service.near_duplicate_index import (
+    NEAR_DUPLICATE_LINK, NEAR_DUPLICATE_LINKED_METADATA_KEY, SIMHASH_METADATA_KEY, NearDuplicateIndex, format_simhash,
+)
+from rag_index_service.sql_index_writer import SqlIndexWriter
+from rag_index_service.sql_schema_migrations import migrate_sql_database
 from rag_index_service.tools.default_blob_parser import DefaultBlobParser
 from rag_index_service.tools.wget_blob_loader import WgetBlobLoader
 if TYPE_CHECKING:
@@ -16,43 +32,72 @@ else:
     DBAPIConnection = any
     DBAPICursor = any
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import cache
 import threading
 import time
 from chromadb import GetResult
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_core.vectorstores import VectorStore
 import shortuuid
 from service.configloader import deep_get, settings
-from factory.sql_database_factory import get_sql_database_connection
+from factory.sql_database_factory import get_sql_database_connection, get_sql_dialect
+from factory.text_splitter_factory import get_text_splitter_for_content_type, get_text_splitters
 from factory.vectorstore_factory import get_vectorstore
-from factory.llm_factory import get_default_embeddings
+from factory.llm_factory import get_default_embeddings, get_default_embeddings_model_id
 from langchain_core.documents import Document
+from langchain_core.documents.base import Blob
 from langchain_core.embeddings import Embeddings
 from langchain_core.vectorstores import VectorStoreRetriever
 import logging
 
 from typing import (
     Any,
+    Callable,
+    ContextManager,
     Dict,
     Iterator,
     List,
     Optional,
+    Set,
     Tuple,
 )
 
-from utils.hash_util import sha256sum_str
+from utils.blob_util import ingest_file_as_blob
+from utils.encoding_util import detect_encoding
+from utils.hash_util import sha256sum_bytes, sha256sum_str
+from utils.list_util import batched
+from utils.queue_util import SizeBoundedQueue
 from utils.string_util import str_limit
+from utils.vectorstore_util import add_embedded_texts_to_vectorstore, get_existing_ids_in_vectorstore
 import queue
 
 logger = logging.getLogger(__name__)
 
-#sqlCon: DBAPIConnection | None = None
-sqlCon = None
+# the SQL tables are setup/updated once, before the first connection is used
+sqlDatabaseMigrated = False
+sqlDatabaseMigrationLock = threading.Lock()
 vectorStore: Optional[VectorStore] = None
 vectorStoreRetriever = None
 
-# in-memory queue of downloaded documents to process
-downloadedDocumentsToProcessQueue = queue.Queue()
+# in-memory queue of downloaded documents to process,
+# bounded by number of documents and by their (approximate) size in memory:
+# loaders block if the processing can't keep up (backpressure)
+downloadedDocumentsToProcessQueue = SizeBoundedQueue(
+    maxsize=deep_get(settings, "config.rag_loading.queue.max_documents", 256),
+    maxbytes=deep_get(settings, "config.rag_loading.queue.max_bytes", 64*1024*1024),
+    sizeof=lambda doc: len(doc.page_content),
+)
+
+def get_document_queue_metrics() -> Dict[str, int]:
+    """
+    Current depth and (approximate) size of the queue of downloaded documents to process.
+    """
+    return {
+        "depth": downloadedDocumentsToProcessQueue.qsize(),
+        "bytes": downloadedDocumentsToProcessQueue.bytes_size(),
+        "max_depth": downloadedDocumentsToProcessQueue.maxsize,
+        "max_bytes": downloadedDocumentsToProcessQueue.maxbytes,
+    }
 
 #
 # (Persitent) Data Model:
@@ -67,53 +112,77 @@ downloadedDocumentsToProcessQueue = queue.Queue()
 # and in the vectorstore DB.
 # Parts are identified and connected by their sha256 hash.
 #
-# setup if necessary
-
-# a document represents a a full file/document
-DB_TABLE_document = """CREATE TABLE IF NOT EXISTS document (
-                            id TEXT NOT NULL PRIMARY KEY,
-                            source TEXT NOT NULL,
-                            content_type TEXT NOT NULL,
-                            file_path TEXT,
-                            file_size INTEGER,
-                            file_sha256 TEXT,
-                            last_modified TEXT
-                    )"""
-# a (document) part represents a part of a document after splitting, e.g., a page, a paragraph, a part of a page
-DB_TABLE_part = """CREATE TABLE IF NOT EXISTS part (
-                       sha256 TEXT COMMENT "sha256 hash of the content of this part, also used as ID in the vectorstore" NOT NULL PRIMARY KEY,
-                       content TEXT NOT NULL
-                   )"""
-# connection between a document and its parts
-DB_TABLE_document_part = """CREATE TABLE IF NOT EXISTS document_part (
-                                document_id TEXT NOT NULL,
-                                part_sha256 TEXT NOT NULL,
-                                anker TEXT COMMENT "position of the part in the document - e.g., page number, paragraph number, ..."
-                            )"""
+# The tables are created/updated by the schema migrations in sql_schema_migrations.py.
 
 
 
 
 indexing_single_run_counter = 0
 
+# full indexing rounds and the immediate processing of documents (watched file changes, ingestion API)
+# don't run at the same time
+indexingLock = threading.RLock()
+
 def get_indexing_single_run_counter():
     global indexing_single_run_counter
     return indexing_single_run_counter
 
+def get_indexing_status_snapshot() -> Dict[str, Any]:
+    """
+    Live status of the indexing: current/last round, loaders, counters, queue depths and pipeline stage timings.
+    """
+    snapshot = get_indexing_status().get_snapshot()
+    snapshot["completed_rounds_since_start"] = get_indexing_single_run_counter()
+    return snapshot
+
 # main function,
-# wait/block until for the first round to finish
+# returns immediately: the (persisted) index is used as it is, the indexing runs in the background
 def start_indexing():
+    # setup the text splitters once (fail early in the case of configuration errors)
+    get_text_splitters()
+
     # start new thread with endless loop
 
     # turn-on the worker thread
     threading.Thread(target=indexing_endless_loop_worker, daemon=False).start()
 
-    # wait for the first round to finish
-    while get_indexing_single_run_counter() < 1:
-        time.sleep(1)
+    # index file changes between the rounds
+    start_watching_file_systems()
+
+    logger.info("Indexing is now running in the background.")
 
-    # first round done
-    logger.info("First indexing round done. Indexing is now running in the background.")
+
+def get_index_readiness() -> Dict[str, Any]:
+    """
+    Check whether the index can be used to answer requests:
+    it's ready if it contains documents (e.g. persisted by a previous run) or the first round since start is done.
+    Blocking (SQL query).
+
+    Returns: {"ready": bool, "index_state": ..., ...}
+    """
+    completed_rounds = get_indexing_single_run_counter()
+    try:
+        with get_sql_database_connection_after_setup() as sqlCon:
+            cur = sqlCon.cursor()
+            cur.execute("SELECT COUNT(*) FROM document")
+            num_documents = cur.fetchone()[0]
+            cur.close()
+    except Exception as e:
+        return {"ready": False, "index_state": "sql_database_unavailable", "error": str(e), "completed_rounds_since_start": completed_rounds}
+
+    if completed_rounds > 0:
+        index_state = "indexed_since_start"
+    elif num_documents > 0:
+        index_state = "existing_index_first_round_running"
+    else:
+        index_state = "empty_first_round_running"
+    return {
+        "ready": completed_rounds > 0 or num_documents > 0,
+        "index_state": index_state,
+        "documents": num_documents,
+        "completed_rounds_since_start": completed_rounds,
+        "current_round": get_indexing_status().get_snapshot()["current_round"]["round_number"],
+    }
 
 
 def indexing_endless_loop_worker():
@@ -124,7 +193,8 @@ def indexing_endless_loop_worker():
         starttime = time.time()
 
         # action
-        indexing_single_run()
+        with indexingLock:
+            indexing_single_run()
 
         # finish this round
         now = time.time()
@@ -147,66 +217,429 @@ def indexing_single_run():
     by using a queue and separated threads.
     """
 
+    # start a new persistent round (for the garbage collection)
+    indexGarbageCollector = get_index_garbage_collector()
+    round_number = indexGarbageCollector.start_round(started_at=_now_str())
+    indexingStatus = get_indexing_status()
+    indexingStatus.start_round(round_number)
+    indexingStatus.set_provider("document_queue", get_document_queue_metrics)
+    indexingStatus.set_provider("sql_writer", lambda: {"pending_units": get_sql_index_writer().pending_units()})
+    if get_near_duplicate_index() is not None:
+        indexingStatus.set_provider("near_duplicate_index", get_near_duplicate_index().get_stats)
+
     # start the worker thread to crawl/load all documents
-    threading.Thread(target=download_all_documents_and_put_them_into_queue, args=(), daemon=False).start()
+    loading_result: Dict[str, Any] = {}
+    loading_thread = threading.Thread(target=download_all_documents_and_put_them_into_queue, args=(loading_result,), daemon=False)
+    loading_thread.start()
 
     # process all documents from the queue
-    process_all_documents_from_queue_worker()
+    documentChangeDetector = DocumentChangeDetector(get_connection=get_sql_database_connection_after_setup)
+    process_all_documents_from_queue_worker(documentChangeDetector)
 
     # wait until all documents are completely processed
     #downloadedDocumentsToProcessQueue.join()
     # NOT NEEDED: everything will finish by itself when done
 
+    # mark all sources seen in this round, and cleanup
+    loading_thread.join()
+    indexingStatus.set_round_state("garbage_collection")
+    indexGarbageCollector.mark_sources_seen(round_number, documentChangeDetector.get_seen_sources())
+    collect_garbage(indexGarbageCollector, round_number, loading_result.get("failed_loaders", []))
+    indexGarbageCollector.finish_round(round_number, finished_at=_now_str())
+
+    # wait until all SQL writes of this round are committed
+    indexingStatus.set_round_state("committing")
+    get_sql_index_writer().flush()
+    indexingStatus.finish_round()
+
     # single run done
     logger.info(f"===== indexing_single_run() RESULTS (#{indexing_single_run_counter}) =====")
-    printall()
+    logger.info(f"Documents: {documentChangeDetector}")
+    logger.info(f"Status: {indexingStatus}")
+    if logger.isEnabledFor(logging.DEBUG):
+        # reads the complete SQL DB
+        printall()
     logger.info(f"===== indexing_single_run() END (#{indexing_single_run_counter}) =====")
     indexing_single_run_counter += 1
 
 
-def download_all_documents_and_put_them_into_queue():
+#
+# watch mode: index changed files between the rounds
+#
+
+def start_watching_file_systems() -> List[FileSystemWatcher]:
+    """
+    Start watching the directories of all file system loaders with watch mode (config.rag_loading.watch).
+    """
+    watchers: List[FileSystemWatcher] = []
+    for watch_config in get_file_system_watch_configs():
+        watcher = FileSystemWatcher(
+            path=watch_config["path"],
+            on_changes=lambda changes, key=watch_config["key"]: process_file_changes(key, changes),
+            glob=watch_config["glob"],
+            exclude=watch_config["exclude"],
+            suffixes=watch_config["suffixes"],
+            debounce_seconds=watch_config["debounce_seconds"],
+            poll_interval_seconds=watch_config["poll_interval_seconds"],
+        )
+        watcher.start()
+        watchers.append(watcher)
+    return watchers
+
+
+def process_file_changes(loader_key: str, changes: Dict[str, str]):
+    """
+    Index the changed files and remove the deleted files (of a watched file system loader),
+    with the same processing as in the full rounds.
+
+    Args:
+        loader_key: key of the loader in config.rag_loading.loaders
+        changes: {source (file path): FILE_CHANGED|FILE_DELETED}
+    """
+    context_str = f"watch {loader_key}"
+    changed_sources = [source for (source, change) in changes.items() if change == FILE_CHANGED]
+    deleted_sources = [source for (source, change) in changes.items() if change == FILE_DELETED]
+    logger.info(f"== process_file_changes({context_str}) - START - {len(changed_sources)} changed, {len(deleted_sources)} deleted file(s)")
+
+    with indexingLock:
+        # deleted files
+        for source in deleted_sources:
+            get_sql_index_writer().submit(
+                lambda cur, source=source: delete_documents_of_source_in_sqldb(cur, source),
+                f"delete documents of deleted file source={source}"
+            )
+
+        # changed files
+        def parse_changed_files() -> Iterator[Document]:
+            blobParser = get_blob_parser_by_key(loader_key)
+            for source in changed_sources:
+                try:
+                    docs = list(blobParser.lazy_parse(ingest_file_as_blob(source)))
+                except Exception as e:
+                    logger.warning(f"Parsing of changed file failed - skipped: {source}: {e}")
+                    continue
+                yield from docs
+        process_documents_immediately(context_str, parse_changed_files)
+
+    logger.info(f"== process_file_changes({context_str}) - END")
+
+
+#
+# immediate processing of documents (outside of the full rounds)
+#
+
+def process_documents_immediately(
+    context_str: str,
+    produce_documents: Callable[[], Iterator[Document]],
+    force_changed: bool = False,
+    externally_owned: bool = False,
+) -> Dict[str, int]:
+    """
+    Process documents immediately - with the same pipeline as in the full rounds -
+    wait until they are committed and remove parts that are not used anymore.
+
+    Blocks while a full round is running (and vice versa).
+
+    Args:
+        context_str: description for logging and the indexing status (like a loader name)
+        produce_documents: function that loads/parses the documents - called in a separate thread
+        force_changed: if True, unchanged documents are processed again
+        externally_owned: if True, the sources are not loaded by any loader (e.g. pushed with the ingestion API),
+                          i.e. they must never be swept by the garbage collection
+
+    Returns: counters of the change detection (new/changed/unchanged documents)
+    """
+    with indexingLock:
+        logger.info(f"== process_documents_immediately({context_str}) - START")
+        indexingStatus = get_indexing_status()
+
+        # load the documents (in a separate thread) and process them with the pipeline
+        documents_queue = queue.Queue(maxsize=_get_pipeline_stage_config("split", "queue_size", 16))
+        def load_documents():
+            indexingStatus.loader_started(context_str)
+            try:
+                for doc in produce_documents():
+                    documents_queue.put(doc)
+                    indexingStatus.loader_document_loaded(context_str)
+                indexingStatus.loader_finished(context_str)
+            except Exception as e:
+                logger.warning(f"== process_documents_immediately({context_str}) - loading failed: {e}")
+                indexingStatus.loader_finished(context_str, error=str(e))
+            finally:
+                documents_queue.put(None)
+        loading_thread = threading.Thread(target=load_documents, daemon=True)
+        loading_thread.start()
+
+        # fresh change detector: the previous round must not decide about these documents
+        documentChangeDetector = DocumentChangeDetector(get_connection=get_sql_database_connection_after_setup, force_changed=force_changed)
+        create_indexing_pipeline(documents_queue, documentChangeDetector).run()
+        loading_thread.join()
+
+        # commit, and remove parts that are not used anymore
+        if externally_owned:
+            get_index_garbage_collector().mark_sources_externally_owned(documentChangeDetector.get_seen_sources())
+        get_sql_index_writer().flush()
+        if deep_get(settings, "config.rag_indexing.garbage_collection.enabled", True):
+            collect_orphaned_parts(get_index_garbage_collector())
+
+        logger.info(f"== process_documents_immediately({context_str}) - END - Documents: {documentChangeDetector}")
+        return dict(documentChangeDetector.counters)
+
+
+def reindex_loader(loader_key: str, source: Optional[str] = None) -> Dict[str, int]:
+    """
+    Run a configured loader now and process its documents again (even if unchanged).
+
+    Args:
+        loader_key: key of the loader in config.rag_loading.loaders
+        source: if set, only the documents of this source (file path/URL) are processed
+
+    Returns: counters of the change detection (new/changed/unchanged documents)
+    """
+    document_loader = get_document_loader_by_key(loader_key)
+
+    def load_documents() -> Iterator[Document]:
+        if source is None:
+            yield from document_loader.lazy_load()
+        elif isinstance(document_loader, BlobParserDocumentLoader):
+            # parse only the blob of the source
+            for blob in document_loader.blobLoader.yield_blobs():
+                if blob.source == source:
+                    yield from document_loader.blobParser.lazy_parse(blob)
+        else:
+            for doc in document_loader.lazy_load():
+                if doc.metadata.get("source") == source:
+                    yield doc
+
+    return process_documents_immediately(f"reindex {loader_key}", load_documents, force_changed=True)
+
+
+def ingest_uploaded_files(files: List[Tuple[str, Optional[str], bytes, Dict[str, Any]]]) -> Dict[str, int]:
+    """
+    Parse uploaded files and process their documents now.
+
+    Args:
+        files: (source, content type or None, file content, additional metadata) per file
+
+    Returns: counters of the change detection (new/changed/unchanged documents)
+    """
+    def parse_uploaded_files() -> Iterator[Document]:
+        blobParser = DefaultBlobParser()
+        for (source, content_type, data, metadata) in files:
+            mime_type = content_type or mimetypes.guess_type(source)[0]
+            file_sha256 = sha256sum_bytes(data)
+            blob = Blob.from_data(
+                data,
+                encoding=detect_encoding(data, mime_type, file_sha256=file_sha256),
+                mime_type=mime_type,
+                path=source,
+                metadata={**metadata, "source": source, "file_size": len(data), "file_sha256": file_sha256},
+            )
+            try:
+                yield from blobParser.lazy_parse(blob)
+            except Exception as e:
+                logger.warning(f"Parsing of uploaded file failed - skipped: {source}: {e}")
+
+    return process_documents_immediately("upload", parse_uploaded_files, externally_owned=True)
+
+
+def ingest_texts(texts: List[Tuple[str, Dict[str, Any]]]) -> Dict[str, int]:
+    """
+    Process text documents now.
+
+    Args:
+        texts: (text, metadata with at least "source") per document
+
+    Returns: counters of the change detection (new/changed/unchanged documents)
+    """
+    def create_documents() -> Iterator[Document]:
+        for (text, metadata) in texts:
+            yield Document(
+                page_content=text,
+                metadata={"content_type": "text/plain", "file_size": len(text), "file_sha256": sha256sum_str(text), **metadata},
+            )
+
+    return process_documents_immediately("upload", create_documents, externally_owned=True)
+
+
+def collect_garbage(indexGarbageCollector: IndexGarbageCollector, round_number: int, failed_loaders: List[str]):
+    """
+    Sweep documents of sources not seen for config.rag_indexing.garbage_collection.sweep_after_rounds rounds
+    and delete parts that are not used by any document anymore.
+
+    Sources are not swept after a round with failed loaders (their sources are probably just not seen).
+    """
+    if not deep_get(settings, "config.rag_indexing.garbage_collection.enabled", True):
+        return
+    sweep_after_rounds = deep_get(settings, "config.rag_indexing.garbage_collection.sweep_after_rounds", 3)
+
+    get_sql_index_writer().flush()
+    if len(failed_loaders) == 0:
+        num_swept = indexGarbageCollector.sweep_unseen_sources(round_number, sweep_after_rounds)
+        logger.info(f"Garbage collection: {num_swept} source(s) swept (not seen for {sweep_after_rounds} rounds)")
+    else:
+        logger.warning(f"Garbage collection: sweep of sources skipped because of failed loaders: {failed_loaders}")
+    collect_orphaned_parts(indexGarbageCollector)
+
+
+def collect_orphaned_parts(indexGarbageCollector: IndexGarbageCollector) -> None:
+    """
+    Delete the parts that are not used by any document anymore - and forget them in the near-duplicate index.
+    """
+    num_deleted = indexGarbageCollector.collect_orphaned_parts()
+    logger.info(f"Garbage collection: {num_deleted} orphaned part(s) deleted")
+    nearDuplicateIndex = get_near_duplicate_index()
+    if nearDuplicateIndex is not None and num_deleted > 0:
+        nearDuplicateIndex.reset()
+
+
+def _now_str() -> str:
+    return time.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def download_all_documents_and_put_them_into_queue(loading_result: Dict[str, Any]):
+    """
+    Run all configured document loaders concurrently (max. config.rag_loading.max_parallel_loaders at once),
+    each of them puts its documents into the shared queue.
+    The end signal is put into the queue after all loaders are finished.
+
+    The names of failed loaders are reported in loading_result["failed_loaders"].
+    """
+    loading_result["failed_loaders"] = []
     logger.info(f"== download_all_documents_and_put_them_into_queue(): Loading ...")
     document_loaders: List[BaseLoader] = get_document_loaders()
-    for document_loader in document_loaders:
-        # one (document) loader from the config
-        document_loader_info_str = str(document_loader)
-        docs = document_loader.lazy_load()
-        put_downloaded_documents_into_queue(document_loader_info_str, docs)
-    logger.info(f"== download_all_documents_and_put_them_into_queue(): Lazy loading + putting into queue ... {str_limit(docs, 1024)}")
-
-    # Add end signal to queue to finisj this loading round
+    max_parallel_loaders = deep_get(settings, "config.rag_loading.max_parallel_loaders", 4)
+
+    with ThreadPoolExecutor(max_workers=max(1, max_parallel_loaders), thread_name_prefix="indexing-loader") as executor:
+        futures = {executor.submit(load_documents_and_put_them_into_queue, document_loader): document_loader
+                   for document_loader in document_loaders}
+        for future in as_completed(futures):
+            # one (document) loader from the config is done
+            document_loader_info_str = str(futures[future])
+            try:
+                num_docs = future.result()
+                logger.info(f"== download_all_documents_and_put_them_into_queue(): {document_loader_info_str} done with {num_docs} documents")
+            except Exception as e:
+                logger.warning(f"== download_all_documents_and_put_them_into_queue(): {document_loader_info_str} failed: {e}")
+                loading_result["failed_loaders"].append(document_loader_info_str)
+    logger.info(f"== download_all_documents_and_put_them_into_queue(): All {len(document_loaders)} loaders done")
+
+    # Add end signal to queue to finish this loading round
     downloadedDocumentsToProcessQueue.put(None)
 
+
+def load_documents_and_put_them_into_queue(document_loader: BaseLoader) -> int:
+    """
+    Run a single (document) loader and put its documents into the queue.
+
+    Returns: number of documents
+    """
+    document_loader_info_str = str(document_loader)
+    indexingStatus = get_indexing_status()
+    indexingStatus.loader_started(document_loader_info_str)
+    try:
+        docs = document_loader.lazy_load()
+        num_docs = put_downloaded_documents_into_queue(document_loader_info_str, docs)
+    except Exception as e:
+        indexingStatus.loader_finished(document_loader_info_str, error=str(e))
+        raise
+    indexingStatus.loader_finished(document_loader_info_str)
+    return num_docs
+
     
-def put_downloaded_documents_into_queue(context_str: str, docs: Iterator[Document]):
+def put_downloaded_documents_into_queue(context_str: str, docs: Iterator[Document]) -> int:
     logger.info(f"== put_all_downloaded_document_into_queue() - START {context_str} ...")
+    indexingStatus = get_indexing_status()
     counter = 0
     for doc in docs:
+        # blocks while the queue is full
         downloadedDocumentsToProcessQueue.put(doc)
+        indexingStatus.loader_document_loaded(context_str)
         counter += 1
+        if counter % 100 == 0:
+            logger.info(f"== put_all_downloaded_document_into_queue() - {context_str} ... {counter} documents so far, queue={get_document_queue_metrics()}")
     logger.info(f"== put_all_downloaded_document_into_queue() - END {context_str} ... after {counter} documents")
+    return counter
+
 
+def process_all_documents_from_queue_worker(documentChangeDetector: DocumentChangeDetector):
+    """
+    Process all documents from the queue with a staged pipeline:
+
+      (parse: loader threads) -> detect changes -> split/hash -> embed -> write (SQL index writer)
 
-def process_all_documents_from_queue_worker():
+    Each stage has its own worker threads and a bounded input queue
+    (config.rag_indexing.pipeline.<stage>.workers/.queue_size).
+    """
     logger.info("== process_all_documents_in_queue_worker(): Split and save documents in databases - START")
 
-    while True:
-        # get next document from queue
-        logger.info(f"Next doc from queue: Take it now (queue len={downloadedDocumentsToProcessQueue.qsize()}) ... (blocking) ...")
-        doc = downloadedDocumentsToProcessQueue.get()
-        if doc is None:
-            # end signal
-            logger.info("Next doc from queue: No more documents in queue (and no more will come)")
-            downloadedDocumentsToProcessQueue.task_done()
-            break
-        else:
-            # normal processing
-            logger.info(f"Next doc from queue: Got it")
-            doc = _enrich_document(doc)
-            process_single_document_and_store_results_in_databases(doc)
-            downloadedDocumentsToProcessQueue.task_done()
+    pipeline = create_indexing_pipeline(downloadedDocumentsToProcessQueue, documentChangeDetector)
+    get_indexing_status().set_provider("pipeline_stages", pipeline.get_stats)
+    pipeline.run()
+
+    logger.info(f"== process_all_documents_in_queue_worker(): Split and save documents in databases - END - {pipeline}")
+
+
+def create_indexing_pipeline(input_queue: queue.Queue, documentChangeDetector: DocumentChangeDetector) -> IndexingPipeline:
+    def detect(doc: Document) -> Optional[Document]:
+        logger.debug(f"Next doc from queue: queue={get_document_queue_metrics()}")
+        if doc.metadata.get(UNCHANGED_METADATA_KEY):
+            _confirm_unchanged_source(documentChangeDetector, doc)
+            return None
+        doc = _enrich_document(doc)
+        if not _detect_document_change(documentChangeDetector, doc):
+            return None
+        return doc
+
+    def split(doc: Document) -> Tuple[Document, List[Document]]:
+        doc_splits = split_single_document_into_parts(doc)
+        logger.debug(f"split: source={doc.metadata['source']} -> {len(doc_splits)} part(s)")
+        return (doc, doc_splits)
+
+    # Sources with a document whose parts couldn't be embedded/stored (the document is dropped):
+    # their other documents are stored without file_sha256/last_modified, so the change detection
+    # of the next round processes the whole source again.
+    failed_sources: Set[str] = set()
+    failed_sources_lock = threading.Lock()
+
+    def embed(doc_and_parts: Tuple[Document, List[Document]]) -> Tuple[Document, List[Document]]:
+        (doc, doc_splits) = doc_and_parts
+        try:
+            return (doc, save_single_document_parts_in_vectorstore(doc, doc_splits))
+        except Exception:
+            source = doc.metadata["source"]
+            with failed_sources_lock:
+                failed_sources.add(source)
+                # (documents of the source that were written before)
+                get_sql_index_writer().submit(
+                    lambda cur: mark_documents_of_source_incomplete_in_sqldb(cur, source),
+                    f"mark documents of source={source} as incomplete"
+                )
+            raise
+
+    def write(doc_and_parts: Tuple[Document, List[Document]]) -> None:
+        (doc, doc_parts_stored) = doc_and_parts
+        with failed_sources_lock:
+            incomplete = doc.metadata["source"] in failed_sources
+            submit_single_document_and_its_parts_to_sqldb(doc, doc_parts_stored, incomplete=incomplete)
+        return None
+
+    # Change detection runs in a single worker: the first document of a source
+    # must submit the deletion of the old version before any other document of this source is written.
+    detect_to_split_queue = queue.Queue(maxsize=_get_pipeline_stage_config("split", "queue_size", 16))
+    split_to_embed_queue  = queue.Queue(maxsize=_get_pipeline_stage_config("embed", "queue_size", 16))
+    embed_to_write_queue  = queue.Queue(maxsize=_get_pipeline_stage_config("write", "queue_size", 16))
+    return IndexingPipeline([
+        PipelineStage("detect", detect, 1, input_queue, detect_to_split_queue),
+        PipelineStage("split", split, _get_pipeline_stage_config("split", "workers", 2), detect_to_split_queue, split_to_embed_queue),
+        PipelineStage("embed", embed, _get_pipeline_stage_config("embed", "workers", 4), split_to_embed_queue, embed_to_write_queue),
+        PipelineStage("write", write, 1, embed_to_write_queue, None),
+    ])
+
+
+def _get_pipeline_stage_config(stage_name: str, key: str, default_value: int) -> int:
+    return int(deep_get(settings, f"config.rag_indexing.pipeline.{stage_name}.{key}", default_value))
 
-    logger.info("== process_all_documents_in_queue_worker(): Split and save documents in databases - END")
 
 def _enrich_document(doc: Document) -> Document:
     """
@@ -224,6 +657,50 @@ def _enrich_document(doc: Document) -> Document:
 
     return doc
 
+def _detect_document_change(documentChangeDetector: DocumentChangeDetector, doc: Document) -> bool:
+    """
+    Compare the document with the version already stored in the SQL DB.
+
+    For the first document of a new/changed source, the old version of the source is deleted
+    (the delete is submitted before any new document of this source can be written).
+
+    Returns: True if the document must be processed (split, embedded, saved), False if it is unchanged
+    """
+    (change, is_first_document_of_source) = documentChangeDetector.check_document(doc)
+    if change == DOCUMENT_UNCHANGED:
+        logger.info(f"Document unchanged - skipped: source={doc.metadata['source']}")
+        get_indexing_status().count(DOCUMENTS_UNCHANGED)
+        return False
+
+    if is_first_document_of_source:
+        source = doc.metadata["source"]
+        get_sql_index_writer().submit(
+            lambda cur: delete_documents_of_source_in_sqldb(cur, source),
+            f"delete documents of source={source}"
+        )
+    return True
+
+def _confirm_unchanged_source(documentChangeDetector: DocumentChangeDetector, doc: Document):
+    """
+    Handle the signal of an unchanged source (e.g. HTTP 304) - the content wasn't loaded again:
+    the source is marked as seen (by the detector), nothing is processed.
+
+    If the stored documents of the source don't match (e.g. their processing failed last time),
+    the HTTP cache record is removed, i.e. the source is loaded completely in the next round.
+    """
+    (change, _) = documentChangeDetector.check_document(doc)
+    if change == DOCUMENT_UNCHANGED:
+        logger.debug(f"Document unchanged (not loaded again) - skipped: source={doc.metadata['source']}")
+        get_indexing_status().count(DOCUMENTS_UNCHANGED)
+        return
+
+    logger.warning(f"Source signaled as unchanged, but not (completely) in the index - reloaded in the next round: source={doc.metadata['source']}")
+    http_cache_url = doc.metadata.get(HTTP_CACHE_URL_METADATA_KEY)
+    httpCache = get_http_cache()
+    if http_cache_url is not None and httpCache is not None:
+        httpCache.invalidate(http_cache_url)
+
+
 #
 # processing multiple documents
 #
@@ -242,32 +719,9 @@ def run_all_document_loaders() -> Iterator[Document]:
 # processing a single document
 #
 
-def process_single_document_and_store_results_in_databases(doc: Document):
-    """
-    Process (load and split) a single document and store (and index) the results in the SQL DB and the vectorstore.
-
-    NOT LAZY: The document is processed and saved in the SQL DB and the vectorstore.
-    """
-
-    logger.info(f"process_single_document_and_store_results_in_databases(doc={str_limit(doc)} ...")
-
-    # split doc into parts
-    doc_splits = split_single_document_into_parts(doc)
-    logger.info(f"process_single_document_and_store_results_in_databases: ")
-    for doc_split in doc_splits:
-        logger.info(f"  doc_split.metadata={str_limit(doc_split.metadata, 1024)} doc_split.page_content={str_limit(doc_split.page_content   )}")
-
-    # save doc in SQL DB and in vectorstore
-    save_single_document_and_its_parts_in_databases(doc, doc_splits)
-
-    logger.info(f"process_single_document_and_store_results_in_databases(doc={str_limit(doc)} ... DONE")
-
-
 def split_single_document_into_parts(doc: Document) -> List[Document]:
-    # Split
-    text_splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
-        chunk_size=500, chunk_overlap=50
-    )
+    # Split (with the shared text splitter for the content type)
+    text_splitter = get_text_splitter_for_content_type(doc.metadata.get("content_type"))
     doc_splits = text_splitter.split_documents([doc])
 
     # add metadata
@@ -278,208 +732,478 @@ def split_single_document_into_parts(doc: Document) -> List[Document]:
     return doc_splits
 
 
-def save_single_document_and_its_parts_in_databases(doc: Document, doc_parts: Iterator[Document]) -> Tuple[Document, Iterator[Document]]:
+def save_single_document_parts_in_vectorstore(doc: Document, doc_parts: Iterator[Document]) -> List[Document]:
     """
-    Save a single document and its parts in the SQL DB and the vectorstore.
+    Assign an ID to the document and save its parts in the vectorstore.
 
-    NOT LAZY: The document and its parts are processed and saved in the SQL DB and the vectorstore.
+    Returns: the parts that are stored in the vectorstore now
     """
-    # save doc in SQL DB
-    doc_stored = save_docs_in_sqldb([doc])
-    doc_stored_done = list(doc_stored)[0]
-    document_id = doc_stored_done.metadata["id"]
+    # create uuid
+    id = "doc-"+str(shortuuid.uuid()[:7])
+    doc.metadata["id"] = id
+    doc.metadata["document_id"] = id
 
-    # save doc parts in SQL DB and vectorstore
+    # save doc parts in vectorstore
     doc_parts_list = list(doc_parts)
-    doc_parts_stored = save_doc_parts_in_vectorstore_and_sqldb(document_id, doc_parts_list)
-    # un-lazy
-    doc_parts_stored_done = list(doc_parts_stored)
+    stored_part_sha256s = save_parts_of_single_document_in_vectorstore(doc_parts_list)
+    doc_parts_stored = [doc_part for doc_part in doc_parts_list
+                        if doc_part.metadata["part_sha256"] in stored_part_sha256s]
+    for doc_part in doc_parts_stored:
+        doc_part.metadata["document_id"] = id
 
-    return doc_stored, doc_parts_stored_done  #doc_parts_stored
+    return doc_parts_stored
 
 
-# iterate over the documents, save them in SQL DB, and add IDs
-def save_docs_in_sqldb(docs_list: Iterator[Document]) -> Iterator[Document]:
-    logger.info(f"save_docs_in_sqldb ...")
-    
-    sqlCon = get_sql_database_connection_after_setup()
-
-    # insert documents (a document represents a a full file/document)
-    num = 0
-    for doc in docs_list:
-        logger.info(f"save_docs_in_sqldb: doc.metadata={str_limit(doc.metadata, 1024)} doc.page_content={str_limit(doc.page_content)}")
-
-        # create uuid and more
-        id = "doc-"+str(shortuuid.uuid()[:7])
-        #id =       str(shortuuid.uuid()[:7])
-        logger.info(f"doc.metadata={doc.metadata}")
-        source = doc.metadata['source']
-        content_type = doc.metadata.get("content_type")
-        file_path = doc.metadata.get("file_path")
-        file_size = doc.metadata.get("file_size")
-        file_sha256 = doc.metadata.get("file_sha256")
-        last_modified = doc.metadata.get("last_modified")
-
-        # Is the source already in the DB? Then delete related entries first
-        # Attention: the order of deletion is important!
-        cur = sqlCon.cursor()
-        cur.execute("DELETE FROM document_part WHERE document_id IN (SELECT id FROM document WHERE source=?)", (source,))
-        rowcount = cur.rowcount
-        logger.info(f"Deleted {rowcount} row(s) for source={source} from 'document_part' table")
-        cur.close()
-        
-        cur = sqlCon.cursor()
-        cur.execute("DELETE FROM document WHERE source=?", (source,))
-        rowcount = cur.rowcount
-        sqlCon.commit()
-        logger.info(f"Deleted {rowcount} row(s) with source={source} from 'document' table")
-        cur.close()
-        sqlCon.commit()
-        
-        if False:
-            # update row
-            logger.info("UPDATE documents SET url = ?, file_path = ?, content = ?, last_modified = ? WHERE id = ?", (doc.metadata.url, doc.page_content, doc.metadata))
-        # else
-        else:
-            # inser row
-            logger.info(f"insert document row: id={id}, source={source}")
-            num += 1
-            sqlCon.execute(
-                """INSERT INTO document (id, source, content_type, file_path, file_size, file_sha256, last_modified)
-                                 VALUES (?, ?, ?, ?, ?, ?, ?)""",
-                (id, source, content_type, file_path, file_size, file_sha256, last_modified)
-            )
-            sqlCon.commit()
+def submit_single_document_and_its_parts_to_sqldb(doc: Document, doc_parts_stored: List[Document], incomplete: bool = False):
+    """
+    Submit all SQL writes of the document and its (stored) parts as one unit of work to the SQL index writer.
+
+    Args:
+        incomplete: True if other documents of the source failed - see write_single_document_and_its_parts_in_sqldb()
+    """
+    id = doc.metadata["id"]
+    source = doc.metadata['source']
+    get_sql_index_writer().submit(
+        lambda cur: write_single_document_and_its_parts_in_sqldb(cur, doc, doc_parts_stored, incomplete),
+        f"document id={id}, source={source}",
+        on_commit=lambda: add_committed_parts_to_near_duplicate_index(doc_parts_stored)
+    )
+    indexingStatus = get_indexing_status()
+    indexingStatus.count(DOCUMENTS_PROCESSED)
+    indexingStatus.count(PARTS_PROCESSED, len(doc_parts_stored))
 
 
-        doc.metadata["id"] = id
-        doc.metadata["document_id"] = id
-        yield doc
-    
-    # iteration done
-    logger.info(f"save_docs_in_sqldb: {num} row(s) inserted - DONE")
-
-
-# iterate over the document parts, save them in SQL DB, and add IDs
-def save_doc_parts_in_vectorstore_and_sqldb(document_id: str, doc_parts_list: Iterator[Document]) -> Iterator[Document]:
-    # TODO: split (maybe slit doc by dock in a yield loop to remain reative)
-        # save doc with all chunks in SQL DB
-        # save all chunks in SQL DB
-        # save all chunks in vectorstore
-
-    logger.info(f"save_doc_parts_in_vectorstore_and_sqldb (document_id={document_id}) ...")
-
-    # insert (document) parts
-    sqlCon = get_sql_database_connection_after_setup()
-    parts_num = 0
-    document_parts_num = 0
-    for doc_part in doc_parts_list:
-        logger.info(f"save_doc_parts_in_vectorstore_and_sqldb: doc_part.metadata={str_limit(doc_part.metadata, 1024)} doc_part.page_content={str_limit(doc_part.page_content)}")
-
-        # extract anker from metadata
-        anker = None
-        if "anker" in doc_part.metadata:
-            anker = doc_part.metadata['anker']
-        elif "page_number" in doc_part.metadata:
-            anker = f"page {doc_part.metadata['page_number']}"
-        elif "start_index" in doc_part.metadata:
-            anker = doc_part.metadata['start_index']
-
-        #
-        # save part in vectorstore and SQL DB (if not already there)
-        #
-        part_sha256 = save_single_part_of_single_document_in_vectorstore_and_sqldb(doc_part)
-
-        #
-        # insert "document_part" - OR NOT (TODO: check if part already exists)
-        #
-        if False:
-            # update row
-            logger.info("UPDATE document_part SET url = ?, file_path = ?, content = ?, last_modified = ? WHERE id = ?", (doc.metadata.url, doc.page_content, doc.metadata))
-        # else
-        else:
-            # insert row
-            logger.info(f"insert document_part row: document_id={document_id}, part_sha256={part_sha256}, anker={anker}")
-            document_parts_num += 1
-            sqlCon.execute(
-                """INSERT INTO document_part (document_id, part_sha256, anker)
-                                      VALUES (?, ?, ?)""",
-                (document_id, part_sha256, anker)
-            )
-            sqlCon.commit()
+def write_single_document_and_its_parts_in_sqldb(cur: DBAPICursor, doc: Document, doc_parts: List[Document], incomplete: bool = False):
+    """
+    Execute all SQL statements to save a single document and its parts (without commit):
+    insert the document, its document_part rows and the new part rows.
 
-        doc_part.metadata["document_id"] = document_id
-        doc_part.metadata["part_sha256"] = part_sha256
-        yield doc_part
-    
-    # iteration done
-    logger.info(f"save_doc_parts_in_vectorstore_and_sqldb: {document_parts_num} document_part row(s) and {parts_num} part row(s) inserted - DONE")
+    If the source is incomplete (other documents of it failed), file_sha256 and last_modified are not stored,
+    i.e. the source is detected as changed (and processed again) in the next round.
+
+    Executed by the SQL index writer thread.
+    """
+    id = doc.metadata["id"]
+    source = doc.metadata['source']
+    content_type = doc.metadata.get("content_type")
+    file_path = doc.metadata.get("file_path")
+    file_size = doc.metadata.get("file_size")
+    file_sha256 = doc.metadata.get("file_sha256")
+    last_modified = doc.metadata.get("last_modified")
+    if incomplete:
+        (file_sha256, last_modified) = (None, None)
+
+    # insert document row
+    logger.debug(f"insert document row: id={id}, source={source}")
+    cur.execute(
+        """INSERT INTO document (id, source, content_type, file_path, file_size, file_sha256, last_modified)
+                         VALUES (?, ?, ?, ?, ?, ?, ?)""",
+        (id, source, content_type, file_path, file_size, file_sha256, last_modified)
+    )
+
+    # insert document_part rows
+    document_part_rows = [(id, doc_part.metadata["part_sha256"], _get_anker_of_doc_part(doc_part))
+                          for doc_part in doc_parts]
+    if len(document_part_rows) > 0:
+        cur.executemany(
+            """INSERT INTO document_part (document_id, part_sha256, anker)
+                                  VALUES (?, ?, ?)""",
+            document_part_rows
+        )
+
+    # insert part rows, if not already there
+    # (unique parts only; the existence check is part of the statement
+    #  because other documents with the same parts can be in the same transaction)
+    # (with the SimHash fingerprint computed by the embed stage, if near-duplicate detection is enabled)
+    # (linked near-duplicates reference an already stored part - their own text is never stored as that part)
+    parts_by_sha256: Dict[str, Document] = {}
+    for doc_part in doc_parts:
+        if not doc_part.metadata.get(NEAR_DUPLICATE_LINKED_METADATA_KEY):
+            parts_by_sha256.setdefault(doc_part.metadata["part_sha256"], doc_part)
+    part_rows = [(sha256, doc_part.page_content, doc_part.metadata.get(SIMHASH_METADATA_KEY), sha256)
+                 for sha256, doc_part in parts_by_sha256.items()]
+    if len(part_rows) > 0:
+        cur.executemany(
+            """INSERT INTO part (sha256, content, simhash)
+                    SELECT ?, ?, ? WHERE NOT EXISTS (SELECT 1 FROM part WHERE sha256=?)""",
+            part_rows
+        )
+
+    logger.info(f"write_single_document_and_its_parts_in_sqldb: id={id}, source={source}, {len(document_part_rows)} document_part row(s), {len(part_rows)} unique part(s) - DONE")
+
+
+def delete_documents_of_source_in_sqldb(cur: DBAPICursor, source: str):
+    """
+    Execute the SQL statements to delete all documents (and their document_part rows) of a source (without commit).
+
+    Executed by the SQL index writer thread.
+    """
+    # Attention: the order of deletion is important!
+    cur.execute("DELETE FROM document_part WHERE document_id IN (SELECT id FROM document WHERE source=?)", (source,))
+    logger.debug(f"Deleted {cur.rowcount} row(s) for source={source} from 'document_part' table")
+    cur.execute("DELETE FROM document WHERE source=?", (source,))
+    logger.debug(f"Deleted {cur.rowcount} row(s) with source={source} from 'document' table")
+
+
+def mark_documents_of_source_incomplete_in_sqldb(cur: DBAPICursor, source: str):
+    """
+    Execute the SQL statement to remove the change detection metadata of all documents of a source (without commit),
+    i.e. the source is detected as changed (and processed again) in the next round.
+
+    Executed by the SQL index writer thread.
+    """
+    cur.execute("UPDATE document SET file_sha256=NULL, last_modified=NULL WHERE source=?", (source,))
+
+
+def _get_anker_of_doc_part(doc_part: Document) -> Optional[str]:
+    """
+    Extract the anker (=position of the part in the document) from the metadata
+    """
+    if "anker" in doc_part.metadata:
+        return doc_part.metadata['anker']
+    elif "page_number" in doc_part.metadata:
+        return f"page {doc_part.metadata['page_number']}"
+    elif "start_index" in doc_part.metadata:
+        return doc_part.metadata['start_index']
+    return None
 
 
 #
-# processing a single part of a single document
+# processing all parts of a single document (batched)
 #
 
-def save_single_part_of_single_document_in_vectorstore_and_sqldb(doc_part: Document) -> Optional[str]:
+# max number of SQL parameters in a single "... IN (?, ?, ...)" query
+# (older SQLite versions support max. 999 parameters per statement)
+SQL_IN_CLAUSE_MAX_PARAMS = 500
+
+def save_parts_of_single_document_in_vectorstore(doc_parts: List[Document]) -> Set[str]:
     """
-    Add a single part of a single document to the SQL DB and the vectorstore.
+    Add all parts of a single document to the vectorstore.
+    (The 'part' rows in the SQL DB are written later by the SQL index writer.)
+
+    Instead of checking, embedding and storing part by part, all parts are handled together:
+    - one SQL query and one (ID-only) vectorstore lookup to find the parts that are already stored
+    - embedding of the missing parts only, in batches of config.rag_indexing.embedding_batch_size
+    - one vectorstore call to add the missing parts
 
-    If the part is already in the SQL DB/vectorstore, nothing will be done.
+    Parts that are already in the SQL DB/vectorstore are not saved again.
 
-    Returns: the ID of the part (=sha256 hash), or None in the case of an error
+    Returns: the IDs (=sha256 hashes) of all parts that are stored now
+
+    Raises: any error of the embedding or the vectorstore - the document must not be written without its parts
     """
 
-    # preparation
-    part_sha256 = doc_part.metadata["part_sha256"]
-    part_content = doc_part.page_content
+    # preparation: unique parts (the same text can appear multiple times in a document)
+    parts_by_sha256: Dict[str, Document] = {}
+    for doc_part in doc_parts:
+        parts_by_sha256.setdefault(doc_part.metadata["part_sha256"], doc_part)
+    part_sha256s = list(parts_by_sha256.keys())
+    if len(part_sha256s) == 0:
+        return set()
 
     try:
-        # check if part is already in vectorStore
+        # check which parts are already in vectorStore
         vectorStore = get_vectorstore()
-        elems_in_vectorstore_result: GetResult = vectorStore.get(ids=[part_sha256])
-        logger.debug(f"elem_in_vectorstore={elems_in_vectorstore_result}")
-        is_part_in_vectorstore = len(elems_in_vectorstore_result["ids"]) > 0 # this does not work
+        sha256s_in_vectorstore = set(get_existing_ids_in_vectorstore(vectorStore, part_sha256s))
+
+        # check which parts are already in SQL DB
+        sha256s_in_sql_db = get_existing_part_sha256s_from_sqldb(part_sha256s)
+
+        # save parts in vectorstore, if not already there
+        # (use sha256s_in_sql_db as workaround for sha256s_in_vectorstore)
+        sha256s_to_embed = [sha256 for sha256 in part_sha256s
+                            if sha256 not in sha256s_in_vectorstore and sha256 not in sha256s_in_sql_db]
+        get_indexing_status().count(PARTS_REUSED, len(part_sha256s) - len(sha256s_to_embed))
+
+        # near-duplicates of already indexed parts (e.g. boilerplate of web pages) are not embedded
+        (near_duplicates, simhashes) = find_near_duplicate_parts(doc_parts, sha256s_to_embed, parts_by_sha256)
+        if len(near_duplicates) > 0:
+            sha256s_to_embed = [sha256 for sha256 in sha256s_to_embed if sha256 not in near_duplicates]
+
+        logger.info(f"Parts of document: {len(part_sha256s)} unique part(s), {len(sha256s_to_embed)} part(s) to embed, {len(near_duplicates)} near-duplicate(s)")
+        if len(sha256s_to_embed) > 0:
+            texts = [parts_by_sha256[sha256].page_content for sha256 in sha256s_to_embed]
+            metadatas = [parts_by_sha256[sha256].metadata for sha256 in sha256s_to_embed]
+            embeddings = embed_texts_with_cache(sha256s_to_embed, texts)
+            resultIds = add_embedded_texts_to_vectorstore(vectorStore, texts, embeddings, metadatas, sha256s_to_embed)
+            logger.info(f"Added {len(resultIds)} part(s) to vectorStore")
+
+        # fingerprints of the new parts - stored with their part rows by the SQL write
+        # (set after the vectorstore add: they are not part of the vectorstore metadata)
+        for (sha256, simhash) in simhashes.items():
+            parts_by_sha256[sha256].metadata[SIMHASH_METADATA_KEY] = format_simhash(simhash)
 
-        # check if part is already in SQL DB
-        sqlCon = get_sql_database_connection_after_setup()
-        cur = sqlCon.cursor()
-        cur.execute("SELECT * FROM part WHERE sha256=?", (part_sha256,))
-        num_of_rows = len(cur.fetchall())
-        cur.close()
-        is_part_in_sql_db = (num_of_rows > 0)
-
-        # save doc_part in vectorstore, if not already there
-        # (use is_part_in_sql_db as workaround for is_part_in_vectorstore)
-        if not(is_part_in_vectorstore or is_part_in_sql_db):
-            logger.debug(f"Add part with id=part_sha256={part_sha256} to vectorStore")
-            resultIds = vectorStore.add_texts(texts=[part_content], metadatas=[doc_part.metadata], ids=part_sha256)
-            logger.info(f"Added part(s) with id(s)={resultIds} to vectorStore")
-        else:
-            logger.info(f"Part with id=part_sha256={part_sha256} already in vectorStore")
-
-        # save doc_part in SQL DB, if not already there
-        if not(is_part_in_sql_db):
-            # save part in SQL DB
-            logger.debug(f"insert part row: sha256={part_sha256}, content={str_limit(part_content)} into SQL DB")
-            sqlCon.execute(
-                """INSERT INTO part (sha256, content)
-                             VALUES (?, ?)""",
-                (part_sha256, part_content)
+        # done
+        # (linked near-duplicates are stored as the similar part)
+        return (set(part_sha256s) - near_duplicates.keys()) | set(near_duplicates.values())
+
+    except Exception as e:
+        logger.warning(f"save_parts_of_single_document_in_vectorstore(num_parts={len(part_sha256s)}, first part={str_limit(doc_parts[0])}): {e}")
+        raise
+
+
+
+def find_near_duplicate_parts(doc_parts: List[Document], sha256s_to_embed: List[str], parts_by_sha256: Dict[str, Document]) -> Tuple[Dict[str, str], Dict[str, int]]:
+    """
+    Find the near-duplicates of already indexed parts among the parts to embed (if enabled).
+    Only parts that are (still) in the SQL DB are accepted as similar parts.
+    In "link" mode, the near-duplicate parts are changed to reference the similar part (metadata part_sha256).
+
+    Returns: (sha256 hashes of the similar parts by the sha256 hashes of the near-duplicates,
+              SimHash fingerprints of the other parts to embed by their sha256 hashes)
+    """
+    nearDuplicateIndex = get_near_duplicate_index()
+    if nearDuplicateIndex is None or len(sha256s_to_embed) == 0:
+        return ({}, {})
+
+    (near_duplicates, simhashes) = nearDuplicateIndex.find_near_duplicates(
+        {sha256: parts_by_sha256[sha256].page_content for sha256 in sha256s_to_embed}
+    )
+    if len(near_duplicates) > 0:
+        sha256s_in_sql_db = get_existing_part_sha256s_from_sqldb(list(set(near_duplicates.values())))
+        for (sha256, similar_sha256) in list(near_duplicates.items()):
+            if similar_sha256 not in sha256s_in_sql_db:
+                logger.debug(f"Similar part not in SQL DB (anymore) - not linked: {similar_sha256}")
+                del near_duplicates[sha256]
+    if nearDuplicateIndex.mode == NEAR_DUPLICATE_LINK:
+        for doc_part in doc_parts:
+            similar_sha256 = near_duplicates.get(doc_part.metadata["part_sha256"])
+            if similar_sha256 is not None:
+                doc_part.metadata["part_sha256"] = similar_sha256
+                doc_part.metadata[NEAR_DUPLICATE_LINKED_METADATA_KEY] = True
+        get_indexing_status().count(NEAR_DUPLICATES_LINKED, len(near_duplicates))
+    else:
+        get_indexing_status().count(NEAR_DUPLICATES_DROPPED, len(near_duplicates))
+    return (near_duplicates, simhashes)
+
+
+def add_committed_parts_to_near_duplicate_index(doc_parts: List[Document]):
+    """
+    Add the fingerprints of the new parts of a document to the near-duplicate index (if enabled)
+    - after their part rows are committed, i.e. only completely indexed parts are found as similar parts.
+
+    Executed by the SQL index writer thread.
+    """
+    nearDuplicateIndex = get_near_duplicate_index()
+    if nearDuplicateIndex is None:
+        return
+    simhashes = {doc_part.metadata["part_sha256"]: int(doc_part.metadata[SIMHASH_METADATA_KEY], 16)
+                 for doc_part in doc_parts
+                 if doc_part.metadata.get(SIMHASH_METADATA_KEY) is not None}
+    if len(simhashes) > 0:
+        nearDuplicateIndex.add_committed_parts(simhashes)
+
+
+def embed_texts_with_cache(part_sha256s: List[str], texts: List[str]) -> List[List[float]]:
+    """
+    Get the embeddings of the texts (of the parts with the given sha256 hashes)
+    from the embedding cache, calculate only the missing ones and add them to the cache.
+    """
+    indexingStatus = get_indexing_status()
+    indexingStatus.count(EMBEDDINGS_REQUESTED, len(texts))
+    embeddingCache = get_embedding_cache()
+    if embeddingCache is None:
+        indexingStatus.count(EMBEDDINGS_CALCULATED, len(texts))
+        return embed_texts_in_batches(texts)
+
+    # lookup
+    embeddings_by_sha256 = embeddingCache.get_embeddings(part_sha256s)
+    missing_indexes = [i for i, sha256 in enumerate(part_sha256s) if sha256 not in embeddings_by_sha256]
+    logger.info(f"Embedding cache: {len(part_sha256s) - len(missing_indexes)} hit(s), {len(missing_indexes)} miss(es)")
+    indexingStatus.count(EMBEDDING_CACHE_HITS, len(part_sha256s) - len(missing_indexes))
+    indexingStatus.count(EMBEDDINGS_CALCULATED, len(missing_indexes))
+
+    # calculate the missing embeddings
+    if len(missing_indexes) > 0:
+        new_embeddings = embed_texts_in_batches([texts[i] for i in missing_indexes])
+        new_embeddings_by_sha256 = {part_sha256s[i]: embedding for i, embedding in zip(missing_indexes, new_embeddings)}
+        embeddingCache.put_embeddings(new_embeddings_by_sha256)
+        embeddings_by_sha256.update(new_embeddings_by_sha256)
+
+    return [embeddings_by_sha256[sha256] for sha256 in part_sha256s]
+
+
+def embed_texts_in_batches(texts: List[str]) -> List[List[float]]:
+    """
+    Calculate the embeddings of the texts with the default embedding model,
+    with (max.) config.rag_indexing.embedding_batch_size texts per call.
+    """
+    embedding_batch_size = deep_get(settings, "config.rag_indexing.embedding_batch_size", 64)
+    embeddings_model: Embeddings = get_default_embeddings()
+
+    embeddings: List[List[float]] = []
+    for texts_batch in batched(texts, embedding_batch_size):
+        logger.debug(f"Embedding {len(texts_batch)} text(s) ...")
+        embeddings.extend(embeddings_model.embed_documents(texts_batch))
+    return embeddings
+
+
+def get_existing_part_sha256s_from_sqldb(part_sha256s: List[str]) -> Set[str]:
+    """
+    Check which parts are already in the 'part' table of the SQL DB.
+
+    Returns: the subset of the given sha256 hashes that are already in the SQL DB
+    """
+    result: Set[str] = set()
+    with get_sql_database_connection_after_setup() as sqlCon:
+        for sha256s_batch in batched(part_sha256s, SQL_IN_CLAUSE_MAX_PARAMS):
+            placeholders = ", ".join(["?"] * len(sha256s_batch))
+            cur = sqlCon.cursor()
+            cur.execute(f"SELECT sha256 FROM part WHERE sha256 IN ({placeholders})", sha256s_batch)
+            result.update(row[0] for row in cur.fetchall())
+            cur.close()
+    return result
+
+
+#
+# vectorstore recovery/migration
+#
+
+def rebuild_vectorstore_from_embedding_cache() -> Dict[str, int]:
+    """
+    Add all parts of the SQL DB to the vectorstore, with their embeddings from the embedding cache
+    (of the current embedding model) - without any embedding calculation.
+
+    Use it to fill a new/empty vectorstore (collection), e.g. after a migration or a loss of the vectorstore.
+    Parts that are already in the vectorstore are skipped, i.e. an interrupted rebuild can be restarted.
+
+    Returns: statistics
+    """
+    logger.info("rebuild_vectorstore_from_embedding_cache() - START")
+    stats = {"parts": 0, "added": 0, "already_in_vectorstore": 0, "not_in_embedding_cache": 0}
+
+    embeddingCache = get_embedding_cache()
+    if embeddingCache is None:
+        raise ValueError("Embedding cache is disabled (config.rag_indexing.embedding_cache.enabled)")
+    vectorStore = get_vectorstore()
+    batch_size = deep_get(settings, "config.rag_indexing.embedding_batch_size", 64)
+
+    # iterate over all parts, batch by batch (keyset pagination)
+    last_sha256 = ""
+    while True:
+        with get_sql_database_connection_after_setup() as sqlCon:
+            cur = sqlCon.cursor()
+            cur.execute(
+                """SELECT p.sha256, p.content,
+                          (SELECT d.source FROM document_part dp JOIN document d ON d.id=dp.document_id
+                            WHERE dp.part_sha256=p.sha256 LIMIT 1)
+                     FROM part p
+                    WHERE p.sha256 > ?
+                 ORDER BY p.sha256
+                    LIMIT ?""",
+                (last_sha256, batch_size)
+            )
+            rows = cur.fetchall()
+            cur.close()
+        if len(rows) == 0:
+            break
+        last_sha256 = rows[-1][0]
+        stats["parts"] += len(rows)
+
+        # skip parts already in the vectorstore
+        part_sha256s = [row[0] for row in rows]
+        sha256s_in_vectorstore = set(get_existing_ids_in_vectorstore(vectorStore, part_sha256s))
+        stats["already_in_vectorstore"] += len(sha256s_in_vectorstore)
+        rows = [row for row in rows if row[0] not in sha256s_in_vectorstore]
+
+        # add parts with cached embeddings
+        embeddings_by_sha256 = embeddingCache.get_embeddings([row[0] for row in rows])
+        rows = [row for row in rows if row[0] in embeddings_by_sha256]
+        stats["not_in_embedding_cache"] += len(part_sha256s) - len(sha256s_in_vectorstore) - len(rows)
+        if len(rows) > 0:
+            add_embedded_texts_to_vectorstore(
+                vectorStore,
+                texts=[row[1] for row in rows],
+                embeddings=[embeddings_by_sha256[row[0]] for row in rows],
+                metadatas=[{"source": row[2], "part_sha256": row[0]} if row[2] is not None else {"part_sha256": row[0]} for row in rows],
+                ids=[row[0] for row in rows],
             )
-            sqlCon.commit()
-            logger.info(f"inserted part row: sha256={part_sha256} into SQL DB")
+            stats["added"] += len(rows)
+        logger.info(f"rebuild_vectorstore_from_embedding_cache() - {stats}")
+
+    logger.info(f"rebuild_vectorstore_from_embedding_cache() - END - {stats}")
+    return stats
+
+
+#
+# database listing functions - paginated
+#
+
+# listings of SQL tables: name -> (table, columns, key columns (=order of the keyset pagination), key is unique)
+SQL_LISTINGS: Dict[str, Tuple[str, List[str], List[str], bool]] = {
+    "documents": ("document", ["id", "source", "content_type", "file_path", "file_size", "file_sha256", "last_modified"], ["id"], True),
+    "parts":     ("part", ["sha256", "content"], ["sha256"], True),
+    # the same part can occur multiple times in a document
+    "doc_parts": ("document_part", ["document_id", "part_sha256", "anker"], ["document_id", "part_sha256"], False),
+}
+
+def get_page_from_sqldb(
+    listing: str,
+    limit: int,
+    after: Optional[List[str]] = None,
+    fields: Optional[List[str]] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[List[str]]]:
+    """
+    Get a page of rows of an SQL table - with keyset pagination, i.e. without OFFSET
+    (fast on large tables and stable while rows are inserted/deleted).
+
+    If the key is not unique, all rows of the key of the last row are included,
+    i.e. the page can contain a few more than limit rows.
+
+    Args:
+        listing: name of the listing, see SQL_LISTINGS
+        limit: max number of rows
+        after: key (values of the key columns) of the last row of the previous page, None for the first page
+        fields: columns to return, None for all (e.g. to omit the large 'content' column)
+
+    Returns: (rows as dictionaries, key of the last row - for the next page - or None if there are no more rows)
+    """
+    (table, columns, key_columns, key_is_unique) = SQL_LISTINGS[listing]
+    if fields is None:
+        fields = columns
+    unknown_fields = [field for field in fields if field not in columns]
+    if len(unknown_fields) > 0:
+        raise ValueError(f"Unknown field(s) of {listing}: {unknown_fields} - available: {columns}")
+    if after is not None and len(after) != len(key_columns):
+        raise ValueError(f"Invalid 'after' key of {listing}: {after} - expected values of: {key_columns}")
+    limit = max(1, limit)
+
+    # key columns are always selected (to continue with the next page), but only returned if requested
+    select_columns = key_columns + [column for column in fields if column not in key_columns]
+    select = f"SELECT {', '.join(select_columns)} FROM {table}"
+    order_by = f"ORDER BY {', '.join(key_columns)}"
+    with get_sql_database_connection_after_setup() as sqlCon:
+        cur = sqlCon.cursor()
+        if after is None:
+            cur.execute(f"{select} {order_by} LIMIT ?", (limit,))
         else:
-            # part already in SQL DB
-            logger.info(f"Part with sha256={part_sha256} already in SQL DB")
+            (condition, params) = _get_keyset_condition(key_columns, after)
+            cur.execute(f"{select} WHERE {condition} {order_by} LIMIT ?", params + [limit])
+        rows = cur.fetchall()
+        cur.close()
 
-        # done
-        return part_sha256
+        # complete the rows of the last key
+        if not key_is_unique and len(rows) == limit:
+            last_key = list(rows[-1][:len(key_columns)])
+            rows = [row for row in rows if list(row[:len(key_columns)]) != last_key]
+            cur = sqlCon.cursor()
+            cur.execute(f"{select} WHERE {' AND '.join(f'{column}=?' for column in key_columns)}", last_key)
+            rows.extend(cur.fetchall())
+            cur.close()
+
+    next_after = list(rows[-1][:len(key_columns)]) if len(rows) >= limit else None
+    row_dicts = [{column: row[select_columns.index(column)] for column in fields} for row in rows]
+    return (row_dicts, next_after)
+
+def _get_keyset_condition(key_columns: List[str], after: List[str]) -> Tuple[str, List[str]]:
+    # (k1 > ?) OR (k1 = ? AND k2 > ?) OR ... - portable variant of (k1, k2, ...) > (?, ?, ...)
+    conditions: List[str] = []
+    params: List[str] = []
+    for i in range(len(key_columns)):
+        conditions.append("(" + " AND ".join([f"{column}=?" for column in key_columns[:i]] + [f"{key_columns[i]}>?"]) + ")")
+        params.extend(after[:i + 1])
+    return (" OR ".join(conditions), params)
 
-    except Exception as e:
-        logger.warning(f"save_single_part_of_single_document_in_vectorstore_and_sqldb(part_sha256={part_sha256}, part={str_limit(doc_part)}): {e}")
-        return None
-    
-    logger.info("END func")
 
 #
 # database debugging functions
@@ -487,11 +1211,11 @@ def save_single_part_of_single_document_in_vectorstore_and_sqldb(doc_part: Docum
 
 def get_all_docs_from_sqldb() -> List[Dict[str, Any]]:
     # get all rows
-    sqlCon = get_sql_database_connection_after_setup()
-    cur = sqlCon.cursor()
-    cur.execute("SELECT id, source, content_type, file_path, file_size, file_sha256, last_modified FROM document")
-    rows = cur.fetchall()
-    cur.close()
+    with get_sql_database_connection_after_setup() as sqlCon:
+        cur = sqlCon.cursor()
+        cur.execute("SELECT id, source, content_type, file_path, file_size, file_sha256, last_modified FROM document")
+        rows = cur.fetchall()
+        cur.close()
 
     # map rows to document dictionaries
     document_dicts = [{
@@ -517,11 +1241,11 @@ def print_all_docs_from_sqldb():
 
 def get_all_doc_parts_from_sqldb() -> List[Dict[str, Any]]:
     # get all rows
-    sqlCon = get_sql_database_connection_after_setup()
-    cur = sqlCon.cursor()
-    cur.execute("SELECT document_id, part_sha256, anker FROM document_part")
-    rows = cur.fetchall()
-    cur.close()
+    with get_sql_database_connection_after_setup() as sqlCon:
+        cur = sqlCon.cursor()
+        cur.execute("SELECT document_id, part_sha256, anker FROM document_part")
+        rows = cur.fetchall()
+        cur.close()
 
     # map rows to document_part dictionaries
     document_part_dicts = [{
@@ -542,11 +1266,11 @@ def print_all_doc_parts_from_sqldb():
 
 def get_all_parts_from_sqldb() -> List[Dict[str, Any]]:
     # get all rows
-    sqlCon = get_sql_database_connection_after_setup()
-    cur = sqlCon.cursor()
-    cur.execute("SELECT sha256, content FROM part")
-    rows = cur.fetchall()
-    cur.close()
+    with get_sql_database_connection_after_setup() as sqlCon:
+        cur = sqlCon.cursor()
+        cur.execute("SELECT sha256, content FROM part")
+        rows = cur.fetchall()
+        cur.close()
 
     # map rows to part dictionaries
     part_dicts = [{
@@ -580,23 +1304,111 @@ def printall():
 # basic database functions
 #
 
-def get_sql_database_connection_after_setup() -> DBAPIConnection:
+def get_sql_database_connection_after_setup() -> ContextManager[DBAPIConnection]:
+    """
+    Borrow an SQL database connection from the pool, setup the tables if necessary.
+
+    Usage:
+        with get_sql_database_connection_after_setup() as sqlCon:
+            ...
+
+    Returns: context manager that provides the SQL database connection
+             and returns it to the pool afterwards
+    """
+
+    global sqlDatabaseMigrated
+    if not sqlDatabaseMigrated:
+        with sqlDatabaseMigrationLock:
+            if not sqlDatabaseMigrated:
+                # setup/update tables if necessary
+                with get_sql_database_connection() as sqlCon:
+                    migrate_sql_database(sqlCon, get_sql_dialect())
+                sqlDatabaseMigrated = True
+
+    # pooled connections are used by different threads (one at a time), see also:
+    # - https://docs.python.org/3/library/sqlite3.html#sqlite3.threadsafety
+    # - https://discuss.python.org/t/is-sqlite3-threadsafety-the-same-thing-as-sqlite3-threadsafe-from-the-c-library/11463
+    return get_sql_database_connection()
+
+
+@cache
+def get_sql_index_writer() -> SqlIndexWriter:
+    """
+    Get the (single) writer for the SQL index tables.
+    """
+    commit_max_units   = deep_get(settings, "config.rag_indexing.sql_writer.commit_max_documents", 50)
+    commit_max_seconds = deep_get(settings, "config.rag_indexing.sql_writer.commit_max_seconds", 2.0)
+    sqlIndexWriter = SqlIndexWriter(
+        get_connection=get_sql_database_connection_after_setup,
+        commit_max_units=commit_max_units,
+        commit_max_seconds=commit_max_seconds,
+    )
+    logger.info(f"Setup done: {sqlIndexWriter}")
+    return sqlIndexWriter
+
+
+@cache
+def get_embedding_cache() -> Optional[EmbeddingCache]:
     """
-    Get the SQL database connection, setup the tables if necessary.
+    Get the embedding cache for the default embedding model, or None if disabled.
+    """
+    if not deep_get(settings, "config.rag_indexing.embedding_cache.enabled", True):
+        logger.info("Embedding cache disabled")
+        return None
+
+    embeddingCache = EmbeddingCache(
+        get_connection=get_sql_database_connection_after_setup,
+        sqlIndexWriter=get_sql_index_writer(),
+        model_id=get_default_embeddings_model_id(),
+        dtype=deep_get(settings, "config.rag_indexing.embedding_cache.dtype", "float32"),
+    )
+    logger.info(f"Setup done: {embeddingCache}")
+    return embeddingCache
+
+
+@cache
+def get_near_duplicate_index() -> Optional[NearDuplicateIndex]:
+    """
+    Get the near-duplicate index of the parts, or None if disabled.
+    """
+    if not deep_get(settings, "config.rag_indexing.near_duplicates.enabled", False):
+        logger.info("Near-duplicate detection disabled")
+        return None
+
+    nearDuplicateIndex = NearDuplicateIndex(
+        get_connection=get_sql_database_connection_after_setup,
+        mode=deep_get(settings, "config.rag_indexing.near_duplicates.mode", "link"),
+        min_similarity=deep_get(settings, "config.rag_indexing.near_duplicates.min_similarity", 0.88),
+        min_words=deep_get(settings, "config.rag_indexing.near_duplicates.min_words", 20),
+    )
+    logger.info(f"Setup done: {nearDuplicateIndex}")
+    return nearDuplicateIndex
+
 
-    Returns: the SQL database connection
+@cache
+def get_http_cache() -> Optional[HttpCache]:
     """
+    Get the HTTP cache of web sources, or None if disabled.
+    """
+    if not deep_get(settings, "config.rag_loading.http_cache.enabled", True):
+        logger.info("HTTP cache disabled")
+        return None
 
-    global sqlCon
-    if sqlCon is None:
-        sqlCon = get_sql_database_connection()
-            # see also:
-            # - https://docs.python.org/3/library/sqlite3.html#sqlite3.threadsafety
-            # - https://discuss.python.org/t/is-sqlite3-threadsafety-the-same-thing-as-sqlite3-threadsafe-from-the-c-library/11463
+    httpCache = HttpCache(
+        get_connection=get_sql_database_connection_after_setup,
+        sqlIndexWriter=get_sql_index_writer(),
+    )
+    logger.info(f"Setup done: {httpCache}")
+    return httpCache
 
-        # setup tables if necessary
-        sqlCon.execute(DB_TABLE_document)
-        sqlCon.execute(DB_TABLE_part)
-        sqlCon.execute(DB_TABLE_document_part)
 
-    return sqlCon
+@cache
+def get_index_garbage_collector() -> IndexGarbageCollector:
+    indexGarbageCollector = IndexGarbageCollector(
+        get_connection=get_sql_database_connection_after_setup,
+        sqlIndexWriter=get_sql_index_writer(),
+        get_vectorstore=get_vectorstore,
+        batch_size=deep_get(settings, "config.rag_indexing.garbage_collection.batch_size", 500),
+    )
+    logger.info(f"Setup done: {indexGarbageCollector}")
+    return indexGarbageCollector
@@ -0,0 +1,128 @@
+### Document Change Detector
+
+# partitially based on idea of
+#   https://stackoverflow.com/questions/52534211/python-type-hinting-with-db-api/77350678#77350678
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from _typeshed.dbapi import DBAPIConnection, DBAPICursor
+else:
+    DBAPIConnection = any
+    DBAPICursor = any
+
+import threading
+from typing import Callable, ContextManager, Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# results of a change check
+DOCUMENT_NEW = "new"
+DOCUMENT_CHANGED = "changed"
+DOCUMENT_UNCHANGED = "unchanged"
+
+
+class DocumentChangeDetector:
+    """
+    Detect whether an incoming document is new, changed or unchanged
+    compared to the version already stored in the 'document' table of the SQL DB.
+
+    A document is unchanged if the stored row(s) of its source have the same file_sha256
+    or - if there is no hash - the same last_modified and file_size.
+
+    A single source (file/URL) can result in multiple documents (e.g. one per PDF page).
+    The decision is made with the first document of a source and reused for all further
+    documents of the same source - during the lifetime of the detector, i.e. one indexing round.
+
+    Thread-safe. Also counts the results (per document).
+    """
+
+    def __init__(self, get_connection: Callable[[], ContextManager[DBAPIConnection]], force_changed: bool = False) -> None:
+        """
+        Args:
+            get_connection: function that borrows an SQL database connection (context manager) to read the stored documents
+            force_changed: if True, stored documents are always considered changed (e.g. to reindex them)
+        """
+        self.get_connection = get_connection
+        self.force_changed = force_changed
+
+        self._lock = threading.Lock()
+        self._decisions_by_source: Dict[str, str] = {}
+        self.counters: Dict[str, int] = {
+            DOCUMENT_NEW: 0,
+            DOCUMENT_CHANGED: 0,
+            DOCUMENT_UNCHANGED: 0,
+        }
+
+    def __str__(self) -> str:
+        return f"DocumentChangeDetector(new: {self.counters[DOCUMENT_NEW]}, changed: {self.counters[DOCUMENT_CHANGED]}, unchanged/skipped: {self.counters[DOCUMENT_UNCHANGED]})"
+
+    def check_document(self, doc: Document) -> Tuple[str, bool]:
+        """
+        Check a document.
+
+        Returns: (DOCUMENT_NEW|DOCUMENT_CHANGED|DOCUMENT_UNCHANGED, is_first_document_of_source)
+        """
+        source = doc.metadata["source"]
+        with self._lock:
+            decision = self._decisions_by_source.get(source)
+            is_first_document_of_source = decision is None
+            if is_first_document_of_source:
+                decision = self._compare_with_stored_rows(doc, self._load_stored_rows(source))
+                if self.force_changed and decision == DOCUMENT_UNCHANGED:
+                    decision = DOCUMENT_CHANGED
+                self._decisions_by_source[source] = decision
+            self.counters[decision] += 1
+
+        logger.debug(f"check_document(source={source}): {decision} (first document of source: {is_first_document_of_source})")
+        return (decision, is_first_document_of_source)
+
+    def get_seen_sources(self) -> List[str]:
+        """
+        Get all sources checked so far.
+        """
+        with self._lock:
+            return list(self._decisions_by_source.keys())
+
+    #
+    # internal functions
+    #
+
+    def _load_stored_rows(self, source: str) -> List[Tuple]:
+        with self.get_connection() as sqlCon:
+            cur = sqlCon.cursor()
+            cur.execute("SELECT file_sha256, last_modified, file_size FROM document WHERE source=?", (source,))
+            rows = cur.fetchall()
+            cur.close()
+        return rows
+
+    @staticmethod
+    def _compare_with_stored_rows(doc: Document, stored_rows: List[Tuple]) -> str:
+        if len(stored_rows) == 0:
+            return DOCUMENT_NEW
+
+        file_sha256 = doc.metadata.get("file_sha256")
+        last_modified = doc.metadata.get("last_modified")
+        file_size = doc.metadata.get("file_size")
+        for (stored_file_sha256, stored_last_modified, stored_file_size) in stored_rows:
+            if file_sha256 is not None:
+                if not _equals(file_sha256, stored_file_sha256):
+                    return DOCUMENT_CHANGED
+            elif last_modified is not None and file_size is not None:
+                if not (_equals(last_modified, stored_last_modified) and _equals(file_size, stored_file_size)):
+                    return DOCUMENT_CHANGED
+            else:
+                # no metadata to detect changes
+                return DOCUMENT_CHANGED
+
+        return DOCUMENT_UNCHANGED
+
+
+def _equals(value: Optional[any], stored_value: Optional[any]) -> bool:
+    # stored values can have another type (e.g. last_modified: float -> TEXT column)
+    if value is None or stored_value is None:
+        return False
+    return str(value) == str(stored_value)
@@ -0,0 +1,94 @@
+### Embedding Cache
+
+# partitially based on idea of
+#   https://stackoverflow.com/questions/52534211/python-type-hinting-with-db-api/77350678#77350678
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from _typeshed.dbapi import DBAPIConnection, DBAPICursor
+else:
+    DBAPIConnection = any
+    DBAPICursor = any
+
+from typing import Callable, ContextManager, Dict, List
+
+from rag_index_service.sql_index_writer import SqlIndexWriter
+from utils.embedding_util import EMBEDDING_DTYPE_FORMATS, decode_embedding, encode_embedding
+from utils.list_util import batched
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# max number of SQL parameters in a single "... IN (?, ?, ...)" query
+SQL_IN_CLAUSE_MAX_PARAMS = 500
+
+
+class EmbeddingCache:
+    """
+    Persistent, content-addressed cache of embeddings in the SQL DB (table 'embedding_cache').
+
+    Embeddings are identified by the sha256 hash of the part (=text) and the identity of the embedding model,
+    so they survive changes of the embedding model configuration and the loss of the vectorstore.
+    """
+
+    def __init__(
+        self,
+        get_connection: Callable[[], ContextManager[DBAPIConnection]],
+        sqlIndexWriter: SqlIndexWriter,
+        model_id: str,
+        dtype: str = "float32",
+    ) -> None:
+        """
+        Args:
+            get_connection: function that borrows an SQL database connection (context manager) to read the cache
+            sqlIndexWriter: writer to add new embeddings to the cache
+            model_id: identity of the embedding model
+            dtype: binary format of the stored embeddings: "float32" or "float16"
+        """
+        if dtype not in EMBEDDING_DTYPE_FORMATS:
+            raise ValueError(f"Unsupported embedding cache dtype: {dtype} (supported: {list(EMBEDDING_DTYPE_FORMATS.keys())})")
+        self.get_connection = get_connection
+        self.sqlIndexWriter = sqlIndexWriter
+        self.model_id = model_id
+        self.dtype = dtype
+
+    def __str__(self) -> str:
+        return f"EmbeddingCache(model_id: {self.model_id}, dtype: {self.dtype})"
+
+    def get_embeddings(self, part_sha256s: List[str]) -> Dict[str, List[float]]:
+        """
+        Get the cached embeddings of the parts.
+
+        Returns: embeddings by part sha256 - only for the parts found in the cache
+        """
+        result: Dict[str, List[float]] = {}
+        with self.get_connection() as sqlCon:
+            for sha256s_batch in batched(part_sha256s, SQL_IN_CLAUSE_MAX_PARAMS):
+                placeholders = ", ".join(["?"] * len(sha256s_batch))
+                cur = sqlCon.cursor()
+                cur.execute(
+                    f"SELECT part_sha256, dtype, vector FROM embedding_cache WHERE model=? AND part_sha256 IN ({placeholders})",
+                    [self.model_id] + list(sha256s_batch)
+                )
+                for (part_sha256, dtype, vector) in cur.fetchall():
+                    result[part_sha256] = decode_embedding(bytes(vector), dtype)
+                cur.close()
+        return result
+
+    def put_embeddings(self, embeddings_by_sha256: Dict[str, List[float]]) -> None:
+        """
+        Add embeddings to the cache (asynchronously, with the SQL index writer).
+        """
+        if len(embeddings_by_sha256) == 0:
+            return
+        rows = [(part_sha256, self.model_id, self.dtype, len(embedding), encode_embedding(embedding, self.dtype), part_sha256, self.model_id)
+                for part_sha256, embedding in embeddings_by_sha256.items()]
+
+        def write(cur: DBAPICursor):
+            cur.executemany(
+                """INSERT INTO embedding_cache (part_sha256, model, dtype, dimensions, vector)
+                        SELECT ?, ?, ?, ?, ? WHERE NOT EXISTS (SELECT 1 FROM embedding_cache WHERE part_sha256=? AND model=?)""",
+                rows
+            )
+        self.sqlIndexWriter.submit(write, f"{len(rows)} embedding(s) into embedding cache")
@@ -0,0 +1,235 @@
+### File System Watcher
+
+import os
+from pathlib import Path, PurePosixPath
+import re
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# kinds of changes
+FILE_CHANGED = "changed"    # created or modified
+FILE_DELETED = "deleted"
+
+# callback with the (debounced) changes: ({path: FILE_CHANGED|FILE_DELETED})
+FileChangesCallback = Callable[[Dict[str, str]], None]
+
+
+class FileSystemWatcher:
+    """
+    Watch a directory tree for created, modified and deleted files - like FileSystemBlobLoader selects them
+    (path, glob, exclude, suffixes) - and report the changes in debounced batches.
+
+    Uses file system notifications (inotify & co.) with the optional package 'watchdog',
+    otherwise (or if the notifications can't be setup) it polls the file metadata (mtime, size)
+    every poll_interval_seconds.
+
+    Debounce: changes are collected until there was no further change for debounce_seconds
+    (e.g. an editor writes a file in multiple steps), then the callback is called once with all of them.
+    The paths are reported like FileSystemBlobLoader reports them (as blob source), i.e. str(Path(path) / <relative path>).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        on_changes: FileChangesCallback,
+        glob: str = "**/[!.]*",
+        exclude: Optional[List[str]] = None,
+        suffixes: Optional[List[str]] = None,
+        debounce_seconds: float = 2.0,
+        poll_interval_seconds: float = 5.0,
+    ) -> None:
+        """
+        Args:
+            path: root directory to watch
+            on_changes: function that is called with the debounced changes
+            glob: glob pattern (relative to path) of the files to watch
+            exclude: glob patterns of files to ignore
+            suffixes: file suffixes to watch (e.g. [".md", ".pdf"]), None for all
+            debounce_seconds: quiet time before the collected changes are reported
+            poll_interval_seconds: interval of the polling fallback
+        """
+        self.path = Path(path)
+        self.on_changes = on_changes
+        self.glob = glob
+        self.exclude = exclude or []
+        self.suffixes = suffixes
+        self.debounce_seconds = debounce_seconds
+        self.poll_interval_seconds = poll_interval_seconds
+
+        self._glob_regex = _glob_to_regex(glob)
+        self._lock = threading.Lock()
+        self._pending_changes: Dict[str, str] = {}
+        self._last_change_at = 0.0
+        self._changes_available = threading.Event()
+        self._observer = None
+        self.mode: Optional[str] = None
+
+    def __str__(self) -> str:
+        return f"FileSystemWatcher(path: {self.path}, glob: {self.glob}, mode: {self.mode}, debounce_seconds: {self.debounce_seconds})"
+
+    def start(self) -> None:
+        """
+        Start watching (in background threads).
+        """
+        if not self._start_notifications():
+            self.mode = "polling"
+            threading.Thread(target=self._poll_worker, name=f"fs-watch-poll-{self.path.name}", daemon=True).start()
+        threading.Thread(target=self._debounce_worker, name=f"fs-watch-debounce-{self.path.name}", daemon=True).start()
+        logger.info(f"{self} - started")
+
+    #
+    # collecting changes
+    #
+
+    def _add_change(self, file_path: str, change: str) -> None:
+        source = self._get_source_if_watched(file_path)
+        if source is None:
+            return
+        with self._lock:
+            self._pending_changes[source] = change
+            self._last_change_at = time.time()
+        self._changes_available.set()
+
+    def _get_source_if_watched(self, file_path: str) -> Optional[str]:
+        # same selection as FileSystemBlobLoader._yield_paths()
+        try:
+            relative_path = PurePosixPath(Path(os.path.abspath(file_path)).relative_to(os.path.abspath(self.path)).as_posix())
+        except ValueError:
+            return None
+        if not self._glob_regex.fullmatch(str(relative_path)):
+            return None
+        if any(relative_path.match(exclude_glob) for exclude_glob in self.exclude):
+            return None
+        if self.suffixes and relative_path.suffix not in self.suffixes:
+            return None
+        return str(self.path / relative_path)
+
+    def _debounce_worker(self) -> None:
+        while True:
+            self._changes_available.wait()
+
+            # wait for the quiet time
+            with self._lock:
+                quiet_seconds = time.time() - self._last_change_at
+            if quiet_seconds < self.debounce_seconds:
+                time.sleep(self.debounce_seconds - quiet_seconds)
+                continue
+
+            # report
+            with self._lock:
+                changes = self._pending_changes
+                self._pending_changes = {}
+                self._changes_available.clear()
+            if len(changes) == 0:
+                continue
+            logger.info(f"{self}: {len(changes)} file change(s): {list(changes.items())[:10]} ...")
+            try:
+                self.on_changes(changes)
+            except Exception as e:
+                logger.warning(f"{self}: processing of file changes failed: {e}", exc_info=logger.isEnabledFor(logging.DEBUG))
+
+    #
+    # file system notifications (optional package 'watchdog')
+    #
+
+    def _start_notifications(self) -> bool:
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            logger.info(f"{self}: package 'watchdog' not installed - using polling")
+            return False
+
+        watcher = self
+        class EventHandler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if event.is_directory:
+                    return
+                if event.event_type in ("created", "modified", "closed"):
+                    watcher._add_change(event.src_path, FILE_CHANGED)
+                elif event.event_type == "deleted":
+                    watcher._add_change(event.src_path, FILE_DELETED)
+                elif event.event_type == "moved":
+                    watcher._add_change(event.src_path, FILE_DELETED)
+                    watcher._add_change(event.dest_path, FILE_CHANGED)
+
+        try:
+            observer = Observer()
+            observer.schedule(EventHandler(), str(self.path), recursive=True)
+            observer.daemon = True
+            observer.start()
+        except Exception as e:
+            logger.warning(f"{self}: file system notifications not available - using polling: {e}")
+            return False
+        self._observer = observer
+        self.mode = "notifications"
+        return True
+
+    #
+    # polling fallback
+    #
+
+    def _poll_worker(self) -> None:
+        snapshot = self._take_snapshot()
+        while True:
+            time.sleep(self.poll_interval_seconds)
+            try:
+                new_snapshot = self._take_snapshot()
+            except Exception as e:
+                logger.warning(f"{self}: polling failed: {e}")
+                continue
+            for (file_path, stat) in new_snapshot.items():
+                if snapshot.get(file_path) != stat:
+                    self._add_change(file_path, FILE_CHANGED)
+            for file_path in snapshot.keys() - new_snapshot.keys():
+                self._add_change(file_path, FILE_DELETED)
+            snapshot = new_snapshot
+
+    def _take_snapshot(self) -> Dict[str, Tuple[float, int]]:
+        # metadata only (no content): (mtime, size) by path
+        snapshot: Dict[str, Tuple[float, int]] = {}
+        for (dir_path, _, file_names) in os.walk(self.path):
+            for file_name in file_names:
+                file_path = os.path.join(dir_path, file_name)
+                try:
+                    stat = os.stat(file_path)
+                except OSError:
+                    continue
+                snapshot[file_path] = (stat.st_mtime, stat.st_size)
+        return snapshot
+
+
+def _glob_to_regex(glob: str) -> re.Pattern:
+    # pathlib glob semantics: "**" matches any number of directories, "*"/"?"/"[...]" don't match "/"
+    regex = ""
+    i = 0
+    while i < len(glob):
+        if glob.startswith("**/", i):
+            regex += "(?:.*/)?"
+            i += 3
+        elif glob.startswith("**", i):
+            regex += ".*"
+            i += 2
+        elif glob[i] == "*":
+            regex += "[^/]*"
+            i += 1
+        elif glob[i] == "?":
+            regex += "[^/]"
+            i += 1
+        elif glob[i] == "[" and "]" in glob[i + 1:]:
+            end = glob.index("]", i + 2) if glob[i + 1] in "!]" else glob.index("]", i + 1)
+            chars = glob[i + 1:end]
+            if chars.startswith("!"):
+                chars = "^" + chars[1:]
+            regex += f"[{chars}]"
+            i = end + 1
+        else:
+            regex += re.escape(glob[i])
+            i += 1
+    return re.compile(regex)
@@ -0,0 +1,110 @@
+### HTTP Cache
+
+# partitially based on idea of
+#   https://stackoverflow.com/questions/52534211/python-type-hinting-with-db-api/77350678#77350678
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from _typeshed.dbapi import DBAPIConnection, DBAPICursor
+else:
+    DBAPIConnection = any
+    DBAPICursor = any
+
+import json
+import time
+from typing import Any, Callable, ContextManager, Dict, List, Optional
+
+from rag_index_service.sql_index_writer import SqlIndexWriter
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# metadata key of blobs/documents that signal an unchanged source (content not loaded again)
+UNCHANGED_METADATA_KEY = "unchanged"
+# metadata key with the URL of the HTTP cache record of a blob/document
+HTTP_CACHE_URL_METADATA_KEY = "http_cache_url"
+
+
+class HttpCache:
+    """
+    Persistent HTTP cache records of web sources in the SQL DB (table 'http_cache'):
+    ETag, Last-Modified and content hash per URL - to send conditional requests
+    (If-None-Match/If-Modified-Since) and to detect unchanged pages without parsing them again.
+
+    Only the metadata is cached, not the content: the content of unchanged pages is already indexed.
+    """
+
+    def __init__(
+        self,
+        get_connection: Callable[[], ContextManager[DBAPIConnection]],
+        sqlIndexWriter: SqlIndexWriter,
+    ) -> None:
+        """
+        Args:
+            get_connection: function that borrows an SQL database connection (context manager) to read the cache
+            sqlIndexWriter: writer to update the cache
+        """
+        self.get_connection = get_connection
+        self.sqlIndexWriter = sqlIndexWriter
+
+    def __str__(self) -> str:
+        return "HttpCache()"
+
+    def get_entry(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the cache record of the URL.
+
+        Returns: dict with source, etag, last_modified, content_sha256, links - or None if not cached
+        """
+        with self.get_connection() as sqlCon:
+            cur = sqlCon.cursor()
+            cur.execute("SELECT source, etag, last_modified, content_sha256, links FROM http_cache WHERE url=?", (url,))
+            row = cur.fetchone()
+            cur.close()
+        if row is None:
+            return None
+        (source, etag, last_modified, content_sha256, links) = row
+        return {
+            "source": source,
+            "etag": etag,
+            "last_modified": last_modified,
+            "content_sha256": content_sha256,
+            "links": json.loads(links) if links else [],
+        }
+
+    def put_entry(
+        self,
+        url: str,
+        source: str,
+        etag: Optional[str],
+        last_modified: Optional[str],
+        content_sha256: str,
+        links: List[str],
+    ) -> None:
+        """
+        Add or update the cache record of the URL (asynchronously, with the SQL index writer).
+        """
+        links_json = json.dumps(links)
+        fetched_at = time.strftime("%Y-%m-%d %H:%M:%S")
+
+        def write(cur: DBAPICursor):
+            cur.execute(
+                "UPDATE http_cache SET source=?, etag=?, last_modified=?, content_sha256=?, links=?, fetched_at=? WHERE url=?",
+                (source, etag, last_modified, content_sha256, links_json, fetched_at, url)
+            )
+            cur.execute(
+                """INSERT INTO http_cache (url, source, etag, last_modified, content_sha256, links, fetched_at)
+                        SELECT ?, ?, ?, ?, ?, ?, ? WHERE NOT EXISTS (SELECT 1 FROM http_cache WHERE url=?)""",
+                (url, source, etag, last_modified, content_sha256, links_json, fetched_at, url)
+            )
+        self.sqlIndexWriter.submit(write, f"HTTP cache record of url={url}")
+
+    def invalidate(self, url: str) -> None:
+        """
+        Remove the cache record of the URL, i.e. it's loaded completely next time.
+        """
+        self.sqlIndexWriter.submit(
+            lambda cur: cur.execute("DELETE FROM http_cache WHERE url=?", (url,)),
+            f"invalidate HTTP cache record of url={url}"
+        )
@@ -0,0 +1,238 @@
+### Index Garbage Collector
+
+# partitially based on idea of
+#   https://stackoverflow.com/questions/52534211/python-type-hinting-with-db-api/77350678#77350678
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from _typeshed.dbapi import DBAPIConnection, DBAPICursor
+else:
+    DBAPIConnection = any
+    DBAPICursor = any
+
+from typing import Callable, ContextManager, Iterable, List
+
+from langchain_core.vectorstores import VectorStore
+
+from rag_index_service.sql_index_writer import SqlIndexWriter
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class IndexGarbageCollector:
+    """
+    Mark-and-sweep garbage collection of the index:
+
+    - mark: record the indexing round in which each source (file/URL) was seen the last time
+    - sweep: delete the documents of sources that were not seen for some rounds
+      (except sources owned externally, e.g. pushed with the ingestion API - no loader sees them)
+    - collect: delete parts (SQL DB and vectorstore) that are not referenced by any document_part anymore
+
+    Cached embeddings (table 'embedding_cache') are kept - to re-add parts without new embedding calculations.
+    All SQL writes are done with the SQL index writer.
+    """
+
+    def __init__(
+        self,
+        get_connection: Callable[[], ContextManager[DBAPIConnection]],
+        sqlIndexWriter: SqlIndexWriter,
+        get_vectorstore: Callable[[], VectorStore],
+        batch_size: int = 500,
+    ) -> None:
+        """
+        Args:
+            get_connection: function that borrows an SQL database connection (context manager) to read with
+            sqlIndexWriter: writer for all SQL writes
+            get_vectorstore: function that returns the vectorstore
+            batch_size: max number of sources/parts deleted at once
+        """
+        self.get_connection = get_connection
+        self.sqlIndexWriter = sqlIndexWriter
+        self.get_vectorstore = get_vectorstore
+        self.batch_size = max(1, batch_size)
+
+    def __str__(self) -> str:
+        return f"IndexGarbageCollector(batch_size: {self.batch_size})"
+
+    #
+    # indexing rounds
+    #
+
+    def start_round(self, started_at: str) -> int:
+        """
+        Start a new (persistent) indexing round.
+
+        Returns: the number of the new round
+        """
+        with self.get_connection() as sqlCon:
+            cur = sqlCon.cursor()
+            cur.execute("SELECT MAX(round_number) FROM indexing_round")
+            row = cur.fetchone()
+            cur.close()
+        round_number = (row[0] or 0) + 1 if row is not None else 1
+
+        self.sqlIndexWriter.submit(
+            lambda cur: cur.execute("INSERT INTO indexing_round (round_number, started_at) VALUES (?, ?)", (round_number, started_at)),
+            f"start indexing round {round_number}"
+        )
+        self.sqlIndexWriter.flush()
+        return round_number
+
+    def finish_round(self, round_number: int, finished_at: str) -> None:
+        self.sqlIndexWriter.submit(
+            lambda cur: cur.execute("UPDATE indexing_round SET finished_at=? WHERE round_number=?", (finished_at, round_number)),
+            f"finish indexing round {round_number}"
+        )
+
+    #
+    # mark
+    #
+
+    def mark_sources_seen(self, round_number: int, sources: Iterable[str]) -> None:
+        """
+        Record that the sources were seen in the round.
+        """
+        rows = [(round_number, source) for source in sources]
+        if len(rows) == 0:
+            return
+
+        def write(cur: DBAPICursor):
+            cur.executemany("UPDATE source_seen SET last_seen_round=? WHERE source=?", rows)
+            cur.executemany(
+                """INSERT INTO source_seen (source, last_seen_round)
+                        SELECT ?, ? WHERE NOT EXISTS (SELECT 1 FROM source_seen WHERE source=?)""",
+                [(source, round_number, source) for (_, source) in rows]
+            )
+        self.sqlIndexWriter.submit(write, f"mark {len(rows)} source(s) seen in round {round_number}")
+
+    def mark_sources_externally_owned(self, sources: Iterable[str]) -> None:
+        """
+        Record that the sources are owned externally (e.g. pushed with the ingestion API):
+        no loader sees them, i.e. they are never swept.
+        """
+        rows = [(source,) for source in sources]
+        if len(rows) == 0:
+            return
+
+        def write(cur: DBAPICursor):
+            cur.executemany("UPDATE source_seen SET externally_owned=1 WHERE source=?", rows)
+            cur.executemany(
+                """INSERT INTO source_seen (source, last_seen_round, externally_owned)
+                        SELECT ?, 0, 1 WHERE NOT EXISTS (SELECT 1 FROM source_seen WHERE source=?)""",
+                [(source, source) for (source,) in rows]
+            )
+        self.sqlIndexWriter.submit(write, f"mark {len(rows)} source(s) as externally owned")
+
+    #
+    # sweep
+    #
+
+    def sweep_unseen_sources(self, round_number: int, sweep_after_rounds: int) -> int:
+        """
+        Delete the documents of all sources that were not seen in the last sweep_after_rounds rounds
+        (externally owned sources are kept).
+
+        Sources of documents without any mark (e.g. indexed before the garbage collection was introduced)
+        are marked as seen in the current round, i.e. they get the full grace period.
+
+        Returns: the number of swept sources
+        """
+        self.sqlIndexWriter.submit(
+            lambda cur: cur.execute(
+                """INSERT INTO source_seen (source, last_seen_round)
+                        SELECT DISTINCT source, ? FROM document
+                         WHERE NOT EXISTS (SELECT 1 FROM source_seen s WHERE s.source=document.source)""",
+                (round_number,)
+            ),
+            "mark unmarked sources"
+        )
+        self.sqlIndexWriter.flush()
+
+        num_swept = 0
+        last_sources: List[str] = []
+        while True:
+            # find the next batch of sources to sweep
+            with self.get_connection() as sqlCon:
+                cur = sqlCon.cursor()
+                cur.execute(
+                    "SELECT source FROM source_seen WHERE last_seen_round <= ? AND externally_owned=0 ORDER BY source LIMIT ?",
+                    (round_number - sweep_after_rounds, self.batch_size)
+                )
+                sources: List[str] = [row[0] for row in cur.fetchall()]
+                cur.close()
+            if len(sources) == 0:
+                break
+            if num_swept > 0 and sources == last_sources:
+                logger.warning(f"Sweep of sources failed - stopped: {sources[:10]} ...")
+                break
+            last_sources = sources
+
+            # delete them
+            logger.info(f"Sweep {len(sources)} source(s) not seen since round {round_number - sweep_after_rounds}: {sources[:10]} ...")
+            self.sqlIndexWriter.submit(lambda cur, sources=sources: _delete_sources(cur, sources), f"sweep {len(sources)} source(s)")
+            self.sqlIndexWriter.flush()
+            num_swept += len(sources)
+
+        return num_swept
+
+    #
+    # collect
+    #
+
+    def collect_orphaned_parts(self) -> int:
+        """
+        Delete all parts that are not referenced by any document_part row,
+        from the vectorstore and from the SQL DB - batch by batch.
+
+        Returns: the number of deleted parts
+        """
+        num_deleted = 0
+        last_part_sha256s: List[str] = []
+        while True:
+            # find the next batch of orphaned parts
+            with self.get_connection() as sqlCon:
+                cur = sqlCon.cursor()
+                cur.execute(
+                    """SELECT sha256 FROM part
+                        WHERE NOT EXISTS (SELECT 1 FROM document_part dp WHERE dp.part_sha256=part.sha256)
+                        LIMIT ?""",
+                    (self.batch_size,)
+                )
+                part_sha256s: List[str] = [row[0] for row in cur.fetchall()]
+                cur.close()
+            if len(part_sha256s) == 0:
+                break
+            if num_deleted > 0 and part_sha256s == last_part_sha256s:
+                logger.warning(f"Deletion of orphaned parts failed - stopped: {part_sha256s[:10]} ...")
+                break
+            last_part_sha256s = part_sha256s
+
+            # delete them from the vectorstore first, then from the SQL DB
+            # (a part in the SQL DB is considered to be in the vectorstore)
+            self.get_vectorstore().delete(ids=part_sha256s)
+            self.sqlIndexWriter.submit(lambda cur, part_sha256s=part_sha256s: _delete_orphaned_parts(cur, part_sha256s), f"delete {len(part_sha256s)} orphaned part(s)")
+            self.sqlIndexWriter.flush()
+            num_deleted += len(part_sha256s)
+            logger.info(f"Deleted {num_deleted} orphaned part(s) so far")
+
+        return num_deleted
+
+
+#
+# SQL statements - executed by the SQL index writer thread
+#
+
+def _delete_sources(cur: DBAPICursor, sources: List[str]):
+    # Attention: the order of deletion is important!
+    rows = [(source,) for source in sources]
+    cur.executemany("DELETE FROM document_part WHERE document_id IN (SELECT id FROM document WHERE source=?)", rows)
+    cur.executemany("DELETE FROM document WHERE source=?", rows)
+    cur.executemany("DELETE FROM source_seen WHERE source=?", rows)
+
+def _delete_orphaned_parts(cur: DBAPICursor, part_sha256s: List[str]):
+    # check again: parts could be referenced again in the meantime
+    cur.executemany(
+        "DELETE FROM part WHERE sha256=? AND NOT EXISTS (SELECT 1 FROM document_part dp WHERE dp.part_sha256=part.sha256)",
+        [(sha256,) for sha256 in part_sha256s]
+    )
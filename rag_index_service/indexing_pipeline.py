@@ -0,0 +1,152 @@
+### Indexing Pipeline
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PipelineStage:
+    """
+    A single stage of a pipeline: a pool of worker threads that take items from an input queue,
+    process them and put the results into an output queue (=input queue of the next stage).
+
+    The end of the input is signaled with None. When all workers of a stage got the end signal,
+    the end signal is passed on to the next stage.
+
+    If the processing function returns None or raises an exception, the item is dropped.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        process: Callable[[Any], Optional[Any]],
+        num_workers: int,
+        input_queue: queue.Queue,
+        output_queue: Optional[queue.Queue],
+    ) -> None:
+        """
+        Args:
+            name: stage name for logging and thread names
+            process: function to process a single item; returns the item for the next stage (or None)
+            num_workers: number of worker threads of this stage
+            input_queue: queue to take the items from
+            output_queue: queue to put the results into, None for the last stage
+        """
+        self.name = name
+        self.process = process
+        self.num_workers = max(1, num_workers)
+        self.input_queue = input_queue
+        self.output_queue = output_queue
+
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._finished_workers = 0
+        self.processed_items = 0
+        self.failed_items = 0
+        self.busy_seconds = 0.0
+
+    def __str__(self) -> str:
+        return f"PipelineStage(name: {self.name}, num_workers: {self.num_workers}, processed_items: {self.processed_items}, failed_items: {self.failed_items}, busy_seconds: {self.busy_seconds:.1f})"
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Current counters and timings of this stage.
+        """
+        with self._lock:
+            processed_items = self.processed_items
+            failed_items = self.failed_items
+            busy_seconds = self.busy_seconds
+            finished_workers = self._finished_workers
+        num_items = processed_items + failed_items
+        return {
+            "workers": self.num_workers,
+            "finished_workers": finished_workers,
+            "input_queue_depth": self.input_queue.qsize(),
+            "processed_items": processed_items,
+            "failed_items": failed_items,
+            "busy_seconds": round(busy_seconds, 1),
+            "avg_seconds_per_item": round(busy_seconds / num_items, 3) if num_items > 0 else None,
+        }
+
+    def start(self) -> None:
+        for i in range(self.num_workers):
+            thread = threading.Thread(target=self._worker, name=f"indexing-{self.name}-{i}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def join(self) -> None:
+        for thread in self._threads:
+            thread.join()
+
+    def _worker(self) -> None:
+        while True:
+            item = self.input_queue.get()
+            if item is None:
+                # end signal
+                self.input_queue.task_done()
+                self._worker_finished()
+                return
+
+            # normal processing
+            starttime = time.time()
+            try:
+                result = self.process(item)
+                if result is not None and self.output_queue is not None:
+                    self.output_queue.put(result)
+                with self._lock:
+                    self.processed_items += 1
+            except Exception as e:
+                logger.warning(f"Pipeline stage '{self.name}': processing failed - item dropped: {e}", exc_info=logger.isEnabledFor(logging.DEBUG))
+                with self._lock:
+                    self.failed_items += 1
+            finally:
+                with self._lock:
+                    self.busy_seconds += time.time() - starttime
+                self.input_queue.task_done()
+
+    def _worker_finished(self) -> None:
+        with self._lock:
+            self._finished_workers += 1
+            all_workers_finished = self._finished_workers >= self.num_workers
+
+        if not all_workers_finished:
+            # pass the end signal on to the other workers of this stage
+            self.input_queue.put(None)
+        elif self.output_queue is not None:
+            # pass the end signal on to the next stage
+            self.output_queue.put(None)
+
+
+class IndexingPipeline:
+    """
+    A chain of pipeline stages connected by bounded queues.
+
+    Each stage works in its own threads, so e.g. the embedding of document N
+    overlaps with the splitting of document N+1.
+    """
+
+    def __init__(self, stages: List[PipelineStage]) -> None:
+        self.stages = stages
+
+    def __str__(self) -> str:
+        return f"IndexingPipeline(stages: [{', '.join(str(stage) for stage in self.stages)}])"
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Current counters and timings of all stages, by stage name.
+        """
+        return {stage.name: stage.get_stats() for stage in self.stages}
+
+    def run(self) -> None:
+        """
+        Start all stages and block until the end signal passed the last stage.
+        """
+        for stage in self.stages:
+            stage.start()
+        for stage in self.stages:
+            stage.join()
@@ -0,0 +1,170 @@
+### Indexing Status
+
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# counters of a round
+DOCUMENTS_LOADED = "documents_loaded"
+DOCUMENTS_UNCHANGED = "documents_unchanged"
+DOCUMENTS_PROCESSED = "documents_processed"
+PARTS_PROCESSED = "parts_processed"
+PARTS_REUSED = "parts_reused"
+EMBEDDINGS_REQUESTED = "embeddings_requested"
+EMBEDDING_CACHE_HITS = "embedding_cache_hits"
+EMBEDDINGS_CALCULATED = "embeddings_calculated"
+NEAR_DUPLICATES_LINKED = "near_duplicates_linked"
+NEAR_DUPLICATES_DROPPED = "near_duplicates_dropped"
+
+
+class IndexingStatus:
+    """
+    Live status of the indexing: the current (or last) round, per-loader progress and counters.
+
+    Updated by the indexing threads, read by the status endpoint. Thread-safe.
+    Additional live values (e.g. queue depths, pipeline stage timings) are added by providers,
+    i.e. functions that are called while a snapshot is taken.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._providers: Dict[str, Callable[[], Any]] = {}
+        self._last_round: Optional[Dict[str, Any]] = None
+        self._round = self._new_round(None)
+
+    def __str__(self) -> str:
+        return f"IndexingStatus(round: {self._round['round_number']}, state: {self._round['state']}, counters: {self._round['counters']})"
+
+    #
+    # updates
+    #
+
+    def start_round(self, round_number: int) -> None:
+        with self._lock:
+            if self._round["round_number"] is not None:
+                self._last_round = self._round_snapshot()
+            self._round = self._new_round(round_number)
+
+    def finish_round(self) -> None:
+        with self._lock:
+            self._round["state"] = "finished"
+            self._round["finished_at"] = time.time()
+
+    def set_round_state(self, state: str) -> None:
+        with self._lock:
+            self._round["state"] = state
+
+    def loader_started(self, loader_name: str) -> None:
+        with self._lock:
+            self._round["loaders"][loader_name] = self._new_loader()
+
+    def loader_document_loaded(self, loader_name: str) -> None:
+        with self._lock:
+            loader = self._round["loaders"].setdefault(loader_name, self._new_loader())
+            loader["documents"] += 1
+            loader["last_document_at"] = time.time()
+            self._round["counters"][DOCUMENTS_LOADED] += 1
+
+    def loader_finished(self, loader_name: str, error: Optional[str] = None) -> None:
+        with self._lock:
+            loader = self._round["loaders"].setdefault(loader_name, self._new_loader())
+            loader["state"] = "failed" if error is not None else "finished"
+            loader["finished_at"] = time.time()
+            loader["error"] = error
+
+    def count(self, counter: str, n: int = 1) -> None:
+        with self._lock:
+            self._round["counters"][counter] = self._round["counters"].get(counter, 0) + n
+
+    def set_provider(self, key: str, provider: Optional[Callable[[], Any]]) -> None:
+        """
+        Add (or remove with None) a function that provides a live value for the snapshot.
+        """
+        with self._lock:
+            if provider is None:
+                self._providers.pop(key, None)
+            else:
+                self._providers[key] = provider
+
+    #
+    # read
+    #
+
+    def get_snapshot(self) -> Dict[str, Any]:
+        """
+        Get the current status (JSON-compatible).
+        """
+        with self._lock:
+            snapshot = {
+                "current_round": self._round_snapshot(),
+                "last_round": self._last_round,
+            }
+            providers = dict(self._providers)
+
+        for (key, provider) in providers.items():
+            try:
+                snapshot[key] = provider()
+            except Exception as e:
+                snapshot[key] = {"error": str(e)}
+        return snapshot
+
+    #
+    # internal functions
+    #
+
+    @staticmethod
+    def _new_round(round_number: Optional[int]) -> Dict[str, Any]:
+        return {
+            "round_number": round_number,
+            "state": "running" if round_number is not None else "not_started",
+            "started_at": time.time() if round_number is not None else None,
+            "finished_at": None,
+            "loaders": {},
+            "counters": {
+                DOCUMENTS_LOADED: 0,
+                DOCUMENTS_UNCHANGED: 0,
+                DOCUMENTS_PROCESSED: 0,
+                PARTS_PROCESSED: 0,
+                PARTS_REUSED: 0,
+                EMBEDDINGS_REQUESTED: 0,
+                EMBEDDING_CACHE_HITS: 0,
+                EMBEDDINGS_CALCULATED: 0,
+                NEAR_DUPLICATES_LINKED: 0,
+                NEAR_DUPLICATES_DROPPED: 0,
+            },
+        }
+
+    @staticmethod
+    def _new_loader() -> Dict[str, Any]:
+        return {"state": "running", "documents": 0, "started_at": time.time(), "last_document_at": None, "finished_at": None, "error": None}
+
+    def _round_snapshot(self) -> Dict[str, Any]:
+        # copy (with lock held) and derived values
+        round_snapshot = dict(self._round)
+        round_snapshot["loaders"] = {name: dict(loader) for (name, loader) in self._round["loaders"].items()}
+        round_snapshot["counters"] = dict(self._round["counters"])
+
+        started_at = round_snapshot["started_at"]
+        if started_at is not None:
+            elapsed_seconds = (round_snapshot["finished_at"] or time.time()) - started_at
+            round_snapshot["elapsed_seconds"] = round(elapsed_seconds, 1)
+            for counter in [DOCUMENTS_LOADED, DOCUMENTS_PROCESSED, PARTS_PROCESSED]:
+                per_second = round_snapshot["counters"][counter] / elapsed_seconds if elapsed_seconds > 0 else 0.0
+                round_snapshot[f"{counter}_per_second"] = round(per_second, 2)
+
+        # share of the (unique) parts of processed documents that were already indexed, i.e. not embedded again
+        parts_reused = round_snapshot["counters"][PARTS_REUSED]
+        parts_checked = parts_reused + round_snapshot["counters"][EMBEDDINGS_REQUESTED]
+        round_snapshot["part_reuse_ratio"] = round(parts_reused / parts_checked, 3) if parts_checked > 0 else None
+        return round_snapshot
+
+
+_indexing_status = IndexingStatus()
+
+def get_indexing_status() -> IndexingStatus:
+    return _indexing_status
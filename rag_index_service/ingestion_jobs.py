@@ -0,0 +1,102 @@
+### Ingestion Jobs
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+import shortuuid
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# states of a job
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_FINISHED = "finished"
+JOB_FAILED = "failed"
+
+
+class IngestionJobRegistry:
+    """
+    Run (ingestion) jobs in the background and keep their status, to be polled by job id.
+
+    The jobs are executed one after another by a single thread - they are serialized
+    with the full indexing rounds anyway. Only the status of the last max_jobs jobs is kept.
+    Thread-safe.
+    """
+
+    def __init__(self, max_jobs: int = 1000) -> None:
+        """
+        Args:
+            max_jobs: max number of jobs whose status is kept (the oldest are removed first)
+        """
+        self.max_jobs = max(1, max_jobs)
+
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingestion-job")
+
+    def __str__(self) -> str:
+        return f"IngestionJobRegistry(max_jobs: {self.max_jobs}, jobs: {len(self._jobs)})"
+
+    def submit(self, description: str, run: Callable[[], Any]) -> str:
+        """
+        Submit a job.
+
+        Args:
+            description: short description of the job
+            run: function that executes the job; its return value is the job result (JSON-compatible)
+
+        Returns: the job id
+        """
+        job_id = "job-" + shortuuid.uuid()[:10]
+        with self._lock:
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "description": description,
+                "status": JOB_QUEUED,
+                "submitted_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "result": None,
+                "error": None,
+            }
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+        self._executor.submit(self._run_job, job_id, run)
+        logger.info(f"Job submitted: {job_id} - {description}")
+        return job_id
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the status of a job, None if unknown.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def _run_job(self, job_id: str, run: Callable[[], Any]) -> None:
+        self._update_job(job_id, status=JOB_RUNNING, started_at=time.time())
+        try:
+            result = run()
+            self._update_job(job_id, status=JOB_FINISHED, finished_at=time.time(), result=result)
+            logger.info(f"Job finished: {job_id} - {result}")
+        except Exception as e:
+            self._update_job(job_id, status=JOB_FAILED, finished_at=time.time(), error=str(e))
+            logger.warning(f"Job failed: {job_id} - {e}", exc_info=logger.isEnabledFor(logging.DEBUG))
+
+    def _update_job(self, job_id: str, **values: Any) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(values)
+
+
+_ingestion_job_registry = IngestionJobRegistry()
+
+def get_ingestion_job_registry() -> IngestionJobRegistry:
+    return _ingestion_job_registry
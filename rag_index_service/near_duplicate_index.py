@@ -0,0 +1,207 @@
+### Near-Duplicate Index
+
+# partitially based on idea of
+#   https://stackoverflow.com/questions/52534211/python-type-hinting-with-db-api/77350678#77350678
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from _typeshed.dbapi import DBAPIConnection
+else:
+    DBAPIConnection = any
+
+import hashlib
+import re
+import threading
+from typing import Callable, ContextManager, Dict, List, Optional, Set, Tuple
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# what happens with a near-duplicate part
+NEAR_DUPLICATE_DROP = "drop"    # the part is not stored at all (the document loses it)
+NEAR_DUPLICATE_LINK = "link"    # the document references the already indexed, similar part instead
+
+# metadata of the parts (set by the embed stage, used by the SQL write):
+# - the fingerprint of a new part (as hex text, like in the part table)
+SIMHASH_METADATA_KEY = "part_simhash"
+# - True if the part references a similar, already indexed part (link mode) - its text is not stored
+NEAR_DUPLICATE_LINKED_METADATA_KEY = "near_duplicate_linked"
+
+SIMHASH_BITS = 64
+# number of words per shingle (the features of the SimHash)
+SHINGLE_SIZE = 3
+
+_WORD_REGEX = re.compile(r"\w+")
+
+
+class NearDuplicateIndex:
+    """
+    Index of the SimHash fingerprints of all parts - to find near-duplicates of new parts before they are embedded,
+    e.g. navigation bars, footers and cookie banners of crawled pages that differ only in a few words.
+
+    Similarity of two parts = share of equal bits of their 64 bit SimHash (over word shingles).
+    Candidates are found with LSH (locality-sensitive hashing): the fingerprint is divided into
+    max_distance + 1 bands - two fingerprints with at most max_distance different bits have at least one equal band.
+
+    The fingerprints are stored in the column part.simhash (written with the part rows),
+    the in-memory index is loaded from there when it's used first. New parts are added only after
+    their part rows are committed (add_committed_parts()), i.e. near-duplicates are only linked to parts
+    that are completely indexed - never to parts that are still being embedded/written, or that failed.
+    Parts indexed before the column existed don't have a fingerprint and are not found as near-duplicates. Thread-safe.
+    """
+
+    def __init__(
+        self,
+        get_connection: Callable[[], ContextManager[DBAPIConnection]],
+        mode: str = NEAR_DUPLICATE_LINK,
+        min_similarity: float = 0.88,
+        min_words: int = 20,
+    ) -> None:
+        """
+        Args:
+            get_connection: function that borrows an SQL database connection (context manager) to load the fingerprints
+            mode: NEAR_DUPLICATE_LINK or NEAR_DUPLICATE_DROP
+            min_similarity: min similarity (0..1) of a near-duplicate, e.g. 0.88 = max. 7 of 64 bits differ
+            min_words: parts with fewer words are never treated as near-duplicates (their SimHash is not reliable)
+        """
+        if mode not in (NEAR_DUPLICATE_LINK, NEAR_DUPLICATE_DROP):
+            raise ValueError(f"Unsupported near-duplicate mode: {mode} (supported: {NEAR_DUPLICATE_LINK}, {NEAR_DUPLICATE_DROP})")
+        max_distance = int((1.0 - min_similarity) * SIMHASH_BITS)
+        if max_distance < 0 or max_distance >= 16:
+            raise ValueError(f"Unsupported near-duplicate min_similarity: {min_similarity} (supported: 0.76 .. 1.0)")
+        self.get_connection = get_connection
+        self.mode = mode
+        self.min_similarity = min_similarity
+        self.min_words = min_words
+        self.max_distance = max_distance
+
+        # bands: (shift, mask) - the bits are distributed as evenly as possible
+        num_bands = max_distance + 1
+        bounds = [i * SIMHASH_BITS // num_bands for i in range(num_bands + 1)]
+        self._bands: List[Tuple[int, int]] = [(bounds[i], (1 << (bounds[i + 1] - bounds[i])) - 1) for i in range(num_bands)]
+
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._simhashes: Dict[str, int] = {}
+        self._buckets: Dict[Tuple[int, int], Set[str]] = {}
+        self._stats = {"parts_checked": 0, "near_duplicates_found": 0}
+
+    def __str__(self) -> str:
+        return f"NearDuplicateIndex(mode: {self.mode}, min_similarity: {self.min_similarity}, max_distance: {self.max_distance}, bands: {len(self._bands)}, parts: {len(self._simhashes)})"
+
+    def find_near_duplicates(self, texts_by_sha256: Dict[str, str]) -> Tuple[Dict[str, str], Dict[str, int]]:
+        """
+        Find near-duplicates of new parts among the (committed) parts of the index.
+        The index is not changed - see add_committed_parts().
+
+        Args:
+            texts_by_sha256: the texts of the new (not yet indexed) parts by their sha256 hashes
+
+        Returns: (sha256 hashes of the already indexed, similar parts by the sha256 hashes of the near-duplicates,
+                  SimHash fingerprints of the other new parts by their sha256 hashes - to be stored with them)
+        """
+        near_duplicates: Dict[str, str] = {}
+        simhashes: Dict[str, int] = {}
+        with self._lock:
+            self._load_if_needed()
+        for (sha256, text) in texts_by_sha256.items():
+            # (computed without the lock)
+            simhash = compute_simhash(text, self.min_words)
+            if simhash is None:
+                continue
+            with self._lock:
+                self._stats["parts_checked"] += 1
+                similar_sha256 = self._find_similar(simhash)
+                if similar_sha256 is not None and similar_sha256 != sha256:
+                    near_duplicates[sha256] = similar_sha256
+                    self._stats["near_duplicates_found"] += 1
+                else:
+                    simhashes[sha256] = simhash
+        if len(near_duplicates) > 0:
+            logger.info(f"{self}: {len(near_duplicates)} near-duplicate(s) of {len(texts_by_sha256)} new part(s)")
+        return (near_duplicates, simhashes)
+
+    def add_committed_parts(self, simhashes_by_sha256: Dict[str, int]) -> None:
+        """
+        Add the fingerprints of parts whose part rows are committed now.
+        (If the index is not loaded, nothing is done: the parts are loaded from the SQL DB later.)
+
+        Args:
+            simhashes_by_sha256: SimHash fingerprints by the sha256 hashes of the parts
+        """
+        with self._lock:
+            if not self._loaded:
+                return
+            for (sha256, simhash) in simhashes_by_sha256.items():
+                self._add(sha256, simhash)
+
+    def reset(self) -> None:
+        """
+        Forget the in-memory index, e.g. after parts were deleted: it's loaded again when it's used next time.
+        """
+        with self._lock:
+            self._loaded = False
+            self._simhashes = {}
+            self._buckets = {}
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "parts_indexed": len(self._simhashes)}
+
+    #
+    # internal functions (with lock held)
+    #
+
+    def _load_if_needed(self) -> None:
+        if self._loaded:
+            return
+        with self.get_connection() as sqlCon:
+            cur = sqlCon.cursor()
+            cur.execute("SELECT sha256, simhash FROM part WHERE simhash IS NOT NULL")
+            for (sha256, simhash_hex) in cur.fetchall():
+                self._add(sha256, int(simhash_hex, 16))
+            cur.close()
+        self._loaded = True
+        logger.info(f"{self}: loaded")
+
+    def _add(self, sha256: str, simhash: int) -> None:
+        self._simhashes[sha256] = simhash
+        for (i, (shift, mask)) in enumerate(self._bands):
+            self._buckets.setdefault((i, (simhash >> shift) & mask), set()).add(sha256)
+
+    def _find_similar(self, simhash: int) -> Optional[str]:
+        best: Optional[Tuple[int, str]] = None
+        for (i, (shift, mask)) in enumerate(self._bands):
+            for candidate_sha256 in self._buckets.get((i, (simhash >> shift) & mask), ()):
+                distance = bin(simhash ^ self._simhashes[candidate_sha256]).count("1")
+                if distance <= self.max_distance and (best is None or distance < best[0]):
+                    best = (distance, candidate_sha256)
+        return best[1] if best is not None else None
+
+
+def compute_simhash(text: str, min_words: int = 0) -> Optional[int]:
+    """
+    Compute the 64 bit SimHash of the text over its (lower-case) word shingles.
+
+    Returns: the fingerprint, or None if the text has fewer than min_words words
+    """
+    words = _WORD_REGEX.findall(text.lower())
+    if len(words) < max(min_words, 1):
+        return None
+    weights = [0] * SIMHASH_BITS
+    for i in range(max(1, len(words) - SHINGLE_SIZE + 1)):
+        shingle = " ".join(words[i:i + SHINGLE_SIZE])
+        h = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if (h >> bit) & 1 else -1
+    simhash = 0
+    for bit in range(SIMHASH_BITS):
+        if weights[bit] > 0:
+            simhash |= 1 << bit
+    return simhash
+
+
+def format_simhash(simhash: Optional[int]) -> Optional[str]:
+    # stored as fixed-length hex text: portable, and unsigned 64 bit values don't fit into all SQL integer types
+    return f"{simhash:016x}" if simhash is not None else None
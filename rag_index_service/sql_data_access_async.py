@@ -0,0 +1,58 @@
+### Async SQL Data Access
+#
+# Async wrappers of the (synchronous, PEP 249) SQL data access functions - for request-path code,
+# i.e. for async endpoints: a blocking DB call in a coroutine would freeze the event loop
+# and with it all other requests, e.g. the streamed chat responses.
+#
+# The blocking calls are offloaded to a dedicated thread pool, not larger than the SQL connection pool:
+# waiting requests wait in the event loop (cheap) instead of blocking threads (of the default executor).
+#
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache, partial
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from factory.sql_database_factory import get_sql_database_connection_pool
+from rag_index_service.build_index import get_page_from_sqldb
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+T = TypeVar("T")
+
+
+@cache
+def get_sql_executor() -> ThreadPoolExecutor:
+    """
+    Get the thread pool for blocking SQL calls of async code.
+    """
+    max_workers = get_sql_database_connection_pool().pool_size
+    logger.info(f"Setup SQL executor with max_workers={max_workers}")
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sql-async")
+
+
+async def run_sql(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Run a blocking SQL function in the SQL thread pool, without blocking the event loop.
+
+    Usage:
+        (rows, next_after) = await run_sql(get_page_from_sqldb, "documents", 100)
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_sql_executor(), partial(func, *args, **kwargs))
+
+
+#
+# async variants of the SQL data access functions
+#
+
+async def get_page_from_sqldb_async(
+    listing: str,
+    limit: int,
+    after: Optional[List[str]] = None,
+    fields: Optional[List[str]] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[List[str]]]:
+    return await run_sql(get_page_from_sqldb, listing, limit, after, fields)
@@ -0,0 +1,257 @@
+### SQL Index Writer
+
+# partitially based on idea of
+#   https://stackoverflow.com/questions/52534211/python-type-hinting-with-db-api/77350678#77350678
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from _typeshed.dbapi import DBAPIConnection, DBAPICursor
+else:
+    DBAPIConnection = any
+    DBAPICursor = any
+
+import queue
+import threading
+import time
+from typing import Callable, ContextManager, List, Optional, Tuple
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# a unit of work: all SQL statements of a single document (or another consistent change),
+# executed with the cursor provided by the writer
+SqlWriteUnit = Callable[[DBAPICursor], None]
+
+# called (in the writer thread) after the transaction of a unit is committed
+SqlCommitCallback = Callable[[], None]
+
+# interval of the liveness checks of the writer thread while flush() waits
+FLUSH_CHECK_INTERVAL_SECONDS = 1.0
+
+
+class SqlIndexWriter:
+    """
+    Single writer (thread) for the SQL index tables.
+
+    All writes are submitted as units of work (e.g. all statements of a single document)
+    and executed by one dedicated thread, one after another (FIFO).
+    Commits are grouped: a transaction is committed after commit_max_units units
+    or commit_max_seconds seconds, whatever comes first - instead of a commit after each row.
+
+    If a unit fails, the open transaction is rolled back and the other units
+    of the group are executed and committed again, each in its own transaction.
+    """
+
+    def __init__(
+        self,
+        get_connection: Callable[[], ContextManager[DBAPIConnection]],
+        commit_max_units: int = 50,
+        commit_max_seconds: float = 2.0,
+    ) -> None:
+        """
+        Args:
+            get_connection: function that borrows an SQL database connection to write with (context manager);
+                            a connection is borrowed for each transaction only
+            commit_max_units: max number of units of work per transaction
+            commit_max_seconds: max time a transaction stays open before it is committed
+        """
+        self.get_connection = get_connection
+        self.commit_max_units = max(1, commit_max_units)
+        self.commit_max_seconds = commit_max_seconds
+
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+        # borrowed connection while a transaction is open (only used by the writer thread)
+        self._connection_context: Optional[ContextManager[DBAPIConnection]] = None
+        self._sqlCon: Optional[DBAPIConnection] = None
+
+    def __str__(self) -> str:
+        return f"SqlIndexWriter(commit_max_units: {self.commit_max_units}, commit_max_seconds: {self.commit_max_seconds})"
+
+    def submit(self, unit: SqlWriteUnit, description: str, on_commit: Optional[SqlCommitCallback] = None) -> None:
+        """
+        Submit a unit of work. It is executed asynchronously by the writer thread.
+
+        Args:
+            unit: function that executes the SQL statements with the given cursor (without commit)
+            description: short description for logging
+            on_commit: function called after the unit is committed (not called if the unit is dropped)
+        """
+        self._ensure_thread_is_running()
+        self._queue.put((description, unit, on_commit))
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """
+        Block until all units submitted so far are executed and committed.
+
+        Args:
+            timeout: max seconds to wait (None: as long as the writer thread is alive)
+
+        Raises: TimeoutError if the timeout expired, RuntimeError if the writer thread died
+                (it's started again with the next submit()/flush())
+        """
+        thread = self._ensure_thread_is_running()
+        flushed = threading.Event()
+        self._queue.put(flushed)
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            wait_seconds = FLUSH_CHECK_INTERVAL_SECONDS
+            if deadline is not None:
+                wait_seconds = max(0.0, min(wait_seconds, deadline - time.monotonic()))
+            if flushed.wait(wait_seconds):
+                return
+            if not thread.is_alive():
+                raise RuntimeError(f"{self}: writer thread died - flush incomplete")
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"{self}: flush not done after {timeout} seconds ({self.pending_units()} pending unit(s))")
+
+    def pending_units(self) -> int:
+        """
+        Number of submitted units that are not executed yet.
+        """
+        return self._queue.qsize()
+
+    #
+    # internal functions - executed in the writer thread
+    #
+
+    def _ensure_thread_is_running(self) -> threading.Thread:
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                if self._thread is not None:
+                    logger.warning(f"{self} - writer thread died - restarting it")
+                    # (the open transaction of the dead thread is lost)
+                    if self._sqlCon is not None:
+                        self._rollback(self._sqlCon)
+                    self._release_connection()
+                self._thread = threading.Thread(target=self._run, name="sql-index-writer", daemon=True)
+                self._thread.start()
+            return self._thread
+
+    def _run(self) -> None:
+        logger.info(f"{self} - writer thread started")
+
+        # units of the current (not yet committed) transaction
+        group: List[Tuple[str, SqlWriteUnit, Optional[SqlCommitCallback]]] = []
+        group_started_at = 0.0
+
+        while True:
+            # wait for the next unit, but not longer than the current transaction may stay open
+            timeout = None
+            if len(group) > 0:
+                timeout = max(0.0, group_started_at + self.commit_max_seconds - time.time())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                self._commit_group(group)
+                group = []
+                continue
+
+            # flush request?
+            if isinstance(item, threading.Event):
+                self._commit_group(group)
+                group = []
+                item.set()
+                continue
+
+            # execute unit
+            (description, unit, _) = item
+            if len(group) == 0:
+                group_started_at = time.time()
+            sqlCon = None
+            try:
+                sqlCon = self._borrow_connection()
+                self._execute_unit(sqlCon, unit)
+                group.append(item)
+            except Exception as e:
+                if sqlCon is None:
+                    # no connection (e.g. "database is locked") - nothing borrowed, i.e. no open transaction
+                    logger.warning(f"SQL write failed - no connection - unit dropped: {description}: {e}")
+                    self._release_connection()
+                    group = []
+                    continue
+                logger.warning(f"SQL write failed - rolling back {len(group)+1} unit(s) of the current transaction: {description}: {e}")
+                self._rollback(sqlCon)
+                self._execute_units_one_by_one(sqlCon, group)
+                self._release_connection()
+                group = []
+                continue
+
+            # group complete?
+            if len(group) >= self.commit_max_units:
+                self._commit_group(group)
+                group = []
+
+    def _borrow_connection(self) -> DBAPIConnection:
+        if self._connection_context is None:
+            connection_context = self.get_connection()
+            self._sqlCon = connection_context.__enter__()
+            self._connection_context = connection_context
+        return self._sqlCon
+
+    def _release_connection(self) -> None:
+        if self._connection_context is not None:
+            connection_context = self._connection_context
+            self._connection_context = None
+            self._sqlCon = None
+            try:
+                connection_context.__exit__(None, None, None)
+            except Exception as e:
+                logger.warning(f"SQL connection release failed: {e}")
+
+    def _execute_unit(self, sqlCon: DBAPIConnection, unit: SqlWriteUnit) -> None:
+        cur = sqlCon.cursor()
+        try:
+            unit(cur)
+        finally:
+            cur.close()
+
+    def _commit_group(self, group: List[Tuple[str, SqlWriteUnit, Optional[SqlCommitCallback]]]) -> None:
+        if len(group) == 0:
+            return
+        try:
+            sqlCon = self._borrow_connection()
+        except Exception as e:
+            logger.warning(f"SQL commit of {len(group)} unit(s) failed - no connection - units dropped: {e}")
+            self._release_connection()
+            return
+        try:
+            try:
+                sqlCon.commit()
+                logger.info(f"Committed {len(group)} SQL write unit(s)")
+            except Exception as e:
+                logger.warning(f"SQL commit of {len(group)} unit(s) failed - retrying unit by unit: {e}")
+                self._rollback(sqlCon)
+                self._execute_units_one_by_one(sqlCon, group)
+                return
+            for (description, _, on_commit) in group:
+                self._call_on_commit(description, on_commit)
+        finally:
+            self._release_connection()
+
+    def _execute_units_one_by_one(self, sqlCon: DBAPIConnection, group: List[Tuple[str, SqlWriteUnit, Optional[SqlCommitCallback]]]) -> None:
+        for (description, unit, on_commit) in group:
+            try:
+                self._execute_unit(sqlCon, unit)
+                sqlCon.commit()
+            except Exception as e:
+                logger.warning(f"SQL write failed - unit dropped: {description}: {e}")
+                self._rollback(sqlCon)
+                continue
+            self._call_on_commit(description, on_commit)
+
+    def _call_on_commit(self, description: str, on_commit: Optional[SqlCommitCallback]) -> None:
+        if on_commit is None:
+            return
+        try:
+            on_commit()
+        except Exception as e:
+            logger.warning(f"Commit callback failed: {description}: {e}")
+
+    def _rollback(self, sqlCon: DBAPIConnection) -> None:
+        try:
+            sqlCon.rollback()
+        except Exception as e:
+            logger.warning(f"SQL rollback failed: {e}")
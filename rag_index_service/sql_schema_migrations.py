@@ -0,0 +1,208 @@
+### SQL Schema Migrations
+
+# partitially based on idea of
+#   https://stackoverflow.com/questions/52534211/python-type-hinting-with-db-api/77350678#77350678
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from _typeshed.dbapi import DBAPIConnection, DBAPICursor
+else:
+    DBAPIConnection = any
+    DBAPICursor = any
+
+import time
+from typing import Dict, List, Tuple
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+#
+# Versioned schema migrations for the SQL DB.
+#
+# The applied migrations are recorded in the table 'schema_version'.
+# Each migration is applied once - in the order of the versions.
+# Append new migrations at the end - NEVER change an existing migration.
+#
+# Supported SQL dialect: "sqlite" only.
+# The SQL of the indexing service is SQLite SQL with the qmark paramstyle ("... WHERE x=?")
+# and upserts of the form "INSERT ... SELECT ?, ? WHERE NOT EXISTS (...)" (without FROM) -
+# PostgreSQL (format paramstyle) and MySQL/MariaDB (SELECT without FROM) are not supported yet.
+#
+
+# column types by dialect
+SQL_TYPES: Dict[str, Dict[str, str]] = {
+    "sqlite": {
+        "ID_TEXT": "TEXT",
+        "SHA256_TEXT": "TEXT",
+        "SOURCE_TEXT": "TEXT",
+        "MODEL_TEXT": "TEXT",
+        "BLOB": "BLOB",
+    },
+}
+
+DB_TABLE_schema_version = """CREATE TABLE IF NOT EXISTS schema_version (
+                                 version INTEGER NOT NULL PRIMARY KEY,
+                                 applied_at TEXT
+                             )"""
+
+#
+# migration 1: initial tables
+#
+
+# a document represents a a full file/document
+DB_TABLE_document = """CREATE TABLE IF NOT EXISTS document (
+                            id {ID_TEXT} NOT NULL PRIMARY KEY,
+                            source {SOURCE_TEXT} NOT NULL,
+                            content_type TEXT NOT NULL,
+                            file_path TEXT,
+                            file_size INTEGER,
+                            file_sha256 TEXT,
+                            last_modified TEXT
+                    )"""
+# a (document) part represents a part of a document after splitting, e.g., a page, a paragraph, a part of a page
+# - sha256: sha256 hash of the content of this part, also used as ID in the vectorstore
+DB_TABLE_part = """CREATE TABLE IF NOT EXISTS part (
+                       sha256 {SHA256_TEXT} NOT NULL PRIMARY KEY,
+                       content TEXT NOT NULL
+                   )"""
+# connection between a document and its parts
+# - anker: position of the part in the document - e.g., page number, paragraph number, ...
+DB_TABLE_document_part = """CREATE TABLE IF NOT EXISTS document_part (
+                                document_id {ID_TEXT} NOT NULL,
+                                part_sha256 {SHA256_TEXT} NOT NULL,
+                                anker TEXT
+                            )"""
+# cache of embeddings, identified by part (sha256 hash) and embedding model,
+# to avoid new embedding calculations, e.g. after changing the embedding model back or after loss of the vectorstore
+DB_TABLE_embedding_cache = """CREATE TABLE IF NOT EXISTS embedding_cache (
+                                  part_sha256 {SHA256_TEXT} NOT NULL,
+                                  model {MODEL_TEXT} NOT NULL,
+                                  dtype TEXT NOT NULL,
+                                  dimensions INTEGER NOT NULL,
+                                  vector {BLOB} NOT NULL,
+                                  PRIMARY KEY (part_sha256, model)
+                              )"""
+# indexing rounds (persistent round numbers)
+DB_TABLE_indexing_round = """CREATE TABLE IF NOT EXISTS indexing_round (
+                                 round_number INTEGER NOT NULL PRIMARY KEY,
+                                 started_at TEXT,
+                                 finished_at TEXT
+                             )"""
+# the last indexing round in which a source was seen - for the garbage collection
+DB_TABLE_source_seen = """CREATE TABLE IF NOT EXISTS source_seen (
+                              source {SOURCE_TEXT} NOT NULL PRIMARY KEY,
+                              last_seen_round INTEGER NOT NULL
+                          )"""
+
+#
+# migration 2: indexes for the lookups/deletions by source, document and part
+#
+DB_INDEXES_v2 = [
+    "CREATE INDEX IF NOT EXISTS idx_document_source ON document (source)",
+    "CREATE INDEX IF NOT EXISTS idx_document_part_document_id ON document_part (document_id)",
+    "CREATE INDEX IF NOT EXISTS idx_document_part_part_sha256 ON document_part (part_sha256)",
+    "CREATE INDEX IF NOT EXISTS idx_source_seen_last_seen_round ON source_seen (last_seen_round)",
+]
+
+#
+# migration 3: HTTP cache records of web sources - for conditional requests (ETag/Last-Modified)
+#
+# - url: requested URL
+# - source: URL after redirects (=source of the documents)
+# - links: JSON list of the links of the page - to continue crawling without loading an unchanged page
+DB_TABLE_http_cache = """CREATE TABLE IF NOT EXISTS http_cache (
+                             url {SOURCE_TEXT} NOT NULL PRIMARY KEY,
+                             source TEXT,
+                             etag TEXT,
+                             last_modified TEXT,
+                             content_sha256 {SHA256_TEXT},
+                             links TEXT,
+                             fetched_at TEXT
+                         )"""
+
+#
+# migration 4: SimHash fingerprints of the parts - for the near-duplicate detection
+#
+# - simhash: 64 bit fingerprint as 16 hex digits (NULL: part indexed without near-duplicate detection)
+DB_COLUMN_part_simhash = "ALTER TABLE part ADD COLUMN simhash VARCHAR(16)"
+
+#
+# migration 5: sources owned externally (pushed with the ingestion API) - never swept by the garbage collection
+#
+DB_COLUMN_source_seen_externally_owned = "ALTER TABLE source_seen ADD COLUMN externally_owned INTEGER NOT NULL DEFAULT 0"
+
+# all migrations: (version, description, statements)
+MIGRATIONS: List[Tuple[int, str, List[str]]] = [
+    (1, "initial tables", [
+        DB_TABLE_document,
+        DB_TABLE_part,
+        DB_TABLE_document_part,
+        DB_TABLE_embedding_cache,
+        DB_TABLE_indexing_round,
+        DB_TABLE_source_seen,
+    ]),
+    (2, "indexes on document/document_part/source_seen", DB_INDEXES_v2),
+    (3, "HTTP cache of web sources", [DB_TABLE_http_cache]),
+    (4, "SimHash column of parts", [DB_COLUMN_part_simhash]),
+    (5, "externally owned sources", [DB_COLUMN_source_seen_externally_owned]),
+]
+
+
+def migrate_sql_database(sqlCon: DBAPIConnection, dialect: str) -> int:
+    """
+    Apply all migrations that are not applied yet to the SQL DB.
+
+    Returns: the schema version after the migration
+
+    Raises: ValueError for SQL dialects other than "sqlite" - the SQL of the indexing service is SQLite-specific
+    """
+    if dialect not in SQL_TYPES:
+        raise ValueError(f"Unsupported SQL dialect: {dialect} (supported: {list(SQL_TYPES.keys())}) - the indexing service uses SQLite SQL with the qmark paramstyle")
+
+    cur = sqlCon.cursor()
+    cur.execute(DB_TABLE_schema_version)
+    cur.execute("SELECT MAX(version) FROM schema_version")
+    row = cur.fetchone()
+    current_version = (row[0] or 0) if row is not None else 0
+    cur.close()
+    sqlCon.commit()
+
+    for (version, description, statements) in MIGRATIONS:
+        if version <= current_version:
+            continue
+
+        logger.info(f"Schema migration {current_version} -> {version} ({description}) ...")
+        cur = sqlCon.cursor()
+        try:
+            for statement in statements:
+                _execute_idempotent(cur, _format_statement(statement, dialect))
+            cur.execute("INSERT INTO schema_version (version, applied_at) VALUES (?, ?)", (version, time.strftime('%Y-%m-%d %H:%M:%S')))
+            sqlCon.commit()
+        except Exception as e:
+            logger.error(f"Schema migration {current_version} -> {version} ({description}) failed: {e}")
+            sqlCon.rollback()
+            raise
+        finally:
+            cur.close()
+        current_version = version
+
+    logger.info(f"Schema version: {current_version}")
+    return current_version
+
+
+def _format_statement(statement: str, dialect: str) -> str:
+    return statement.format(**SQL_TYPES[dialect])
+
+def _execute_idempotent(cur: DBAPICursor, statement: str) -> None:
+    try:
+        cur.execute(statement)
+    except Exception as e:
+        if not _is_already_exists_error(e):
+            raise
+        logger.info(f"Schema migration: already applied - ignored: {statement}: {e}")
+
+def _is_already_exists_error(e: Exception) -> bool:
+    # e.g. "table document already exists", "duplicate column name: simhash"
+    message = str(e).lower()
+    return "already exists" in message or "duplicate column name" in message
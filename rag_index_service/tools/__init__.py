@@ -1,7 +1,13 @@
+from rag_index_service.tools.content_defined_text_splitter import ContentDefinedTextSplitter
 from rag_index_service.tools.default_blob_parser import DefaultBlobParser
+from rag_index_service.tools.fast_html_parser import FastHTMLParser
+from rag_index_service.tools.web_crawler_blob_loader import WebCrawlerBlobLoader
 from rag_index_service.tools.wget_blob_loader import WgetBlobLoader
 
 __all__ = [
+    "ContentDefinedTextSplitter",
     "DefaultBlobParser",
+    "FastHTMLParser",
+    "WebCrawlerBlobLoader",
     "WgetBlobLoader",
 ]
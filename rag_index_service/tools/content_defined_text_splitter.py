@@ -0,0 +1,114 @@
+import hashlib
+from typing import Any, List
+
+from langchain_text_splitters import TextSplitter
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+_HASH_MASK_64 = (1 << 64) - 1
+
+# "gear" table of the rolling hash: one pseudo-random 64 bit value per character (code point modulo 256) -
+# derived from sha256, i.e. the same in every process and release (the chunk boundaries must be stable)
+_GEAR = [
+    int.from_bytes(hashlib.sha256(f"gear-{i}".encode("ascii")).digest()[:8], "big")
+    for i in range(256)
+]
+
+
+class ContentDefinedTextSplitter(TextSplitter):
+    """
+    Split text into chunks at content-defined boundaries (gear rolling hash, like FastCDC):
+    a chunk ends where the hash over the last ~64 characters matches a bit mask,
+    i.e. the boundaries depend on the local content only, not on the position in the text.
+
+    A local edit (e.g. a sentence inserted near the top of a document) changes only the chunk(s)
+    around the edit - all other chunks (and their part_sha256 hashes) stay the same and
+    don't need to be embedded again. With fixed-size splitting all following chunks would shift.
+
+    Details:
+    - runs of whitespace are hashed as a single space, i.e. re-wrapped lines/indentation don't move boundaries
+    - a chunk is cut at the first whitespace after the hash matched (no words are split)
+    - chunk sizes (in characters): at least min_chunk_size (except the last one),
+      avg_chunk_size on average, at most max_chunk_size (cut at the last whitespace before, if any)
+    - no overlap between chunks
+    """
+
+    def __init__(
+        self,
+        min_chunk_size: int = 500,
+        avg_chunk_size: int = 2000,
+        max_chunk_size: int = 4000,
+        **kwargs: Any,
+    ) -> None:
+        """
+        Args:
+            min_chunk_size: min size of a chunk in characters
+            avg_chunk_size: average (expected) size of a chunk in characters
+            max_chunk_size: max size of a chunk in characters
+            kwargs: additional arguments of TextSplitter (e.g. add_start_index)
+        """
+        if not 0 < min_chunk_size < avg_chunk_size < max_chunk_size:
+            raise ValueError(f"Chunk sizes must be 0 < min_chunk_size < avg_chunk_size < max_chunk_size: {min_chunk_size}, {avg_chunk_size}, {max_chunk_size}")
+        super().__init__(chunk_size=max_chunk_size, chunk_overlap=0, **kwargs)
+        self.min_chunk_size = min_chunk_size
+        self.avg_chunk_size = avg_chunk_size
+        self.max_chunk_size = max_chunk_size
+
+        # boundary if the top bits of the hash are 0: after min_chunk_size, a boundary is expected every
+        # 2^bits characters, i.e. (avg_chunk_size - min_chunk_size) rounded down to a power of 2
+        # (the top bits depend on the last 64 characters only)
+        bits = max(1, (avg_chunk_size - min_chunk_size).bit_length() - 1)
+        self._boundary_mask = ((1 << bits) - 1) << (64 - bits)
+
+    def __str__(self) -> str:
+        return f"ContentDefinedTextSplitter(min_chunk_size: {self.min_chunk_size}, avg_chunk_size: {self.avg_chunk_size}, max_chunk_size: {self.max_chunk_size})"
+
+    def split_text(self, text: str) -> List[str]:
+        chunks: List[str] = []
+        start = 0
+        while start < len(text):
+            end = self._find_chunk_end(text, start)
+            chunk = text[start:end].strip()
+            if len(chunk) > 0:
+                chunks.append(chunk)
+            start = end
+        return chunks
+
+    def _find_chunk_end(self, text: str, start: int) -> int:
+        text_len = len(text)
+        max_end = min(start + self.max_chunk_size, text_len)
+        if text_len - start <= self.min_chunk_size:
+            return text_len
+
+        gear = _GEAR
+        mask = self._boundary_mask
+        h = 0
+        in_whitespace = False
+        last_whitespace = -1
+        boundary_found = False
+        for i in range(start, max_end):
+            c = text[i]
+            if c.isspace():
+                if boundary_found:
+                    return i
+                last_whitespace = i
+                if in_whitespace:
+                    # whitespace normalization: a run of whitespace is hashed once
+                    continue
+                in_whitespace = True
+                c = " "
+            else:
+                in_whitespace = False
+            h = ((h << 1) + gear[ord(c) & 0xFF]) & _HASH_MASK_64
+            if not boundary_found and i - start >= self.min_chunk_size and (h & mask) == 0:
+                boundary_found = True
+
+        # max. chunk size reached (or end of text)
+        if max_end == text_len:
+            return text_len
+        if last_whitespace > start + self.min_chunk_size:
+            return last_whitespace
+        return max_end
@@ -1,4 +1,4 @@
-from typing import Iterator, Mapping
+from typing import Any, Dict, Iterator, Mapping, Optional
 from langchain_core.documents import Document
 from langchain_core.documents.base import Blob
 from langchain_community.document_loaders.base import BaseBlobParser
@@ -7,21 +7,40 @@ from langchain_community.document_loaders.parsers.html import BS4HTMLParser
 from langchain_community.document_loaders.parsers.txt import TextParser
 from langchain_community.document_loaders.parsers.pdf import PyPDFParser
 
+from rag_index_service.tools.fast_html_parser import FastHTMLParser
+
+# supported HTML parsers
+HTML_PARSER_BS4 = "bs4"     # BS4HTMLParser: complete text of the page
+HTML_PARSER_FAST = "fast"   # FastHTMLParser: streaming, without boilerplate (nav, footer, repeated blocks, ...)
+
 class DefaultBlobParser(MimeTypeBasedParser):
-    def __init__(self):
+    def __init__(self, html_parser: str = HTML_PARSER_BS4, html_parser_args: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            html_parser: parser of "text/html" blobs: HTML_PARSER_BS4 or HTML_PARSER_FAST
+            html_parser_args: additional arguments of the HTML parser class
+        """
+        if html_parser == HTML_PARSER_BS4:
+            html_blob_parser = BS4HTMLParser(**(html_parser_args or {}))
+        elif html_parser == HTML_PARSER_FAST:
+            html_blob_parser = FastHTMLParser(**(html_parser_args or {}))
+        else:
+            raise ValueError(f"Unknown HTML parser: {html_parser} (supported: {HTML_PARSER_BS4}, {HTML_PARSER_FAST})")
+        self.html_parser = html_parser
+
         # Define the parsers for the different mime types
         handlers: Mapping[str, BaseBlobParser] = {
-            "text/html": BS4HTMLParser(),
+            "text/html": html_blob_parser,
             "text/plain": TextParser(),
             "application/pdf": PyPDFParser(),
-        },
+        }
         fallback_parser = TextParser()
     
         # Call the parent class constructor
         super().__init__(handlers=handlers, fallback_parser=fallback_parser)
 
     def __str__(self) -> str:
-        return f"DefaultBlobParser()"
+        return f"DefaultBlobParser(html_parser: {self.html_parser})"
 
     def lazy_parse(self, blob: Blob) -> Iterator[Document]:
         """Load documents from a blob."""
@@ -0,0 +1,245 @@
+from collections import OrderedDict
+import hashlib
+from html.parser import HTMLParser
+import re
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+from langchain_core.documents import Document
+from langchain_core.documents.base import Blob
+from langchain_community.document_loaders.base import BaseBlobParser
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# elements whose content is never text of the page
+DEFAULT_SKIP_TAGS = ["script", "style", "noscript", "template", "svg", "iframe", "nav", "footer", "aside", "form"]
+# elements with these ARIA roles are skipped, too
+DEFAULT_SKIP_ROLES = ["navigation", "banner", "contentinfo", "search"]
+
+# elements that start a new block (line) of text
+_BLOCK_TAGS = {
+    "address", "article", "blockquote", "br", "dd", "details", "div", "dl", "dt", "fieldset", "figcaption", "figure",
+    "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "li", "main", "ol", "p", "pre", "section", "summary",
+    "table", "td", "th", "tr", "ul",
+}
+# elements without end tag
+_VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param", "source", "track", "wbr"}
+
+# site template contexts - only blocks inside of them are removed as repeated blocks:
+# elements, ARIA roles, and words in the class/id attributes
+_TEMPLATE_TAGS = {"header", "nav", "footer", "aside"}
+_TEMPLATE_ROLES = {"banner", "navigation", "contentinfo", "complementary"}
+_TEMPLATE_CLASS_REGEX = re.compile(r"(?:^|[\s_-])(?:header|nav|navbar|navigation|menu|breadcrumbs?|footer|sidebar|cookies?|banner)(?:$|[\s_-])", re.IGNORECASE)
+
+_WHITESPACE_REGEX = re.compile(r"\s+")
+
+# max number of distinct blocks remembered per host (for the detection of repeated blocks)
+REPEATED_BLOCKS_MAX_PER_HOST = 50000
+
+
+class FastHTMLParser(BaseBlobParser):
+    """
+    Fast HTML text extraction with boilerplate removal - an alternative to BS4HTMLParser.
+
+    The HTML is processed in a single pass with the streaming tokenizer of the standard library
+    (no document tree is built), and:
+    - the content of script/style/nav/footer/... elements (skip_tags, skip_roles) is skipped
+    - the text is split into blocks (paragraphs, list items, headings, table cells, ...), one per line
+    - template blocks that appeared on at least repeated_block_min_pages different pages of the same host
+      are removed (e.g. header menus, breadcrumbs, cookie notes) - but only blocks inside of
+      site template contexts (header/nav/footer/aside elements, banner/navigation/contentinfo/complementary roles,
+      "header", "menu", "breadcrumb", "cookie", ... in the class/id) with at least repeated_block_min_length characters;
+      short headings and table cells of the main content are never removed
+
+    The title is added to the metadata (like BS4HTMLParser does).
+
+    The repeated template blocks are counted per parser instance (and per parser process), i.e. the result
+    depends on the pages parsed before: the first pages of a host keep their template blocks, because they
+    are not known as repeated yet. The main content is always the same.
+    """
+
+    def __init__(
+        self,
+        skip_tags: Optional[List[str]] = None,
+        skip_roles: Optional[List[str]] = None,
+        repeated_block_min_pages: int = 3,
+        repeated_block_min_length: int = 20,
+    ) -> None:
+        """
+        Args:
+            skip_tags: elements whose content is skipped, default: DEFAULT_SKIP_TAGS
+            skip_roles: ARIA roles of elements whose content is skipped, default: DEFAULT_SKIP_ROLES
+            repeated_block_min_pages: remove template blocks that appeared on this number of pages of the host (min. 2); 0 to keep them
+            repeated_block_min_length: template blocks with fewer characters are never removed
+        """
+        if repeated_block_min_pages == 1 or repeated_block_min_pages < 0:
+            raise ValueError(f"Unsupported repeated_block_min_pages: {repeated_block_min_pages} (supported: 0 or >= 2)")
+        self.skip_tags = set(skip_tags if skip_tags is not None else DEFAULT_SKIP_TAGS)
+        self.skip_roles = set(skip_roles if skip_roles is not None else DEFAULT_SKIP_ROLES)
+        self.repeated_block_min_pages = repeated_block_min_pages
+        self.repeated_block_min_length = repeated_block_min_length
+
+        # per host: sources (hashes) of the pages by block hash - max. repeated_block_min_pages sources per block
+        self._block_sources_by_host: Dict[str, "OrderedDict[str, Set[str]]"] = {}
+
+    def __str__(self) -> str:
+        return f"FastHTMLParser(skip_tags: {sorted(self.skip_tags)}, repeated_block_min_pages: {self.repeated_block_min_pages}, repeated_block_min_length: {self.repeated_block_min_length})"
+
+    def lazy_parse(self, blob: Blob) -> Iterator[Document]:
+        """Load HTML document into document objects."""
+        extractor = _TextExtractor(self.skip_tags, self.skip_roles)
+        try:
+            extractor.feed(blob.as_string())
+            extractor.close()
+        except Exception as e:
+            # (the tokenizer is lenient - keep what was extracted so far)
+            logger.debug(f"HTML text extraction failed (partially): {blob.source}: {e}")
+        blocks = extractor.get_blocks()
+
+        # remove repeated template blocks of the host
+        if self.repeated_block_min_pages > 0:
+            num_blocks = len(blocks)
+            blocks = self._remove_repeated_blocks(blob.source, blocks)
+            if len(blocks) < num_blocks:
+                logger.debug(f"{self}: {num_blocks - len(blocks)} of {num_blocks} block(s) removed as repeated: {blob.source}")
+
+        metadata = {
+            "source": blob.source,
+            "title": extractor.get_title(),
+        }
+        yield Document(page_content="\n".join(block for (block, _) in blocks), metadata=metadata)
+
+    def _remove_repeated_blocks(self, source: Optional[str], blocks: List[Tuple[str, bool]]) -> List[Tuple[str, bool]]:
+        host = urlparse(source or "").netloc
+        block_sources = self._block_sources_by_host.setdefault(host, OrderedDict())
+        source_key = hashlib.sha256((source or "").encode("utf-8")).hexdigest()[:16]
+
+        result: List[Tuple[str, bool]] = []
+        for (block, in_template) in blocks:
+            if not in_template or len(block) < self.repeated_block_min_length:
+                result.append((block, in_template))
+                continue
+            block_key = hashlib.sha256(block.encode("utf-8")).hexdigest()[:16]
+            sources = block_sources.get(block_key)
+            if sources is None:
+                sources = set()
+                block_sources[block_key] = sources
+                while len(block_sources) > REPEATED_BLOCKS_MAX_PER_HOST:
+                    block_sources.popitem(last=False)
+            else:
+                block_sources.move_to_end(block_key)
+            # (pages are counted once, also if they are parsed again in later rounds)
+            if len(sources) < self.repeated_block_min_pages:
+                sources.add(source_key)
+            if len(sources) >= self.repeated_block_min_pages:
+                continue
+            result.append((block, in_template))
+        return result
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self, skip_tags: Set[str], skip_roles: Set[str]) -> None:
+        super().__init__(convert_charrefs=True)
+        self.skip_tags = skip_tags
+        self.skip_roles = skip_roles
+
+        # blocks: (text, inside of a site template context)
+        self._blocks: List[Tuple[str, bool]] = []
+        self._current: List[str] = []
+        self._current_in_template = False
+        self._title: List[str] = []
+        self._in_title = False
+        # skipped element: (tag, nesting depth of the same tag)
+        self._skip: Optional[Tuple[str, int]] = None
+        # outermost site template element: (tag, nesting depth of the same tag)
+        self._template: Optional[Tuple[str, int]] = None
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        if self._skip is not None:
+            if tag == self._skip[0] and tag not in _VOID_TAGS:
+                self._skip = (tag, self._skip[1] + 1)
+            return
+        if tag in self.skip_tags or self._is_skipped_by_attributes(attrs):
+            if tag not in _VOID_TAGS:
+                self._skip = (tag, 1)
+            return
+        if tag not in _VOID_TAGS:
+            if self._template is not None:
+                if tag == self._template[0]:
+                    self._template = (tag, self._template[1] + 1)
+            elif tag in _TEMPLATE_TAGS or self._is_template_by_attributes(attrs):
+                self._end_block()
+                self._template = (tag, 1)
+        if tag == "title":
+            self._in_title = True
+        elif tag in _BLOCK_TAGS:
+            self._end_block()
+
+    def handle_startendtag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        # e.g. <br/>: no content, i.e. never skipped
+        if self._skip is None and tag in _BLOCK_TAGS:
+            self._end_block()
+
+    def handle_endtag(self, tag: str) -> None:
+        if self._skip is not None:
+            if tag == self._skip[0]:
+                depth = self._skip[1] - 1
+                self._skip = (tag, depth) if depth > 0 else None
+            return
+        if self._template is not None and tag == self._template[0]:
+            depth = self._template[1] - 1
+            if depth == 0:
+                self._end_block()
+            self._template = (tag, depth) if depth > 0 else None
+        if tag == "title":
+            self._in_title = False
+        elif tag in _BLOCK_TAGS:
+            self._end_block()
+
+    def handle_data(self, data: str) -> None:
+        if self._skip is not None:
+            return
+        if self._in_title:
+            self._title.append(data)
+        else:
+            self._current.append(data)
+            if self._template is not None:
+                self._current_in_template = True
+
+    def get_blocks(self) -> List[Tuple[str, bool]]:
+        self._end_block()
+        return self._blocks
+
+    def get_title(self) -> str:
+        return _WHITESPACE_REGEX.sub(" ", "".join(self._title)).strip()
+
+    def _is_skipped_by_attributes(self, attrs: List[Tuple[str, Optional[str]]]) -> bool:
+        for (name, value) in attrs:
+            if name == "role" and value is not None and value.strip().lower() in self.skip_roles:
+                return True
+            if name == "hidden" or (name == "aria-hidden" and value == "true"):
+                return True
+        return False
+
+    def _is_template_by_attributes(self, attrs: List[Tuple[str, Optional[str]]]) -> bool:
+        for (name, value) in attrs:
+            if value is None:
+                continue
+            if name == "role" and value.strip().lower() in _TEMPLATE_ROLES:
+                return True
+            if name in ("class", "id") and _TEMPLATE_CLASS_REGEX.search(value):
+                return True
+        return False
+
+    def _end_block(self) -> None:
+        if len(self._current) == 0:
+            return
+        block = _WHITESPACE_REGEX.sub(" ", "".join(self._current)).strip()
+        in_template = self._current_in_template
+        self._current = []
+        self._current_in_template = False
+        if len(block) > 0:
+            self._blocks.append((block, in_template))
@@ -0,0 +1,420 @@
+import asyncio
+from email.utils import parsedate_to_datetime
+from html.parser import HTMLParser
+import posixpath
+import queue
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import urldefrag, urljoin, urlparse
+from urllib.robotparser import RobotFileParser
+
+import aiohttp
+from langchain_community.document_loaders import BlobLoader
+from langchain_core.documents.base import Blob as Blob
+
+import logging
+
+from rag_index_service.http_cache import HTTP_CACHE_URL_METADATA_KEY, UNCHANGED_METADATA_KEY, HttpCache
+from utils.encoding_util import detect_encoding
+from utils.hash_util import sha256sum_bytes
+
+logger = logging.getLogger(__name__)
+
+
+# end signal of the blob queue
+_END_OF_CRAWL = None
+
+# size of the chunks the response bodies are read in
+_READ_CHUNK_SIZE = 64 * 1024
+
+
+class WebCrawlerBlobLoader(BlobLoader):
+    """
+    In-process web crawler: loads the pages/files of a web site, starting at a URL.
+
+    Crawling is asynchronous (aiohttp) in a background thread with its own event loop:
+    multiple requests run concurrently, limited per host (max_concurrency_per_host)
+    and with a politeness delay between two requests to the same host (delay_seconds,
+    or the Crawl-delay of robots.txt if larger). robots.txt is respected.
+
+    Links are followed from HTML pages, up to 'depth' link levels below the start URL,
+    only below base_url and only for allowed file extensions, max. max_pages pages in total.
+    The blobs are yielded while the crawl continues (through a bounded queue, i.e. the crawler
+    waits if the processing can't keep up).
+
+    With an HTTP cache, pages are requested conditionally (ETag/Last-Modified). For unchanged pages
+    (HTTP 304 or same content hash) an empty blob with metadata "unchanged": True is yielded
+    instead - it's not parsed/processed again - and the crawl continues with the cached links.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        base_url: Optional[str] = None,
+        depth: int = 3,
+        max_pages: int = 1000,
+        allowed_extensions: Optional[List[str]] = None,
+        max_concurrency_per_host: int = 4,
+        delay_seconds: float = 1.0,
+        respect_robots_txt: bool = True,
+        user_agent: str = "flexi-rag-crawler",
+        timeout_seconds: float = 60.0,
+        max_file_size: int = 50 * 1024 * 1024,
+        queue_size: int = 16,
+        use_http_cache: bool = True,
+        http_cache: Optional[HttpCache] = None,
+        **kwargs,
+    ):
+        """
+        Args:
+            url: start URL
+            base_url: only URLs starting with this prefix are crawled (default: the directory of the start URL)
+            depth: max number of link levels to follow from the start URL (0 = start URL only)
+            max_pages: max number of pages/files to load
+            allowed_extensions: file extensions of the URLs to load, "" for URLs without extension (e.g. "/docs/")
+            max_concurrency_per_host: max number of concurrent requests per host
+            delay_seconds: min time between the start of two requests to the same host
+            respect_robots_txt: don't load URLs disallowed by robots.txt
+            user_agent: User-Agent header (also used for robots.txt rules)
+            timeout_seconds: max time per request
+            max_file_size: larger files are skipped
+            queue_size: max number of loaded blobs waiting to be processed
+            use_http_cache: use the (persistent) HTTP cache for conditional requests - if one is set
+            http_cache: the HTTP cache (usually set by the document loader factory)
+            kwargs: other (unused) args
+        """
+        if base_url is None:
+            # the "directory" of the start URL
+            base_url = url[:url.rindex("/") + 1] if urlparse(url).path else url
+        elif not url.startswith(base_url):
+            logger.warning(f"WebCrawlerBlobLoader: start URL {url} is not below base_url {base_url} - no links will be followed")
+        self.url = url
+        self.base_url = base_url
+        self.depth = depth
+        self.max_pages = max_pages
+        self.allowed_extensions = [extension.lower() for extension in (allowed_extensions if allowed_extensions is not None
+                                                                        else ["", ".html", ".htm", ".txt", ".md", ".pdf"])]
+        self.max_concurrency_per_host = max(1, max_concurrency_per_host)
+        self.delay_seconds = delay_seconds
+        self.respect_robots_txt = respect_robots_txt
+        self.user_agent = user_agent
+        self.timeout_seconds = timeout_seconds
+        self.max_file_size = max_file_size
+        self.queue_size = queue_size
+        self.use_http_cache = use_http_cache
+        self.http_cache = http_cache
+
+    def __str__(self) -> str:
+        return f"WebCrawlerBlobLoader(url: {self.url}, base_url: {self.base_url}, depth: {self.depth}, max_pages: {self.max_pages})"
+
+    def yield_blobs(
+        self,
+    ) -> Iterable[Blob]:
+        """Crawl and yield the loaded pages/files as blobs, while the crawl continues."""
+        logger.info(f"{self}: crawling ...")
+        blob_queue: queue.Queue = queue.Queue(maxsize=max(1, self.queue_size))
+        stop_event = threading.Event()
+        crawl_thread = threading.Thread(target=self._crawl_in_event_loop, args=(blob_queue, stop_event), name="web-crawler", daemon=True)
+        crawl_thread.start()
+
+        num_blobs = 0
+        try:
+            while True:
+                item = blob_queue.get()
+                if item is _END_OF_CRAWL:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                num_blobs += 1
+                yield item
+        finally:
+            # e.g. the consumer stopped early: stop the crawler, too
+            stop_event.set()
+        logger.info(f"{self}: crawling done - {num_blobs} page(s)/file(s) loaded")
+
+    #
+    # crawler - executed in the crawler thread
+    #
+
+    def _crawl_in_event_loop(self, blob_queue: queue.Queue, stop_event: threading.Event) -> None:
+        try:
+            asyncio.run(_Crawl(self, blob_queue, stop_event).run())
+        except Exception as e:
+            logger.warning(f"{self}: crawling failed: {e}")
+            _put_until_stopped(blob_queue, e, stop_event)
+        finally:
+            _put_until_stopped(blob_queue, _END_OF_CRAWL, stop_event)
+
+
+class _Crawl:
+    """
+    State of a single crawl.
+    """
+
+    def __init__(self, loader: WebCrawlerBlobLoader, blob_queue: queue.Queue, stop_event: threading.Event) -> None:
+        self.loader = loader
+        self.blob_queue = blob_queue
+        self.stop_event = stop_event
+
+        self.frontier: asyncio.Queue = asyncio.Queue()
+        self.seen_urls: Set[str] = set()
+        self.num_loaded = 0
+        self.host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.host_locks: Dict[str, asyncio.Lock] = {}
+        self.host_next_request_at: Dict[str, float] = {}
+        self.robots_by_host: Dict[str, Optional[RobotFileParser]] = {}
+
+    async def run(self) -> None:
+        timeout = aiohttp.ClientTimeout(total=self.loader.timeout_seconds)
+        headers = {"User-Agent": self.loader.user_agent}
+        async with aiohttp.ClientSession(timeout=timeout, headers=headers) as session:
+            self.session = session
+            self._add_url(self.loader.url, 0)
+
+            # workers: enough to use the concurrency of a few hosts
+            workers = [asyncio.create_task(self._worker()) for _ in range(self.loader.max_concurrency_per_host * 2)]
+            frontier_done = asyncio.create_task(self.frontier.join())
+            while not frontier_done.done():
+                await asyncio.wait([frontier_done], timeout=0.5)
+                if self.stop_event.is_set():
+                    break
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            frontier_done.cancel()
+
+    def _add_url(self, url: str, depth: int) -> None:
+        url = urldefrag(url)[0]
+        if url in self.seen_urls or len(self.seen_urls) >= self.loader.max_pages:
+            return
+        self.seen_urls.add(url)
+        self.frontier.put_nowait((url, depth))
+
+    async def _worker(self) -> None:
+        while True:
+            (url, depth) = await self.frontier.get()
+            try:
+                if not self.stop_event.is_set():
+                    await self._load_url(url, depth)
+            except Exception as e:
+                logger.warning(f"{self.loader}: loading failed - skipped: {url}: {e}")
+            finally:
+                self.frontier.task_done()
+
+    async def _load_url(self, url: str, depth: int) -> None:
+        host = urlparse(url).netloc
+        if not await self._is_allowed_by_robots_txt(url):
+            logger.info(f"{self.loader}: disallowed by robots.txt - skipped: {url}")
+            return
+
+        # conditional request?
+        loop = asyncio.get_running_loop()
+        http_cache = self.loader.http_cache if self.loader.use_http_cache else None
+        cache_entry = await loop.run_in_executor(None, http_cache.get_entry, url) if http_cache is not None else None
+        request_headers = {}
+        if cache_entry is not None:
+            if cache_entry["etag"]:
+                request_headers["If-None-Match"] = cache_entry["etag"]
+            if cache_entry["last_modified"]:
+                request_headers["If-Modified-Since"] = cache_entry["last_modified"]
+
+        # request (limited concurrency and politeness delay per host)
+        async with self._get_host_semaphore(host):
+            await self._wait_for_politeness_delay(host)
+            async with self.session.get(url, headers=request_headers) as response:
+                if response.status == 304 and cache_entry is not None:
+                    await self._put_unchanged_blob(url, cache_entry, depth)
+                    return
+                if response.status != 200:
+                    logger.info(f"{self.loader}: HTTP {response.status} - skipped: {url}")
+                    return
+                if response.content_length is not None and response.content_length > self.loader.max_file_size:
+                    logger.info(f"{self.loader}: file too large ({response.content_length} bytes) - skipped: {url}")
+                    return
+                data = await _read_body(response, self.loader.max_file_size)
+                if data is None:
+                    logger.info(f"{self.loader}: file too large (more than {self.loader.max_file_size} bytes) - skipped: {url}")
+                    return
+                final_url = str(response.url)
+                content_type = response.content_type
+                charset = response.charset
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+        self.seen_urls.add(final_url)
+
+        # links
+        content_sha256 = sha256sum_bytes(data)
+        encoding = detect_encoding(data, content_type, charset, content_sha256)
+        links: List[str] = []
+        if content_type == "text/html":
+            links = _extract_links(data.decode(encoding, errors="replace"), final_url)
+        if http_cache is not None:
+            http_cache.put_entry(url, final_url, etag, last_modified, content_sha256, links)
+
+        # same content as before (e.g. the server doesn't support conditional requests)?
+        if cache_entry is not None and cache_entry["content_sha256"] == content_sha256 and cache_entry["source"] == final_url:
+            await self._put_unchanged_blob(url, {**cache_entry, "links": links}, depth)
+            return
+
+        # result blob
+        self.num_loaded += 1
+        logger.info(f"{self.loader}: loaded #{self.num_loaded} (depth {depth}): {final_url} ({content_type}, {len(data)} bytes)")
+        blob = Blob.from_data(
+            data,
+            encoding=encoding,
+            mime_type=content_type,
+            path=final_url,
+            metadata={
+                "source": final_url,
+                "content_type": content_type,
+                "file_size": len(data),
+                "file_sha256": content_sha256,
+                "last_modified": _parse_http_date(last_modified),
+                HTTP_CACHE_URL_METADATA_KEY: url,
+            },
+        )
+        await loop.run_in_executor(None, _put_until_stopped, self.blob_queue, blob, self.stop_event)
+        self._follow_links(links, depth)
+
+    async def _put_unchanged_blob(self, url: str, cache_entry: Dict[str, Any], depth: int) -> None:
+        # signal only: the content is already indexed
+        source = cache_entry["source"] or url
+        self.seen_urls.add(source)
+        logger.info(f"{self.loader}: unchanged (depth {depth}): {source}")
+        blob = Blob.from_data(
+            b"",
+            path=source,
+            metadata={
+                "source": source,
+                "file_sha256": cache_entry["content_sha256"],
+                UNCHANGED_METADATA_KEY: True,
+                HTTP_CACHE_URL_METADATA_KEY: url,
+            },
+        )
+        await asyncio.get_running_loop().run_in_executor(None, _put_until_stopped, self.blob_queue, blob, self.stop_event)
+        self._follow_links(cache_entry["links"], depth)
+
+    def _follow_links(self, links: List[str], depth: int) -> None:
+        if depth >= self.loader.depth:
+            return
+        for link in links:
+            if self._is_url_to_crawl(link):
+                self._add_url(link, depth + 1)
+
+    def _is_url_to_crawl(self, url: str) -> bool:
+        parsed_url = urlparse(url)
+        if parsed_url.scheme not in ("http", "https"):
+            return False
+        if not url.startswith(self.loader.base_url):
+            return False
+        extension = posixpath.splitext(parsed_url.path)[1].lower()
+        return extension in self.loader.allowed_extensions
+
+    #
+    # politeness
+    #
+
+    def _get_host_semaphore(self, host: str) -> asyncio.Semaphore:
+        if host not in self.host_semaphores:
+            self.host_semaphores[host] = asyncio.Semaphore(self.loader.max_concurrency_per_host)
+        return self.host_semaphores[host]
+
+    async def _wait_for_politeness_delay(self, host: str) -> None:
+        # min time between the start of two requests to the same host
+        if host not in self.host_locks:
+            self.host_locks[host] = asyncio.Lock()
+        async with self.host_locks[host]:
+            now = time.monotonic()
+            request_at = max(now, self.host_next_request_at.get(host, now))
+            self.host_next_request_at[host] = request_at + self._get_delay_seconds(host)
+        if request_at > now:
+            await asyncio.sleep(request_at - now)
+
+    def _get_delay_seconds(self, host: str) -> float:
+        robots = self.robots_by_host.get(host)
+        crawl_delay = robots.crawl_delay(self.loader.user_agent) if robots is not None else None
+        return max(self.loader.delay_seconds, float(crawl_delay or 0))
+
+    async def _is_allowed_by_robots_txt(self, url: str) -> bool:
+        if not self.loader.respect_robots_txt:
+            return True
+        parsed_url = urlparse(url)
+        host = parsed_url.netloc
+        if host not in self.robots_by_host:
+            # load once per host (concurrent first requests may load it twice - harmless)
+            self.robots_by_host[host] = await self._load_robots_txt(f"{parsed_url.scheme}://{host}/robots.txt")
+        robots = self.robots_by_host[host]
+        return robots is None or robots.can_fetch(self.loader.user_agent, url)
+
+    async def _load_robots_txt(self, robots_url: str) -> Optional[RobotFileParser]:
+        try:
+            async with self.session.get(robots_url) as response:
+                if response.status != 200:
+                    # no robots.txt: everything allowed
+                    return None
+                robots_txt = await response.text(errors="replace")
+        except Exception as e:
+            logger.info(f"{self.loader}: loading of {robots_url} failed - everything allowed: {e}")
+            return None
+        robots = RobotFileParser(robots_url)
+        robots.parse(robots_txt.splitlines())
+        return robots
+
+
+class _LinkExtractor(HTMLParser):
+    def __init__(self) -> None:
+        super().__init__()
+        self.links: List[str] = []
+        self.base_href: Optional[str] = None
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        attributes = dict(attrs)
+        if tag == "base" and attributes.get("href"):
+            self.base_href = attributes["href"]
+        elif tag in ("a", "area", "link") and attributes.get("href"):
+            if tag == "link" and (attributes.get("rel") or "").lower() not in ("alternate", "next", "prev"):
+                return
+            self.links.append(attributes["href"])
+        elif tag in ("frame", "iframe") and attributes.get("src"):
+            self.links.append(attributes["src"])
+
+def _extract_links(html: str, page_url: str) -> List[str]:
+    link_extractor = _LinkExtractor()
+    try:
+        link_extractor.feed(html)
+    except Exception as e:
+        logger.debug(f"Link extraction failed (partially): {page_url}: {e}")
+    base_url = urljoin(page_url, link_extractor.base_href) if link_extractor.base_href else page_url
+    return [urljoin(base_url, link.strip()) for link in link_extractor.links]
+
+
+async def _read_body(response: aiohttp.ClientResponse, max_size: int) -> Optional[bytes]:
+    # read chunk by chunk - also responses without Content-Length (e.g. chunked) can't exceed max_size
+    chunks: List[bytes] = []
+    size = 0
+    async for chunk in response.content.iter_chunked(_READ_CHUNK_SIZE):
+        size += len(chunk)
+        if size > max_size:
+            return None
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def _parse_http_date(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except Exception:
+        return None
+
+
+def _put_until_stopped(blob_queue: queue.Queue, item: Any, stop_event: threading.Event) -> None:
+    # blocking put - but give up if the consumer is gone
+    while not stop_event.is_set():
+        try:
+            blob_queue.put(item, timeout=0.5)
+            return
+        except queue.Full:
+            continue
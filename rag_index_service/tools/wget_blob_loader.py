@@ -4,11 +4,10 @@ from typing import Any, Dict, Iterable, Iterator, Optional
 #from langchain_community.document_loaders.[blob_loaders.schema] import BlobLoader
 from langchain_community.document_loaders import BlobLoader
 from langchain_core.documents.base import Blob as Blob
-from langchain_community.document_loaders.helpers import detect_file_encodings
 
 import logging
 
-from utils.hash_util import sha256sum
+from utils.blob_util import ingest_file_as_blob
 from utils.string_util import str_limit
 
 logger = logging.getLogger(__name__)
@@ -68,66 +67,12 @@ class WgetBlobLoader(BlobLoader):
                 else:
                     url = "file://" + file_path
                 
-                #content_type = "text/html" # TODO: extract form wget output "Length: 2588 (2,5K) [text/html]"
-                content_type = None
-                file_size = os.path.getsize(file_path) # OR: # TODO: extract form wget output "Length: 2588 (2,5K) [text/html]"
-                logger.info(f"WGET downloaded url: {url} -> file_path: {file_path} (content_type: {content_type}, file_length: {file_size})")
-                
-                # Construct result Blob
-                blob_metadata: Dict[str, Any] = {
-                    "source": url,
-                    "file_size": file_size,
-                    #"file_path": file_path,
-                    #"content_type": content_type,
-                }
-                blob = Blob.from_path(
-                    path = file_path,
-                    encoding = WgetBlobLoader._guess_file_encoding(file_path),
-                    mime_type = content_type,
-                    guess_type = True,
-                    metadata = blob_metadata,
-                )
-                blob = WgetBlobLoader._enrich_blob_metadata(blob)
+                # Construct result Blob:
+                # the file is read once - for hash, encoding guess and content
+                blob = ingest_file_as_blob(file_path, source=url)
+                logger.info(f"WGET downloaded url: {url} -> file_path: {file_path} (content_type: {blob.mimetype}, file_length: {blob.metadata['file_size']})")
                 yield blob
 
-    @staticmethod
-    def _enrich_blob_metadata(blob: Blob) -> Dict[str, Any]:
-        metadata: Dict[str, Any] = blob.metadata
-        file_path = blob.path
-
-        # Add content type
-        if metadata.get("content_type") is None:
-            metadata["content_type"] = blob.mimetype
-        # Add file path
-        if metadata.get("file_path") is None:
-            metadata["file_path"] = file_path
-        # Add file size
-        if metadata.get("file_size") is None:
-            metadata["file_size"] = os.path.getsize(file_path)
-        # Add hash
-        if metadata.get("file_sha256") is None:
-            metadata["file_sha256"] = sha256sum(file_path)
-        # Add last modified
-        if metadata.get("last_modified") is None:
-            metadata["last_modified"] = os.path.getmtime(file_path)
-
-        # result
-        #blob.metadata = metadata  # assignment not needed!
-        return blob
-
-
-    @staticmethod
-    def _guess_file_encoding(file_path: str) -> Optional[str]:
-        detected_encodings = detect_file_encodings(file_path)
-        if len(detected_encodings) > 0:
-            # the most likely encoding is the first one
-            return detected_encodings[0].encoding
-        
-        # Fallback to utf-8
-        default_encoding = "utf-8"
-        return default_encoding
-
-
     # Probably not needed anymore:
     """
     @staticmethod
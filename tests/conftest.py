@@ -0,0 +1,29 @@
+import contextlib
+import sqlite3
+import threading
+
+import pytest
+
+from rag_index_service.sql_index_writer import SqlIndexWriter
+from rag_index_service.sql_schema_migrations import migrate_sql_database
+
+
+@pytest.fixture
+def sql_database():
+    """
+    In-memory SQLite DB with the current schema: (get_connection, sqlIndexWriter)
+    - get_connection borrows the single connection (one thread at a time), like the connection pool
+    """
+    sqlCon = sqlite3.connect(":memory:", check_same_thread=False)
+    migrate_sql_database(sqlCon, "sqlite")
+    lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def get_connection():
+        with lock:
+            yield sqlCon
+
+    sqlIndexWriter = SqlIndexWriter(get_connection=get_connection)
+    yield (get_connection, sqlIndexWriter)
+    sqlIndexWriter.flush(timeout=10)
+    sqlCon.close()
@@ -0,0 +1,72 @@
+from rag_index_service.index_garbage_collector import IndexGarbageCollector
+
+
+SWEEP_AFTER_ROUNDS = 3
+
+
+class _VectorStoreStub:
+    def delete(self, ids=None):
+        pass
+
+
+def _create_garbage_collector(sql_database):
+    (get_connection, sqlIndexWriter) = sql_database
+    return (IndexGarbageCollector(get_connection, sqlIndexWriter, lambda: _VectorStoreStub()), sqlIndexWriter, get_connection)
+
+
+def _write_document(sqlIndexWriter, id, source):
+    sqlIndexWriter.submit(
+        lambda cur: cur.execute(
+            "INSERT INTO document (id, source, content_type, file_sha256) VALUES (?, ?, 'text/plain', 'sha')", (id, source)
+        ),
+        f"document {id}"
+    )
+
+
+def _get_sources(get_connection):
+    with get_connection() as sqlCon:
+        cur = sqlCon.cursor()
+        cur.execute("SELECT source FROM document ORDER BY source")
+        sources = [row[0] for row in cur.fetchall()]
+        cur.close()
+    return sources
+
+
+def test_ingested_sources_survive_rounds_without_loader(sql_database):
+    (indexGarbageCollector, sqlIndexWriter, get_connection) = _create_garbage_collector(sql_database)
+
+    # round 1: a loader sees two files
+    round_number = indexGarbageCollector.start_round("round 1")
+    _write_document(sqlIndexWriter, "doc-1", "file:a")
+    _write_document(sqlIndexWriter, "doc-2", "file:b")
+    indexGarbageCollector.mark_sources_seen(round_number, ["file:a", "file:b"])
+    sqlIndexWriter.flush()
+
+    # ingestion API (like process_documents_immediately(..., externally_owned=True))
+    _write_document(sqlIndexWriter, "doc-3", "api:pushed")
+    indexGarbageCollector.mark_sources_externally_owned(["api:pushed"])
+    sqlIndexWriter.flush()
+
+    # following rounds: the loader sees only one file, nobody sees the pushed source
+    for _ in range(2 * SWEEP_AFTER_ROUNDS):
+        round_number = indexGarbageCollector.start_round("next round")
+        indexGarbageCollector.mark_sources_seen(round_number, ["file:a"])
+        indexGarbageCollector.sweep_unseen_sources(round_number, SWEEP_AFTER_ROUNDS)
+
+    assert _get_sources(get_connection) == ["api:pushed", "file:a"]
+
+
+def test_pushed_source_seen_by_loader_stays_externally_owned(sql_database):
+    (indexGarbageCollector, sqlIndexWriter, get_connection) = _create_garbage_collector(sql_database)
+
+    round_number = indexGarbageCollector.start_round("round 1")
+    _write_document(sqlIndexWriter, "doc-1", "api:pushed")
+    indexGarbageCollector.mark_sources_externally_owned(["api:pushed"])
+    indexGarbageCollector.mark_sources_seen(round_number, ["api:pushed"])
+    sqlIndexWriter.flush()
+
+    for _ in range(2 * SWEEP_AFTER_ROUNDS):
+        round_number = indexGarbageCollector.start_round("next round")
+        indexGarbageCollector.sweep_unseen_sources(round_number, SWEEP_AFTER_ROUNDS)
+
+    assert _get_sources(get_connection) == ["api:pushed"]
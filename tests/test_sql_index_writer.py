@@ -0,0 +1,84 @@
+import contextlib
+import sqlite3
+import threading
+
+import pytest
+
+from rag_index_service.sql_index_writer import SqlIndexWriter
+
+
+def _create_database():
+    sqlCon = sqlite3.connect(":memory:", check_same_thread=False)
+    sqlCon.execute("CREATE TABLE t (x INTEGER)")
+    sqlCon.commit()
+    return sqlCon
+
+
+def _insert(x):
+    return lambda cur: cur.execute("INSERT INTO t (x) VALUES (?)", (x,))
+
+
+def _get_values(sqlCon):
+    return [row[0] for row in sqlCon.execute("SELECT x FROM t ORDER BY x").fetchall()]
+
+
+def test_writer_survives_failing_connection():
+    sqlCon = _create_database()
+    lock = threading.Lock()
+    failures = [sqlite3.OperationalError("database is locked")]
+
+    @contextlib.contextmanager
+    def get_connection():
+        if len(failures) > 0:
+            raise failures.pop()
+        with lock:
+            yield sqlCon
+
+    sqlIndexWriter = SqlIndexWriter(get_connection=get_connection)
+    sqlIndexWriter.submit(_insert(1), "dropped: no connection")
+    sqlIndexWriter.submit(_insert(2), "written")
+    sqlIndexWriter.flush(timeout=10)
+
+    assert _get_values(sqlCon) == [2]
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_flush_raises_if_writer_thread_died_and_writer_restarts():
+    sqlCon = _create_database()
+    lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def get_connection():
+        with lock:
+            yield sqlCon
+
+    def kill_writer_thread(cur):
+        raise SystemExit()
+
+    sqlIndexWriter = SqlIndexWriter(get_connection=get_connection)
+    sqlIndexWriter.submit(kill_writer_thread, "kills the writer thread")
+    with pytest.raises(RuntimeError):
+        sqlIndexWriter.flush(timeout=10)
+
+    # restarted with the next submit
+    sqlIndexWriter.submit(_insert(3), "written")
+    sqlIndexWriter.flush(timeout=10)
+    assert _get_values(sqlCon) == [3]
+
+
+def test_flush_timeout():
+    sqlCon = _create_database()
+    lock = threading.Lock()
+    release = threading.Event()
+
+    @contextlib.contextmanager
+    def get_connection():
+        with lock:
+            yield sqlCon
+
+    sqlIndexWriter = SqlIndexWriter(get_connection=get_connection)
+    sqlIndexWriter.submit(lambda cur: release.wait(10), "slow unit")
+    with pytest.raises(TimeoutError):
+        sqlIndexWriter.flush(timeout=0.2)
+    release.set()
+    sqlIndexWriter.flush(timeout=10)
@@ -0,0 +1,166 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+
+import pytest
+
+from rag_index_service.http_cache import UNCHANGED_METADATA_KEY, HttpCache
+from rag_index_service.tools.web_crawler_blob_loader import WebCrawlerBlobLoader
+
+
+ROBOTS_TXT = "User-agent: *\nDisallow: /docs/private/\n"
+
+
+def _get_pages(port):
+    return {
+        "/docs/": '<a href="a.html">a</a> <a href="private/secret.html">secret</a>'
+                  f' <a href="http://localhost:{port}/docs/external.html">other host</a>'
+                  ' <a href="/outside.html">outside of base_url</a>',
+        "/docs/a.html": '<a href="b.html">b</a>',
+        "/docs/b.html": '<a href="c.html">c</a>',
+        "/docs/c.html": "depth 3",
+        "/docs/private/secret.html": "disallowed by robots.txt",
+        "/docs/external.html": "other host",
+        "/outside.html": "outside of base_url",
+        "/large/": '<a href="small.html">small</a> <a href="streamed.html">streamed</a>',
+        "/large/small.html": "small",
+    }
+
+
+# pages sent without Content-Length (the end of the body is the end of the connection)
+STREAMED_PAGES = {
+    "/large/streamed.html": "x" * 200000,
+}
+
+
+class _Server:
+    """
+    Local web site: HTML pages with ETags, answers conditional requests with 304.
+    """
+
+    def __init__(self):
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests.append((self.path, self.headers.get("If-None-Match")))
+                if self.path == "/robots.txt":
+                    self._respond(200, "text/plain", ROBOTS_TXT.encode("utf-8"))
+                    return
+                if self.path in STREAMED_PAGES:
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/html")
+                    self.end_headers()
+                    self.wfile.write(STREAMED_PAGES[self.path].encode("utf-8"))
+                    return
+                page = server.pages.get(self.path)
+                if page is None:
+                    self._respond(404, "text/plain", b"not found")
+                    return
+                etag = f'"{hash(page)}"'
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                self._respond(200, "text/html; charset=utf-8", f"<html><body>{page}</body></html>".encode("utf-8"), etag)
+
+            def _respond(self, status, content_type, body, etag=None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                if etag is not None:
+                    self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.port = self.httpd.server_address[1]
+        self.pages = _get_pages(self.port)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.port}{path}"
+
+    def requested_paths(self):
+        return {path for (path, _) in self.requests}
+
+
+@pytest.fixture
+def server():
+    server = _Server()
+    server.thread.start()
+    yield server
+    server.httpd.shutdown()
+    server.httpd.server_close()
+
+
+def _crawl(server, depth=2, http_cache=None, path="/docs/", **kwargs):
+    loader = WebCrawlerBlobLoader(
+        server.url(path),
+        base_url=server.url(path),
+        depth=depth,
+        delay_seconds=0,
+        timeout_seconds=10,
+        http_cache=http_cache,
+        **kwargs,
+    )
+    return {blob.source: blob for blob in loader.yield_blobs()}
+
+
+def test_depth_limit_robots_txt_and_base_url(server):
+    blobs = _crawl(server, depth=2)
+
+    assert set(blobs.keys()) == {server.url("/docs/"), server.url("/docs/a.html"), server.url("/docs/b.html")}
+    requested_paths = server.requested_paths()
+    # depth limit: c.html is 3 links away
+    assert "/docs/c.html" not in requested_paths
+    # robots.txt
+    assert "/robots.txt" in requested_paths
+    assert "/docs/private/secret.html" not in requested_paths
+    # same host and below base_url only ("localhost" is another host than "127.0.0.1")
+    assert "/docs/external.html" not in requested_paths
+    assert "/outside.html" not in requested_paths
+
+
+def test_depth_zero_loads_start_url_only(server):
+    blobs = _crawl(server, depth=0)
+
+    assert set(blobs.keys()) == {server.url("/docs/")}
+
+
+def test_max_file_size_without_content_length(server):
+    blobs = _crawl(server, depth=1, path="/large/", max_file_size=100000)
+
+    assert "/large/streamed.html" in server.requested_paths()
+    assert set(blobs.keys()) == {server.url("/large/"), server.url("/large/small.html")}
+
+
+def test_unchanged_pages_with_http_cache(server, sql_database):
+    (get_connection, sqlIndexWriter) = sql_database
+    httpCache = HttpCache(get_connection, sqlIndexWriter)
+
+    # first crawl: pages loaded, cache records written
+    blobs = _crawl(server, http_cache=httpCache)
+    sqlIndexWriter.flush()
+    assert not any(blob.metadata.get(UNCHANGED_METADATA_KEY) for blob in blobs.values())
+    assert httpCache.get_entry(server.url("/docs/a.html"))["etag"] is not None
+
+    # second crawl: conditional requests, HTTP 304 - unchanged signals only,
+    # and the crawl continues with the cached links
+    server.requests.clear()
+    blobs = _crawl(server, http_cache=httpCache)
+    assert set(blobs.keys()) == {server.url("/docs/"), server.url("/docs/a.html"), server.url("/docs/b.html")}
+    assert all(blob.metadata.get(UNCHANGED_METADATA_KEY) for blob in blobs.values())
+    assert all(blob.as_bytes() == b"" for blob in blobs.values())
+    assert all(if_none_match is not None for (path, if_none_match) in server.requests if path.startswith("/docs/"))
+
+    # changed page: loaded again
+    server.pages["/docs/a.html"] = '<a href="b.html">b</a> changed'
+    sqlIndexWriter.flush()
+    blobs = _crawl(server, http_cache=httpCache)
+    assert not blobs[server.url("/docs/a.html")].metadata.get(UNCHANGED_METADATA_KEY)
+    assert blobs[server.url("/docs/b.html")].metadata.get(UNCHANGED_METADATA_KEY)
@@ -0,0 +1,72 @@
+import mimetypes
+import os
+from typing import Any, Dict, Optional
+
+from langchain_core.documents.base import Blob
+
+from utils.encoding_util import detect_encoding
+from utils.hash_util import sha256sum_bytes
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def ingest_file_as_blob(
+    file_path: str,
+    source: Optional[str] = None,
+    mime_type: Optional[str] = None,
+    metadata: Optional[Dict[str, Any]] = None,
+) -> Blob:
+    """
+    Read a file once and create an in-memory blob - with all metadata needed for the indexing:
+    source, content_type, file_path, file_size, file_sha256, last_modified
+    and the text encoding (see detect_encoding()).
+
+    The content is read in a single pass; hash and encoding are computed from the read bytes,
+    the parser uses them without reading the file again.
+
+    Args:
+        file_path: path of the file
+        source: source of the documents (e.g. the URL), default: file_path
+        mime_type: content type, default: guessed from the file name
+        metadata: additional metadata (already present keys are not overwritten)
+    """
+    # metadata of the file system (one stat call)
+    stat = os.stat(file_path)
+
+    # read
+    # (the parser needs the content as bytes anyway - mmap would only add a copy)
+    with open(file_path, "rb") as f:
+        data = f.read()
+
+    # derived values
+    if mime_type is None:
+        mime_type = mimetypes.guess_type(file_path)[0]
+    blob_metadata: Dict[str, Any] = dict(metadata or {})
+    blob_metadata.setdefault("source", source or str(file_path))
+    blob_metadata.setdefault("content_type", mime_type)
+    blob_metadata.setdefault("file_path", str(file_path))
+    blob_metadata.setdefault("file_size", len(data))
+    blob_metadata.setdefault("file_sha256", sha256sum_bytes(data))
+    blob_metadata.setdefault("last_modified", stat.st_mtime)
+
+    return Blob.from_data(
+        data,
+        encoding=detect_encoding(data, mime_type, file_sha256=blob_metadata["file_sha256"]),
+        mime_type=mime_type,
+        path=str(file_path),
+        metadata=blob_metadata,
+    )
+
+
+def ingest_blob(blob: Blob) -> Blob:
+    """
+    Make sure the blob is in memory and has all metadata needed for the indexing:
+    a blob that only references a file (e.g. from FileSystemBlobLoader) is read once with ingest_file_as_blob(),
+    other blobs are returned as they are.
+    """
+    if blob.data is not None or blob.path is None:
+        return blob
+    return ingest_file_as_blob(str(blob.path), source=blob.source, mime_type=blob.mimetype, metadata=blob.metadata)
+
@@ -0,0 +1,20 @@
+import struct
+from typing import List
+
+# supported binary formats of embeddings: little-endian float32 or float16
+EMBEDDING_DTYPE_FORMATS = {
+    "float32": "f",
+    "float16": "e",
+}
+
+
+def encode_embedding(embedding: List[float], dtype: str = "float32") -> bytes:
+    """Encode an embedding (vector of floats) as bytes, e.g. to store it as BLOB."""
+    return struct.pack(f"<{len(embedding)}{EMBEDDING_DTYPE_FORMATS[dtype]}", *embedding)
+
+
+def decode_embedding(data: bytes, dtype: str = "float32") -> List[float]:
+    """Decode an embedding (vector of floats) from bytes created with encode_embedding()."""
+    item_format = EMBEDDING_DTYPE_FORMATS[dtype]
+    num_items = len(data) // struct.calcsize(item_format)
+    return list(struct.unpack(f"<{num_items}{item_format}", data))
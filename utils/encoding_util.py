@@ -0,0 +1,157 @@
+from collections import OrderedDict
+import codecs
+import re
+import threading
+from typing import Optional
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# encoding if nothing else is known (and of binary content, where it's not used)
+DEFAULT_ENCODING = "utf-8"
+
+# size of the prefix used to guess the text encoding
+ENCODING_SAMPLE_SIZE = 64 * 1024
+
+# size of the prefix that is searched for a <meta charset=...> or <?xml encoding=...?> declaration
+DECLARATION_SAMPLE_SIZE = 4 * 1024
+
+# max number of guessed encodings kept in the cache (by file_sha256)
+ENCODING_CACHE_MAX_SIZE = 10000
+
+# byte order marks - UTF-32 before UTF-16, because the UTF-32-LE BOM starts with the UTF-16-LE BOM
+_BOMS = [
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+
+# non-"text/*" mime types with text content
+_TEXT_MIME_TYPES = {
+    "application/json",
+    "application/javascript",
+    "application/ecmascript",
+    "application/xml",
+    "application/xhtml+xml",
+    "application/x-yaml",
+    "application/yaml",
+    "application/x-sh",
+    "application/sql",
+    "application/rtf",
+    "image/svg+xml",
+}
+
+_DECLARED_CHARSET_REGEX = re.compile(
+    rb"""<meta[^>]+charset\s*=\s*["']?\s*([A-Za-z0-9_.:-]+)|<\?xml[^>]+encoding\s*=\s*["']([A-Za-z0-9_.:-]+)""",
+    re.IGNORECASE,
+)
+
+_encoding_cache: "OrderedDict[str, str]" = OrderedDict()
+_encoding_cache_lock = threading.Lock()
+
+
+def detect_encoding(
+    data: bytes,
+    mime_type: Optional[str] = None,
+    charset: Optional[str] = None,
+    file_sha256: Optional[str] = None,
+) -> str:
+    """
+    Detect the text encoding of file content - cheap sources first:
+      1. byte order mark (BOM)
+      2. charset of the HTTP header (Content-Type: ...; charset=...)
+      3. charset declared in the content (<meta charset=...>, <?xml encoding=...?>)
+      4. guess from a sample (prefix) of the content - cached by file_sha256
+
+    Binary content (by mime type) is not inspected at all.
+
+    Args:
+        data: the file content
+        mime_type: content type, e.g. "text/html" or "application/pdf" (None if unknown)
+        charset: charset of the HTTP header, if any
+        file_sha256: hash of the content, as key of the cache (None: no caching)
+    """
+    if is_binary_mime_type(mime_type):
+        return DEFAULT_ENCODING
+
+    # 1. BOM
+    for (bom, encoding) in _BOMS:
+        if data.startswith(bom):
+            return encoding
+
+    # 2. HTTP header
+    encoding = _normalize_encoding(charset)
+    if encoding is not None:
+        return encoding
+
+    # 3. declaration in the content
+    match = _DECLARED_CHARSET_REGEX.search(data[:DECLARATION_SAMPLE_SIZE])
+    if match is not None:
+        encoding = _normalize_encoding((match.group(1) or match.group(2)).decode("ascii"))
+        if encoding is not None:
+            return encoding
+
+    # 4. sample
+    if file_sha256 is not None:
+        with _encoding_cache_lock:
+            encoding = _encoding_cache.get(file_sha256)
+            if encoding is not None:
+                _encoding_cache.move_to_end(file_sha256)
+                return encoding
+    encoding = guess_encoding_from_sample(data[:ENCODING_SAMPLE_SIZE])
+    if file_sha256 is not None:
+        with _encoding_cache_lock:
+            _encoding_cache[file_sha256] = encoding
+            while len(_encoding_cache) > ENCODING_CACHE_MAX_SIZE:
+                _encoding_cache.popitem(last=False)
+    return encoding
+
+
+def is_binary_mime_type(mime_type: Optional[str]) -> bool:
+    """
+    True if the content of the mime type is binary (e.g. "application/pdf", "video/mp4"),
+    False for text and for unknown mime types.
+    """
+    if mime_type is None:
+        return False
+    mime_type = mime_type.split(";")[0].strip().lower()
+    if mime_type.startswith("text/") or mime_type in _TEXT_MIME_TYPES:
+        return False
+    if mime_type.endswith("+xml") or mime_type.endswith("+json"):
+        return False
+    return mime_type.startswith(("application/", "image/", "audio/", "video/", "font/"))
+
+
+def guess_encoding_from_sample(sample: bytes) -> str:
+    """
+    Guess the text encoding from a sample (prefix) of the content.
+    """
+    try:
+        # incremental: the sample can end in the middle of a multi-byte character
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        pass
+
+    try:
+        import chardet
+    except ImportError:
+        logger.debug("Package 'chardet' not installed - encoding guessed as latin-1")
+        return "latin-1"
+    encoding = _normalize_encoding(chardet.detect(sample).get("encoding"))
+    return encoding or DEFAULT_ENCODING
+
+
+def _normalize_encoding(encoding: Optional[str]) -> Optional[str]:
+    # canonical Python codec name - None if unknown
+    if not encoding:
+        return None
+    try:
+        return codecs.lookup(encoding.strip()).name
+    except LookupError:
+        logger.debug(f"Unknown encoding ignored: {encoding}")
+        return None
@@ -32,7 +32,7 @@ def sha256sum(file_path) -> str:
 
     #print(f"md5sum({file_path}): {hexdigest}")
     #print(f"sha1sum({file_path}): {hexdigest}")
-    print(f"sha256sum({file_path}): {hexdigest}")
+    logger.debug(f"sha256sum({file_path}): {hexdigest}")
     return hexdigest
 
 
@@ -50,6 +50,11 @@ def sha256sum_str(s: str) -> str:
     return result
 
 
+def sha256sum_bytes(data: bytes) -> str:
+    """Compute the SHA-256 hash of bytes (e.g. the content of an uploaded file)."""
+    return hashlib.sha256(data).hexdigest()
+
+
 # for manual testing:
 #filename = "/tmp/wget/dance123.org/index.html"
 #sha256sum(filename)
@@ -0,0 +1,10 @@
+from typing import Any, Iterable, List
+
+
+def batched(items: List[Any], batch_size: int) -> Iterable[List[Any]]:
+    """
+    Split a list into batches (=sub-lists) of at most batch_size elements.
+    """
+    batch_size = max(1, batch_size)
+    for start in range(0, len(items), batch_size):
+        yield items[start:start + batch_size]
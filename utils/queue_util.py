@@ -0,0 +1,72 @@
+import queue
+import time
+from typing import Any, Callable
+
+
+class SizeBoundedQueue(queue.Queue):
+    """
+    A queue.Queue that is bounded by the number of items AND by the (approximate) total size of its items.
+
+    put() blocks while the queue is full (backpressure for the producers).
+    A single item that is larger than maxbytes is accepted if the queue is empty,
+    otherwise it could never be put into the queue.
+    """
+
+    def __init__(self, maxsize: int = 0, maxbytes: int = 0, sizeof: Callable[[Any], int] = lambda item: 0) -> None:
+        """
+        Args:
+            maxsize: max number of items, <= 0 means unlimited
+            maxbytes: max total size of all items, <= 0 means unlimited
+            sizeof: function to calculate the (approximate) size of an item
+        """
+        super().__init__(maxsize)
+        self.maxbytes = maxbytes
+        self.sizeof = sizeof
+        self._bytes = 0
+
+    def bytes_size(self) -> int:
+        """Return the approximate total size of all items in the queue (not reliable!)."""
+        with self.mutex:
+            return self._bytes
+
+    def put(self, item: Any, block: bool = True, timeout: float = None) -> None:
+        size = self.sizeof(item) if item is not None else 0
+        with self.not_full:
+            if not block:
+                if self._is_full(size):
+                    raise queue.Full
+            elif timeout is None:
+                while self._is_full(size):
+                    self.not_full.wait()
+            elif timeout < 0:
+                raise ValueError("'timeout' must be a non-negative number")
+            else:
+                endtime = time.monotonic() + timeout
+                while self._is_full(size):
+                    remaining = endtime - time.monotonic()
+                    if remaining <= 0.0:
+                        raise queue.Full
+                    self.not_full.wait(remaining)
+            self._put((item, size))
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+
+    def _is_full(self, size: int) -> bool:
+        num_items = self._qsize()
+        if 0 < self.maxsize <= num_items:
+            return True
+        if self.maxbytes > 0 and num_items > 0 and self._bytes + size > self.maxbytes:
+            return True
+        return False
+
+    def _put(self, item_and_size: Any) -> None:
+        (item, size) = item_and_size
+        self.queue.append((item, size))
+        self._bytes += size
+
+    def _get(self) -> Any:
+        (item, size) = self.queue.popleft()
+        self._bytes -= size
+        # producers wait for different amounts of free space: wake up all of them
+        self.not_full.notify_all()
+        return item
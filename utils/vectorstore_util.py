@@ -0,0 +1,135 @@
+from functools import cache
+from typing import Any, Dict, List, Optional, Tuple
+from langchain_core.vectorstores import VectorStore
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Chroma adapter: the langchain Chroma classes have no public API to add pre-calculated embeddings -
+# their chromadb collection is only available as the private attribute '_collection'.
+# This access is isolated in _get_chroma_collection() and only used for the known classes
+# and tested chromadb versions; otherwise add_texts() is used (embeddings calculated again), with a warning.
+CHROMA_CLASSES = {
+    "langchain_community.vectorstores.chroma.Chroma",
+    "langchain_chroma.vectorstores.Chroma",
+}
+# chromadb versions: min_version <= version < max_version
+CHROMADB_MIN_VERSION = (0, 4)
+CHROMADB_MAX_VERSION = (2, 0)
+
+
+def get_existing_ids_in_vectorstore(vectorStore: VectorStore, ids: List[str]) -> List[str]:
+    """
+    Check which of the given IDs are already stored in the vectorstore.
+
+    Only the IDs are requested (no documents, no embeddings) to keep the lookup cheap.
+
+    Returns: the subset of the given IDs that are in the vectorstore
+    """
+    if len(ids) == 0:
+        return []
+
+    if hasattr(vectorStore, "get"):
+        # e.g. Chroma: ID-only lookup
+        result = vectorStore.get(ids=ids, include=[])
+        return list(result["ids"])
+    if hasattr(vectorStore, "get_by_ids"):
+        # generic langchain_core API (returns full documents)
+        return [doc.id for doc in vectorStore.get_by_ids(ids) if doc.id is not None]
+
+    logger.warning(f"get_existing_ids_in_vectorstore(): {type(vectorStore).__name__} does not support lookups by ID")
+    return []
+
+
+def add_embedded_texts_to_vectorstore(
+    vectorStore: VectorStore,
+    texts: List[str],
+    embeddings: List[List[float]],
+    metadatas: List[Dict[str, Any]],
+    ids: List[str],
+) -> List[str]:
+    """
+    Add texts with already calculated embeddings to the vectorstore - with a single call.
+
+    Vectorstores with an API for pre-calculated embeddings (e.g. FAISS, Chroma) are used directly.
+    Other vectorstores fall back to add_texts() which calculates the embeddings (again).
+
+    Returns: the IDs of the added texts
+    """
+    if len(texts) == 0:
+        return []
+
+    if hasattr(vectorStore, "add_embeddings"):
+        # e.g. FAISS
+        return vectorStore.add_embeddings(
+            text_embeddings=list(zip(texts, embeddings)),
+            metadatas=metadatas,
+            ids=ids,
+        )
+    chroma_collection = _get_chroma_collection(vectorStore)
+    if chroma_collection is not None:
+        # Chroma (langchain_community.vectorstores.Chroma and langchain_chroma.Chroma)
+        chroma_collection.upsert(
+            ids=ids,
+            embeddings=embeddings,
+            metadatas=[_simple_metadata(metadata) for metadata in metadatas],
+            documents=texts,
+        )
+        return ids
+
+    logger.warning(f"add_embedded_texts_to_vectorstore(): {type(vectorStore).__name__} does not support pre-calculated embeddings - embeddings are calculated again")
+    return vectorStore.add_texts(texts=texts, metadatas=metadatas, ids=ids)
+
+
+def _get_chroma_collection(vectorStore: VectorStore) -> Optional[Any]:
+    """
+    Get the chromadb collection of a langchain Chroma vectorstore - None if it's not a (supported) Chroma vectorstore.
+    """
+    if not _is_supported_chroma_class(type(vectorStore)):
+        return None
+    from chromadb.api.models.Collection import Collection
+    collection = getattr(vectorStore, "_collection", None)
+    if not isinstance(collection, Collection):
+        logger.warning(f"{type(vectorStore).__name__}: no chromadb collection in attribute '_collection' - pre-calculated embeddings not supported")
+        return None
+    return collection
+
+@cache
+def _is_supported_chroma_class(vectorstore_class: type) -> bool:
+    # (checked once per class)
+    class_names = {f"{cls.__module__}.{cls.__qualname__}" for cls in vectorstore_class.__mro__}
+    if len(class_names & CHROMA_CLASSES) == 0:
+        return False
+    try:
+        import chromadb
+        version = _parse_version(chromadb.__version__)
+    except Exception as e:
+        logger.warning(f"{vectorstore_class.__name__}: chromadb version unknown - pre-calculated embeddings not supported: {e}")
+        return False
+    if not CHROMADB_MIN_VERSION <= version < CHROMADB_MAX_VERSION:
+        logger.warning(f"{vectorstore_class.__name__}: chromadb {chromadb.__version__} not tested (supported: >= {CHROMADB_MIN_VERSION}, < {CHROMADB_MAX_VERSION}) - pre-calculated embeddings not supported")
+        return False
+    return True
+
+def _parse_version(version: str) -> Tuple[int, int]:
+    # e.g. "0.5.4" -> (0, 5)
+    (major, minor) = version.split(".")[:2]
+    return (int(major), int("".join(c for c in minor if c.isdigit()) or 0))
+
+
+def _simple_metadata(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Reduce metadata to the simple value types supported by most vectorstores (str, int, float, bool).
+    """
+    result: Dict[str, Any] = {}
+    for key, value in metadata.items():
+        if value is None:
+            continue
+        if isinstance(value, (str, int, float, bool)):
+            result[key] = value
+        else:
+            result[key] = str(value)
+    return result
+